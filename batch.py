@@ -0,0 +1,92 @@
+from array import array
+
+import numpy as np
+
+from engine import get_engine
+
+# category codes used in the columnar results, -1 marks an empty text
+CATEGORIES = ("negative", "neutral", "positive")
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+EMPTY_CODE = -1
+EMOTIONS = ("joy", "sadness", "neutral")
+
+COLUMNS = ("score", "category", "subjectivity") + EMOTIONS
+
+
+def _to_numpy(buf, dtype=np.float64):
+    # wrap an array.array without copying it
+    if not len(buf):
+        return np.empty(0, dtype=dtype)
+    return np.frombuffer(buf, dtype=dtype)
+
+
+def _raw_scores(texts, engine):
+    # collect the raw analyzer outputs into flat float buffers, no per-text dicts
+    polarity, subjectivity = array('d'), array('d')
+    pos, neg, neu = array('d'), array('d'), array('d')
+    empty = array('b')
+    nan = float("nan")
+
+    for text in texts:
+        if not text or not text.strip():
+            empty.append(1)
+            for column in (polarity, subjectivity, pos, neg, neu):
+                column.append(nan)
+            continue
+        empty.append(0)
+        (p, s), vader = engine.scores(text)
+        polarity.append(p)
+        subjectivity.append(s)
+        pos.append(vader['pos'])
+        neg.append(vader['neg'])
+        neu.append(vader['neu'])
+
+    return (_to_numpy(polarity), _to_numpy(subjectivity), _to_numpy(pos),
+            _to_numpy(neg), _to_numpy(neu), _to_numpy(empty, np.int8).astype(bool))
+
+
+def scores_from_raw(polarity, subjectivity, pos, neg, neu, empty=None):
+    # vectorized version of the scaling and thresholds in analyze_sentiment
+    polarity = np.asarray(polarity, dtype=np.float64)
+    category = np.full(polarity.shape, CATEGORY_CODES["neutral"], dtype=np.int8)
+    category[polarity > 0.1] = CATEGORY_CODES["positive"]
+    category[polarity < -0.1] = CATEGORY_CODES["negative"]
+    if empty is not None:
+        category[empty] = EMPTY_CODE
+
+    return {
+        "score": (polarity + 1) * 50,
+        "category": category,
+        "subjectivity": np.asarray(subjectivity, dtype=np.float64) * 100,
+        "joy": np.clip(np.asarray(pos, dtype=np.float64) * 100, 0, 100),
+        "sadness": np.clip(np.asarray(neg, dtype=np.float64) * 100, 0, 100),
+        "neutral": np.clip(np.asarray(neu, dtype=np.float64) * 100, 0, 100),
+    }
+
+
+def analyze_sentiment_batch(texts, as_frame=False, engine=None):
+    """Score an iterable of texts and return columnar results.
+
+    Returns a dict of NumPy arrays keyed by ``COLUMNS`` (or a pandas
+    DataFrame when ``as_frame`` is set). Categories are int8 codes into
+    ``CATEGORIES``; empty texts get ``EMPTY_CODE`` and NaN scores.
+    Engines that score whole batches at once (``raw_scores_batch``, see
+    fast_engine.FastEngine) are handed the texts in one call.
+    """
+    engine = engine or get_engine()
+    if hasattr(engine, "raw_scores_batch"):
+        polarity, subjectivity, pos, neg, neu, empty = engine.raw_scores_batch(texts)
+    else:
+        polarity, subjectivity, pos, neg, neu, empty = _raw_scores(texts, engine)
+    result = scores_from_raw(polarity, subjectivity, pos, neg, neu, empty)
+
+    if as_frame:
+        import pandas as pd
+        return pd.DataFrame(result, columns=list(COLUMNS))
+    return result
+
+
+def category_names(codes):
+    # turn category codes back into labels, empty texts become None
+    labels = np.array(CATEGORIES + (None,), dtype=object)
+    return labels[np.asarray(codes)]
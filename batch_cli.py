@@ -0,0 +1,442 @@
+"""Score a corpus from the command line without Streamlit.
+
+    python -m batch_cli reviews.jsonl -o scores.jsonl --workers 8
+    python -m batch_cli tickets.csv --text-field body -o scores.parquet
+    python -m batch_cli contracts/ -o contracts.jsonl --resume
+    python -m batch_cli firehose.jsonl -o scores.jsonl --engine fast
+    python -m batch_cli reviews.jsonl -o scores.jsonl --dedup --similarity 0.85
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from engine import get_engine
+from parallel import map_corpus
+
+DOCUMENT_TYPES = (".pdf", ".docx")
+OUTPUT_FIELDS = ("id", "score", "category", "subjectivity", "joy", "sadness", "neutral", "error",
+                 "group", "duplicate")
+PARQUET_ROWS_PER_GROUP = 10000
+LATENCY_SAMPLES = 10000
+# records per vectorized call of the fast engine
+FAST_BATCH = 512
+# records fingerprinted together by the dedup stage
+DEDUP_BATCH = 256
+
+
+def iter_records(source, text_field="text", id_field="id"):
+    # yield (id, text_or_path) from a jsonl/csv file or a directory of documents
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(DOCUMENT_TYPES):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), {"path": path}
+        return
+
+    if source.lower().endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            for number, row in enumerate(csv.DictReader(f)):
+                yield row.get(id_field) or number, row.get(text_field) or ""
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield number, record
+            else:
+                yield record.get(id_field, number), record.get(text_field) or ""
+
+
+def _document_text(path):
+    # the document's text joined the way uploads.py and the app join it, so
+    # it scores the same as the document uploaded there
+    if path.lower().endswith(".pdf"):
+        from pdf_extract import iter_pdf_pages
+        pieces = iter_pdf_pages(path, workers=1)
+    else:
+        from docx_extract import iter_docx_paragraphs
+        pieces = iter_docx_paragraphs(path)
+    return "\n".join(pieces).strip()
+
+
+def score_record(record):
+    # runs in the worker: extract if needed, score, and time the whole thing
+    record_id, payload = record
+    row = {"id": record_id}
+    if payload is None:
+        # a duplicate, the parent fills in its representative's result
+        return row, None
+    start = time.perf_counter()
+    try:
+        text = _document_text(payload["path"]) if isinstance(payload, dict) else payload
+        score, category, subjectivity, emotions = get_engine().analyze_sentiment(text)
+        row.update(score=score, category=category, subjectivity=subjectivity)
+        row.update(emotions or {"joy": None, "sadness": None, "neutral": None})
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row, (time.perf_counter() - start) * 1000
+
+
+def score_record_batch(records):
+    # fast engine: extract documents one by one, then score the batch in one call
+    from fast_engine import get_fast_engine
+    from batch import analyze_sentiment_batch, category_names
+
+    start = time.perf_counter()
+    rows, texts, duplicates = [], [], set()
+    for record_id, payload in records:
+        row = {"id": record_id}
+        text = ""
+        try:
+            if payload is None:
+                duplicates.add(len(rows))
+            elif isinstance(payload, dict):
+                text = _document_text(payload["path"])
+            else:
+                text = payload
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+        texts.append(text)
+
+    columns = analyze_sentiment_batch(texts, engine=get_fast_engine())
+    categories = category_names(columns["category"])
+    for i, row in enumerate(rows):
+        if "error" in row or i in duplicates:
+            continue
+        scored = categories[i] is not None
+        row.update(category=categories[i])
+        for name in ("score", "subjectivity", "joy", "sadness", "neutral"):
+            row[name] = float(columns[name][i]) if scored else None
+    # the batch is scored as a whole, each record gets its share of the time
+    elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(rows) - len(duplicates), 1)
+    return [(row, None if i in duplicates else elapsed_ms) for i, row in enumerate(rows)]
+
+
+def _batches(records, size):
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _fingerprints(batch, dedup):
+    # one fingerprint per (id, payload) record, documents by file content
+    from dedup import file_fingerprint, fingerprint_batch
+
+    texts = [payload for _, payload in batch if not isinstance(payload, dict)]
+    fingerprints = iter(fingerprint_batch(texts, **dedup.options))
+    for record_id, payload in batch:
+        if isinstance(payload, dict):
+            try:
+                with open(payload["path"], "rb") as f:
+                    yield file_fingerprint(f.read())
+            except OSError:
+                # unreadable files are scored on their own and report the error
+                yield file_fingerprint(payload["path"].encode())
+        else:
+            yield next(fingerprints)
+
+
+def _dedupe(records, dedup, matches):
+    # match each record against the groups seen so far, duplicates are sent on
+    # with no payload so the workers skip them
+    for batch in _batches(records, DEDUP_BATCH):
+        for (record_id, payload), fp in zip(batch, _fingerprints(batch, dedup)):
+            match = dedup.assign(fp)
+            matches.append(match)
+            yield record_id, payload if match.kind == "new" else None
+
+
+def _written_rows(output, checkpoint):
+    # rows the interrupted run wrote up to its last checkpoint
+    if output.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        stem, ext = os.path.splitext(output)
+        for part in range(checkpoint.parts):
+            yield from pq.read_table(f"{stem}-{part:05d}{ext}").to_pylist()
+        return
+    with open(output, "rb") as f:
+        for line in f.read(checkpoint.offset).splitlines():
+            yield json.loads(line)
+
+
+def _restore_dedup(records, dedup, output, checkpoint):
+    # rebuild the index the interrupted run had: the same records in the same
+    # order give the same groups, and the representatives' rows come back
+    # from the output, so nothing written is scored again
+    for batch in _batches(records, DEDUP_BATCH):
+        for fp in _fingerprints(batch, dedup):
+            dedup.assign(fp)
+    for row in _written_rows(output, checkpoint):
+        if row.get("group") is not None and not row.get("duplicate"):
+            dedup.set_result(row["group"], row)
+    # the summary reports this run's records only
+    dedup.counts = dict.fromkeys(dedup.counts, 0)
+
+
+def _score(records, workers, engine, dedup=None):
+    # (row, elapsed ms) per record, in input order; duplicates get their
+    # representative's result and None for the time
+    if dedup is None:
+        yield from _score_all(records, workers, engine)
+        return
+    matches = deque()
+    for row, elapsed_ms in _score_all(_dedupe(records, dedup, matches), workers, engine):
+        match = matches.popleft()
+        if match.kind == "new":
+            dedup.set_result(match.group, row)
+        else:
+            representative = dedup.result(match.group)
+            if representative is None:
+                row["error"] = "KeyError: representative result was evicted, raise --max-groups"
+            else:
+                row = dict(representative, id=row["id"], duplicate=match.kind)
+        row["group"] = match.group
+        yield row, elapsed_ms
+
+
+def _score_all(records, workers, engine):
+    if engine == "fast":
+        for _, results in map_corpus(score_record_batch, _batches(records, FAST_BATCH),
+                                     workers=workers, ordered=True):
+            yield from results
+        return
+    for _, result in map_corpus(score_record, records, workers=workers, ordered=True):
+        yield result
+
+
+class Checkpoint:
+    """Remembers how many input records are safely written.
+
+    For JSONL output it also records the file size at that point, so a
+    resumed run can cut off any half-written tail before appending, and
+    the dedup settings of the run, so it can only be resumed with the same.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = 0
+        self.offset = 0
+        self.parts = 0
+        self.dedup = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.done, self.offset, self.parts = state["done"], state["offset"], state.get("parts", 0)
+            self.dedup = state.get("dedup")
+        return self
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": self.done, "offset": self.offset, "parts": self.parts, "dedup": self.dedup}, f)
+        os.replace(tmp, self.path)
+
+
+class JsonlWriter:
+    def __init__(self, path, checkpoint):
+        mode = "r+b" if checkpoint.done and os.path.exists(path) else "wb"
+        self._file = open(path, mode)
+        if mode == "r+b":
+            self._file.truncate(checkpoint.offset)
+            self._file.seek(checkpoint.offset)
+
+    def write(self, row):
+        self._file.write(json.dumps(row).encode("utf-8") + b"\n")
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes numbered part files (scores-00000.parquet, ...) row group by row group.
+
+    Each checkpoint closes the current part, so every part on disk is a
+    complete file and a resumed run simply starts the next one.
+    """
+
+    def __init__(self, path, checkpoint):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa, self._pq = pa, pq
+        self._stem, self._ext = os.path.splitext(path)
+        self._checkpoint = checkpoint
+        self._schema = pa.schema([
+            ("id", pa.string()), ("score", pa.float64()), ("category", pa.string()),
+            ("subjectivity", pa.float64()), ("joy", pa.float64()), ("sadness", pa.float64()),
+            ("neutral", pa.float64()), ("error", pa.string()), ("group", pa.int64()),
+            ("duplicate", pa.string()),
+        ])
+        self._writer = None
+        self._rows = []
+
+    def _write_group(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            path = f"{self._stem}-{self._checkpoint.parts:05d}{self._ext}"
+            self._writer = self._pq.ParquetWriter(path, self._schema)
+        columns = {name: [row.get(name) for row in self._rows] for name in OUTPUT_FIELDS}
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(dict(row, id=str(row["id"])))
+        if len(self._rows) >= PARQUET_ROWS_PER_GROUP:
+            self._write_group()
+
+    def flush(self):
+        self._write_group()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._checkpoint.parts += 1
+        return 0
+
+    def close(self):
+        self.flush()
+
+
+def summarize(count, errors, skipped, elapsed, latencies, dedup=None):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+    summary = {
+        "records": count,
+        "errors": errors,
+        "resumed_from": skipped,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {"p50": round(pct(50), 3), "p95": round(pct(95), 3), "p99": round(pct(99), 3)},
+    }
+    if dedup is not None:
+        summary["dedup"] = dedup.summary()
+        # what the skipped records would have cost at the mean scored latency
+        mean_ms = sum(latencies) / len(latencies) if latencies else 0.0
+        summary["dedup"]["estimated_seconds_saved"] = round(summary["dedup"]["skipped"] * mean_ms / 1000, 3)
+    return summary
+
+
+def run(source, output, workers=None, text_field="text", id_field="id", resume=False,
+        checkpoint_every=1000, checkpoint_path=None, engine="exact", dedup=None):
+    """Score ``source`` into ``output`` and return the run summary.
+
+    With a ``dedup.Deduplicator`` as ``dedup``, only one record per group of
+    exact or near duplicates is scored; every member gets its result plus a
+    ``group`` id, and the summary reports the work saved. A resumed run
+    rebuilds the index from the records and rows already written.
+    """
+    checkpoint = Checkpoint(checkpoint_path or output + ".ckpt")
+    settings = dedup.settings() if dedup is not None else None
+    if resume:
+        checkpoint.load()
+        if checkpoint.done and checkpoint.dedup != settings:
+            raise SystemExit(f"{output} was written with dedup settings {checkpoint.dedup}, "
+                             f"resume it with the same --dedup, --similarity and --max-groups")
+    checkpoint.dedup = settings
+    skipped = checkpoint.done
+
+    records = iter_records(source, text_field=text_field, id_field=id_field)
+    if dedup is not None and skipped:
+        _restore_dedup(islice(records, skipped), dedup, output, checkpoint)
+    else:
+        for _ in range(skipped):
+            if next(records, None) is None:
+                break
+
+    writer_class = ParquetWriter if output.lower().endswith(".parquet") else JsonlWriter
+    writer = writer_class(output, checkpoint)
+
+    # reservoir sample of per-record latencies for the percentile summary
+    rng = random.Random(0)
+    latencies, count, scored, errors = [], 0, 0, 0
+    start = time.perf_counter()
+    try:
+        for row, elapsed_ms in _score(records, workers, engine, dedup):
+            writer.write(row)
+            count += 1
+            errors += "error" in row
+            # duplicates carry no latency of their own but still count
+            # towards the next checkpoint
+            if elapsed_ms is not None:
+                scored += 1
+                if len(latencies) < LATENCY_SAMPLES:
+                    latencies.append(elapsed_ms)
+                else:
+                    slot = rng.randrange(scored)
+                    if slot < LATENCY_SAMPLES:
+                        latencies[slot] = elapsed_ms
+            if count % checkpoint_every == 0:
+                checkpoint.offset = writer.flush()
+                checkpoint.done = skipped + count
+                checkpoint.save()
+    finally:
+        checkpoint.offset = writer.flush()
+        checkpoint.done = skipped + count
+        checkpoint.save()
+        writer.close()
+
+    return summarize(count, errors, skipped, time.perf_counter() - start, latencies, dedup)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="JSONL or CSV file, or a directory of PDF/DOCX files")
+    parser.add_argument("-o", "--output", required=True, help="output .jsonl or .parquet path")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--engine", choices=("exact", "fast"), default="exact",
+                        help="fast: approximate vectorized lexicon scorer, see fast_engine.py")
+    parser.add_argument("--dedup", action="store_true",
+                        help="score one record per group of exact or near-duplicate texts")
+    parser.add_argument("--similarity", type=float, default=None,
+                        help="near-duplicate threshold on estimated Jaccard similarity (default: 0.8)")
+    parser.add_argument("--max-groups", type=int, default=None,
+                        help="duplicate groups remembered at once (default: 100000)")
+    args = parser.parse_args(argv)
+
+    dedup = None
+    if args.dedup:
+        from dedup import DEFAULT_MAX_GROUPS, DEFAULT_THRESHOLD, Deduplicator
+        dedup = Deduplicator(threshold=args.similarity or DEFAULT_THRESHOLD,
+                             max_groups=args.max_groups or DEFAULT_MAX_GROUPS)
+
+    summary = run(args.source, args.output, workers=args.workers, text_field=args.text_field,
+                  id_field=args.id_field, resume=args.resume, checkpoint_every=args.checkpoint_every,
+                  engine=args.engine, dedup=dedup)
+    json.dump(summary, sys.stderr, indent=2)
+    sys.stderr.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
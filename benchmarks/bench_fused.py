@@ -0,0 +1,38 @@
+"""Per-text latency of the fused single-tokenization path vs the exact path.
+
+    python -m benchmarks.bench_fused --texts 500
+"""
+import argparse
+import time
+
+from benchmarks.corpus import make_corpus
+from engine import SentimentEngine
+
+LENGTHS = {"short": 1, "medium": 10, "long": 100}
+
+
+def per_text_us(engine, texts):
+    start = time.perf_counter()
+    for text in texts:
+        engine.analyze_sentiment(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    exact, fused = SentimentEngine(fused=False).load(), SentimentEngine(fused=True).load()
+    print(f"{'length':>8} {'sentences':>10} {'exact us':>10} {'fused us':>10} {'speedup':>8}")
+    for label, sentences in LENGTHS.items():
+        texts = make_corpus(args.texts, sentences=sentences, seed=1)
+        # one untimed pass so both paths start with warm lexicon memos
+        per_text_us(exact, texts[:50])
+        per_text_us(fused, texts[:50])
+        a, b = per_text_us(exact, texts), per_text_us(fused, texts)
+        print(f"{label:>8} {sentences:>10} {a:>10.1f} {b:>10.1f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
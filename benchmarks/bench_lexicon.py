@@ -0,0 +1,60 @@
+"""Compare engine load time and private memory for parsed vs memory-mapped lexicons.
+
+    python -m benchmarks.bench_lexicon
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, time
+
+def rss():
+    # private (anonymous) vs file backed resident memory in KiB
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('RssAnon', 'RssFile'):
+                fields[name] = int(value.split()[0])
+    return fields
+
+import textblob.en, nltk.sentiment.vader, lexicon_index  # imports are not what we measure
+from benchmarks.corpus import make_corpus
+from engine import SentimentEngine
+
+before = rss()
+start = time.perf_counter()
+engine = SentimentEngine(use_compiled=%r).load()
+load_ms = (time.perf_counter() - start) * 1000
+for text in make_corpus(200):
+    engine.analyze_sentiment(text)
+after = rss()
+print(json.dumps({"load_ms": load_ms,
+                  "anon_kib": after.get("RssAnon", 0) - before.get("RssAnon", 0),
+                  "file_kib": after.get("RssFile", 0) - before.get("RssFile", 0)}))
+"""
+
+
+def probe(use_compiled):
+    proc = subprocess.run([sys.executable, "-c", _PROBE % use_compiled], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def main():
+    # build the indexes up front so the mapped run measures loading, not compiling
+    import lexicon_index
+    lexicon_index.main()
+
+    print(f"{'lexicons':>10} {'load ms':>9} {'private KiB':>12} {'shared KiB':>11}")
+    for label, use_compiled in (("parsed", False), ("mapped", True)):
+        result = probe(use_compiled)
+        print(f"{label:>10} {result['load_ms']:>9.1f} {result['anon_kib']:>12} {result['file_kib']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Throughput of score_corpus at each worker count.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel --texts 20000 --workers 1 2 4 8 16 32
+"""
+import argparse
+import os
+import time
+
+from benchmarks.corpus import make_corpus
+from engine import get_engine
+from parallel import score_corpus
+
+
+def run(texts, workers, ordered=True):
+    start = time.perf_counter()
+    count = sum(1 for _ in score_corpus(texts, workers=workers, ordered=ordered))
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--sentences", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--unordered", action="store_true")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, 16, 32, cpus} & set(range(1, cpus + 1)))
+    texts = make_corpus(args.texts, sentences=args.sentences)
+    # pool workers warm up in their initializer, do the same for the inline run
+    get_engine().load()
+
+    baseline = None
+    print(f"{'workers':>8} {'texts/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for workers in worker_counts:
+        rate = run(texts, workers, ordered=not args.unordered)
+        baseline = baseline or rate
+        speedup = rate / baseline
+        print(f"{workers:>8} {rate:>12.1f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import random
+
+# small vocabulary mixing lexicon hits with filler so both analyzers do real work
+POSITIVE = ["great", "excellent", "happy", "lovely", "wonderful", "good", "amazing", "pleasant"]
+NEGATIVE = ["terrible", "awful", "sad", "horrible", "bad", "disappointing", "angry", "poor"]
+FILLER = ["the", "service", "was", "and", "our", "team", "product", "really", "not", "very",
+          "today", "meeting", "report", "delivery", "support", "price", "quality", "it"]
+
+
+def make_sentence(rng):
+    words = rng.choices(FILLER, k=rng.randint(5, 12))
+    for _ in range(rng.randint(1, 3)):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(POSITIVE + NEGATIVE))
+    return " ".join(words).capitalize() + rng.choice([".", "!", "?"])
+
+
+def make_text(rng, sentences):
+    return " ".join(make_sentence(rng) for _ in range(sentences))
+
+
+def make_corpus(count, sentences=3, seed=0):
+    # deterministic synthetic texts, nothing is downloaded
+    rng = random.Random(seed)
+    return [make_text(rng, sentences) for _ in range(count)]
+
+
+def make_history(count, seed=0):
+    # analysis history entries shaped like the ones main.py records
+    from datetime import datetime, timedelta
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    history = []
+    for i in range(count):
+        score = rng.uniform(0, 100)
+        joy, sadness = rng.uniform(0, 60), rng.uniform(0, 40)
+        history.append({
+            "text": f"Text {i}",
+            "score": score,
+            "category": "positive" if score > 55 else "negative" if score < 45 else "neutral",
+            "subjectivity": rng.uniform(0, 100),
+            "emotions": {"joy": joy, "sadness": sadness, "neutral": max(0.0, 100 - joy - sadness)},
+            "timestamp": start + timedelta(minutes=i),
+        })
+    return history
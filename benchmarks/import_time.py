@@ -0,0 +1,40 @@
+"""Measure cold import time of the project modules with ``python -X importtime``.
+
+    python -m benchmarks.import_time engine utils batch_cli
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must stay out of the scoring import path
+HEAVY_MODULES = ("streamlit", "plotly", "pandas", "numpy", "pypdf", "docx", "nltk", "textblob")
+
+
+def measure(module):
+    # returns (cumulative import ms of `module`, heavy modules it pulled in)
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative_us = int(parts[1])
+    loaded = [name for name in proc.stdout.strip().split(",") if name]
+    return cumulative_us / 1000, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["engine", "cache", "utils", "batch_cli", "service"])
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        ms, loaded = measure(module)
+        print(f"{module:>12} {ms:8.1f} ms  heavy: {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Load test the scoring service and report latency percentiles and requests/s.
+
+Starts a local service (or targets --port of a running one) and drives it
+with keep-alive connections:
+
+    python -m benchmarks.loadtest_service --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.corpus import make_corpus
+from service import ScoringService
+
+
+async def _request(reader, writer, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length"))
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, texts, deadline, batch, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if batch > 1:
+                path, payload = "/score/batch", {"texts": rng.sample(texts, batch)}
+            else:
+                path, payload = "/score", {"text": rng.choice(texts)}
+            start = time.perf_counter()
+            status = await _request(reader, writer, path, payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def run(host="127.0.0.1", port=None, concurrency=32, duration=5.0, batch=1, workers=None, texts=2000):
+    service = None
+    if port is None:
+        service = ScoringService(workers=workers)
+        port = await service.start(host, 0)
+
+    corpus = make_corpus(texts)
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_client(host, port, corpus, deadline, batch, latencies, statuses,
+                                       random.Random(i)) for i in range(concurrency)))
+    finally:
+        elapsed = time.perf_counter() - start
+        batching = service.batcher.stats() if service else None
+        if service is not None:
+            await service.stop()
+
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "texts_per_second": round(len(latencies) * batch / elapsed, 1),
+        "latency_ms": {p: round(percentile(latencies, int(p[1:])), 2) for p in ("p50", "p95", "p99")},
+        "statuses": statuses,
+        "batching": batching,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="target a running service instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1, help="texts per request, >1 uses /score/batch")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    summary = asyncio.run(run(args.host, args.port, args.concurrency, args.duration, args.batch, args.workers))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
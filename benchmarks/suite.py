@@ -0,0 +1,285 @@
+"""Performance benchmark suite with JSON baselines and regression gating.
+
+    python -m benchmarks.suite                      # run, compare with baselines.json
+    python -m benchmarks.suite --save-baseline      # run and record new baselines
+    python -m benchmarks.suite -k pdf --threshold 0.5 --rounds 3
+
+Every input is generated from fixed seeds, nothing touches the network.
+Each case reports throughput, latency percentiles and the peak memory
+traced by tracemalloc during one extra (untimed) call. The run fails with
+exit status 1 when a case's p50 latency or peak memory grows past the
+threshold relative to its baseline.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_corpus, make_history
+from benchmarks.documents import make_docx, make_pdf
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+# regressions smaller than this are timer noise, whatever the ratio says
+MIN_SLACK_MS = 0.05
+MIN_SLACK_KIB = 64
+
+
+class Case:
+    """One benchmark: ``run(item)`` is timed, ``setup()`` before it is not.
+
+    ``items`` cycles through pre-built inputs so repeated calls never hit a
+    result cache, and ``units`` says how many texts/pages one call handles.
+    """
+
+    def __init__(self, name, run, items, units=1, setup=None):
+        self.name = name
+        self.run = run
+        self.items = items
+        self.units = units
+        self.setup = setup
+
+
+def _clear_page_cache():
+    import pdf_extract
+    pdf_extract._page_cache.clear()
+
+
+def _history_arrays(history):
+    import numpy as np
+    from utils import history_columns
+
+    columns = {name: np.asarray(values) for name, values in history_columns(history).items()}
+    columns["timestamp"] = columns["timestamp"].astype("datetime64[ms]")
+    return columns
+
+
+def _comparison_table(history):
+    from comparison import ComparisonTable
+
+    table = ComparisonTable()
+    for item in history:
+        table.append(item["text"], item["score"], item["category"], item["subjectivity"], item["emotions"])
+    return table
+
+
+def _comparison_view(table):
+    # what one rerun of the comparison tab computes: charts, top-k and a sorted page
+    from comparison import page_slice
+    from utils import create_comparison_chart, create_distribution_chart
+
+    columns = table.columns()
+    create_comparison_chart(columns)
+    create_distribution_chart(columns)
+    table.records(table.top_k(5))
+    table.records(table.top_k(5, largest=False))
+    table.records(page_slice(table.select(sort="score", descending=True), 1))
+
+
+def _render_page(table):
+    from comparison import page_slice
+    from rendering import comparison_item, render_block
+
+    return render_block(table.records(page_slice(table.select(sort="score", descending=True), 1)),
+                        comparison_item)
+
+
+def build_cases():
+    from batch import analyze_sentiment_batch
+    from dedup import Deduplicator, dedupe
+    from engine import get_engine
+    from fast_engine import get_fast_engine
+    from pdf_extract import extract_text_from_pdf
+    from streaming import iter_sentences
+    from docx_extract import extract_docx_text
+    from trend import TrendEngine
+    from utils import calculate_trend, create_comparison_chart, create_sentiment_chart
+
+    engine = get_engine().load()
+    cases = []
+    for label, sentences in (("short", 1), ("medium", 10), ("long", 100)):
+        cases.append(Case(f"analyze_sentiment/{label}", engine.analyze_sentiment,
+                          make_corpus(200, sentences=sentences, seed=1)))
+    # the fast engine scores a whole batch per call
+    fast = get_fast_engine().load()
+    for label, sentences in (("short", 1), ("long", 100)):
+        cases.append(Case(f"fast_batch/{label}", lambda texts: analyze_sentiment_batch(texts, engine=fast),
+                          [make_corpus(1000, sentences=sentences, seed=seed) for seed in (1, 2, 3)],
+                          units=1000))
+    for pages in (10, 50, 200):
+        cases.append(Case(f"extract_pdf/{pages}p", extract_text_from_pdf, [make_pdf(pages)],
+                          units=pages, setup=_clear_page_cache))
+    for pages in (10, 50, 200):
+        cases.append(Case(f"extract_docx/{pages}p", lambda data: extract_docx_text(io.BytesIO(data)),
+                          [make_docx(pages)], units=pages))
+    for size in (10, 100, 1000):
+        cases.append(Case(f"sentiment_chart/{size}", create_sentiment_chart, [make_history(size)]))
+    # large histories arrive as columns from the history store
+    cases.append(Case("sentiment_chart/100000_columns", create_sentiment_chart,
+                      [_history_arrays(make_history(100000))]))
+    for size in (2, 10, 50):
+        cases.append(Case(f"comparison_chart/{size}", create_comparison_chart, [make_history(size)]))
+    cases.append(Case("comparison_view/5000", _comparison_view, [_comparison_table(make_history(5000))]))
+    # building one uncached page of text details, the same size however long the list
+    cases.append(Case("render_page/5000", _render_page, [_comparison_table(make_history(5000))]))
+    # dedup stage over a corpus where every text appears twice
+    texts = make_corpus(5000, sentences=3, seed=7)
+    cases.append(Case("dedup/10000", lambda items: sum(1 for _ in dedupe(items, Deduplicator())),
+                      [texts + texts], units=10000))
+    # pages of text with no sentence end, the carry must not keep growing
+    pages = [("word " * 400).strip() for _ in range(1000)]
+    cases.append(Case("iter_sentences/1000p", lambda items: sum(1 for _ in iter_sentences(items, max_chars=500)),
+                      [pages], units=len(pages)))
+    for size in (10, 1000):
+        cases.append(Case(f"calculate_trend/{size}", calculate_trend, [make_history(size)]))
+    # streaming updates of the online estimators, one call feeds 10000 scores
+    scores = [item["score"] for item in make_history(10000)]
+    cases.append(Case("trend_update/10000", lambda items: TrendEngine().extend(items), [scores],
+                      units=len(scores)))
+    return cases
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def measure(case, min_time=0.5, min_calls=5, max_calls=2000):
+    # warm up once, then time calls until min_time has passed
+    if case.setup:
+        case.setup()
+    case.run(case.items[0])
+
+    latencies = []
+    total = 0.0
+    gc.collect()
+    gc.disable()
+    try:
+        while len(latencies) < max_calls and (len(latencies) < min_calls or total < min_time):
+            item = case.items[len(latencies) % len(case.items)]
+            if case.setup:
+                case.setup()
+            start = time.perf_counter()
+            case.run(item)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed * 1000)
+            total += elapsed
+    finally:
+        gc.enable()
+
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    case.run(case.items[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "units_per_second": round(case.units * len(latencies) / total, 2),
+        "mean_ms": round(total * 1000 / len(latencies), 4),
+        "p50_ms": round(_percentile(latencies, 50), 4),
+        "p95_ms": round(_percentile(latencies, 95), 4),
+        "p99_ms": round(_percentile(latencies, 99), 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baselines, threshold=DEFAULT_THRESHOLD,
+            memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    # list of human readable regressions of results against baselines
+    regressions = []
+    for name, result in results.items():
+        base = baselines.get(name)
+        if base is None:
+            continue
+        limit = max(base["p50_ms"] * (1 + threshold), base["p50_ms"] + MIN_SLACK_MS)
+        if result["p50_ms"] > limit:
+            regressions.append(f"{name}: p50 {result['p50_ms']:.3f} ms > {limit:.3f} ms "
+                               f"(baseline {base['p50_ms']:.3f} ms)")
+        limit = max(base["peak_kib"] * (1 + memory_threshold), base["peak_kib"] + MIN_SLACK_KIB)
+        if result["peak_kib"] > limit:
+            regressions.append(f"{name}: peak {result['peak_kib']:.0f} KiB > {limit:.0f} KiB "
+                               f"(baseline {base['peak_kib']:.0f} KiB)")
+    return regressions
+
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baselines(results, path=BASELINE_PATH):
+    data = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "cases": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def run(cases, min_time=0.5, rounds=1, out=sys.stdout):
+    # with several rounds the fastest one is kept, which filters out
+    # interference from other processes on a shared machine
+    results = {}
+    print(f"{'case':<32} {'calls':>6} {'units/s':>10} {'p50 ms':>10} {'p95 ms':>10} "
+          f"{'p99 ms':>10} {'peak KiB':>10}", file=out)
+    for case in cases:
+        result = min((measure(case, min_time=min_time) for _ in range(rounds)),
+                     key=lambda r: r["p50_ms"])
+        results[case.name] = result
+        print(f"{case.name:<32} {result['calls']:>6} {result['units_per_second']:>10.1f} "
+              f"{result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+              f"{result['peak_kib']:>10.1f}", file=out)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative p50 latency growth (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to time each case")
+    parser.add_argument("--rounds", type=int, default=1, help="measure each case this many times, keep the best")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases() if args.filter in case.name]
+    results = run(cases, min_time=args.min_time, rounds=args.rounds)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        merged = dict(load_baselines(args.baseline), **results)
+        save_baselines(merged, args.baseline)
+        print(f"saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    baselines = load_baselines(args.baseline)
+    if not baselines:
+        print("no baselines yet, run with --save-baseline to record them")
+        return 0
+    regressions = compare(results, baselines, args.threshold, args.memory_threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"no regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from engine import get_engine
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# rows written under another version are pruned once they are this old
+STALE_VERSION_SECONDS = 30 * 24 * 3600
+
+
+def normalize_text(text):
+    # texts that only differ in unicode form, line endings or surrounding
+    # whitespace score the same, so they should share a cache entry
+    text = unicodedata.normalize("NFC", text)
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def text_key(text, version=""):
+    digest = hashlib.sha256(version.encode())
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def approx_size(value):
+    # rough deep size in bytes of the plain values we cache
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+
+class ByteLRU:
+    """An LRU mapping bounded by the approximate byte size of its entries."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=approx_size):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._sizeof(key) + self._sizeof(value)
+        if size > self.max_bytes:
+            # never let one huge entry flush the whole cache
+            return False
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old_size) = self._data.popitem(last=False)
+                self.nbytes -= old_size
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class DiskCache:
+    """SQLite table of results that survives restarts and is shared by processes.
+
+    Reads only see rows of this cache's version, so processes on different
+    versions can share one file. Rows of other versions are pruned when the
+    cache is opened once they are ``STALE_VERSION_SECONDS`` old, or all at
+    once by ``vacuum()``.
+    """
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+        self._connect()
+
+    def _connect(self):
+        # sqlite connections must not be shared across a fork, reopen per process
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+            "value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("DELETE FROM results WHERE version != ? AND created < ?",
+                     (self.version, time.time() - STALE_VERSION_SECONDS))
+        conn.commit()
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM results WHERE key = ? AND version = ?",
+                (key, self.version),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, version, value, created) VALUES (?, ?, ?, ?)",
+                (key, self.version, json.dumps(value), time.time()),
+            )
+            conn.commit()
+
+    def vacuum(self):
+        # drop every row of another version and give the space back
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM results WHERE version != ?", (self.version,))
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResultCache:
+    """Content-addressed cache for analyze_sentiment results.
+
+    Keys are a hash of the normalized text plus the engine fingerprint, so a
+    new scorer version or lexicon never serves old results.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_path=None, engine=None):
+        self.engine = engine or get_engine()
+        self.version = self.engine.fingerprint()
+        self.memory = ByteLRU(max_bytes)
+        self.disk = DiskCache(disk_path, self.version) if disk_path else None
+
+    def key(self, text):
+        return text_key(normalize_text(text), self.version)
+
+    def analyze(self, text):
+        # same contract as analyze_sentiment, computing only on a miss
+        text = normalize_text(text)
+        if not text:
+            return None, None, None, None
+        key = text_key(text, self.version)
+
+        result = self.memory.get(key)
+        if result is None and self.disk is not None:
+            result = self.disk.get(key)
+            if result is not None:
+                result = tuple(result)
+                self.memory.put(key, result)
+        if result is None:
+            result = self.engine.analyze_sentiment(text)
+            self.memory.put(key, result)
+            if self.disk is not None:
+                self.disk.put(key, result)
+
+        score, category, subjectivity, emotions = result
+        # hand out a copy so callers can't mutate the cached dict
+        return score, category, subjectivity, dict(emotions)
+
+    def stats(self):
+        stats = {"version": self.version, "memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = {"path": self.disk.path, "hits": self.disk.hits, "misses": self.disk.misses}
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure_cache(max_bytes=DEFAULT_MAX_BYTES, disk_path=None):
+    # replace the process-wide cache, e.g. to turn on the sqlite tier
+    global _cache
+    with _cache_lock:
+        if _cache is not None and _cache.disk is not None:
+            _cache.disk.close()
+        _cache = ResultCache(max_bytes=max_bytes, disk_path=disk_path)
+    return _cache
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(disk_path=os.environ.get("SENTIMENT_CACHE_PATH"))
+    return _cache
+
+
+def cached_analyze_sentiment(text):
+    return get_cache().analyze(text)
@@ -0,0 +1,124 @@
+"""Helpers that keep Plotly charts small and fast on large series.
+
+Series above a point budget are reduced with Largest-Triangle-Three-Buckets
+(LTTB), which keeps the peaks and dips a reader would notice. Large traces
+are drawn with WebGL. Finished figures are cached under a key that
+includes the data version, so reruns on unchanged data skip both the
+query and the figure construction.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# points per trace after downsampling
+POINT_BUDGET = 2000
+# traces with more points than this are drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+FIGURE_CACHE_SIZE = 32
+
+
+def lttb_indices(x, y, threshold):
+    """Indexes of the ``threshold`` points LTTB keeps from the series (x, y).
+
+    The first and last points are always kept; the series between them is
+    cut into ``threshold - 2`` buckets and from each bucket the point
+    spanning the largest triangle with the previously kept point and the
+    average of the next bucket is chosen. NaN values count as 0.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # bucket i covers [edges[i], edges[i + 1]), buckets sit between the end points
+    edges = (np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    # every bucket's centroid up front, the last bucket looks ahead to the end point
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[-1])
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        # twice the triangle area, the constant factor doesn't change the argmax
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def as_float_axis(x):
+    # numeric view of an x axis for LTTB: datetimes become epoch milliseconds
+    x = np.asarray(x)
+    if x.dtype == object and len(x):
+        x = x.astype("datetime64[ms]")
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def downsample(x, y, budget=POINT_BUDGET):
+    """(x, y) reduced to at most ``budget`` points with LTTB."""
+    x, y = np.asarray(x), np.asarray(y)
+    if len(y) <= budget:
+        return x, y
+    keep = lttb_indices(as_float_axis(x), y, budget)
+    return x[keep], y[keep]
+
+
+def scatter_class(points):
+    # plain SVG scatter for small traces, WebGL once they get large
+    import plotly.graph_objects as go
+
+    return go.Scattergl if points > WEBGL_THRESHOLD else go.Scatter
+
+
+def rolling_mean(values, window):
+    # trailing mean like pandas rolling(window).mean(): NaN until the window fills
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if window < 1 or len(values) < window:
+        return out
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    out[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return out
+
+
+class FigureCache:
+    """Small LRU of built figures keyed by (chart, data version, options)."""
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+figure_cache = FigureCache()
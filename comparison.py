@@ -0,0 +1,166 @@
+"""Array-backed result table for comparing many texts.
+
+Each compared text is one row of a NumPy structured array, so sorting,
+filtering, top-k and distribution summaries run as whole-array operations
+instead of loops over per-text dicts. Only the rows on the page being shown
+are ever turned back into Python objects.
+"""
+import numpy as np
+
+# the same category codes as the columnar batch results
+from batch import CATEGORIES, CATEGORY_CODES, EMOTIONS
+
+SORT_COLUMNS = ("index", "score", "subjectivity") + EMOTIONS
+
+DTYPE = np.dtype([
+    ("index", np.int32),
+    ("score", np.float32),
+    ("category", np.int8),
+    ("subjectivity", np.float32),
+    ("joy", np.float32),
+    ("sadness", np.float32),
+    ("neutral", np.float32),
+])
+
+INITIAL_CAPACITY = 64
+PAGE_SIZE = 25
+
+
+class ComparisonTable:
+    """Growable table of comparison results.
+
+    ``rows`` is a view of the filled part of the structured array and
+    ``texts`` holds the matching text summaries. ``version`` grows with
+    every change and can key caches of anything derived from the table.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._data = np.zeros(capacity, dtype=DTYPE)
+        self._texts = np.empty(capacity, dtype=object)
+        self._size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def rows(self):
+        return self._data[:self._size]
+
+    @property
+    def texts(self):
+        return self._texts[:self._size]
+
+    def _reserve(self, size):
+        # grow by doubling so appends stay amortized O(1)
+        if size <= len(self._data):
+            return
+        capacity = max(size, 2 * len(self._data))
+        data = np.zeros(capacity, dtype=DTYPE)
+        data[:self._size] = self.rows
+        texts = np.empty(capacity, dtype=object)
+        texts[:self._size] = self.texts
+        self._data, self._texts = data, texts
+
+    def append(self, text, score, category, subjectivity, emotions=None):
+        """Add one result; ``text`` should already be the short summary."""
+        self._reserve(self._size + 1)
+        emotions = emotions or {}
+        self._data[self._size] = (self._size, score, CATEGORY_CODES[category], subjectivity,
+                                  *(emotions.get(name, 0) for name in EMOTIONS))
+        self._texts[self._size] = text
+        self._size += 1
+        self.version += 1
+
+    def extend(self, results):
+        # results are (text, score, category, subjectivity, emotions) tuples
+        for result in results:
+            self.append(*result)
+
+    def clear(self):
+        self._data = np.zeros(INITIAL_CAPACITY, dtype=DTYPE)
+        self._texts = np.empty(INITIAL_CAPACITY, dtype=object)
+        self._size = 0
+        self.version += 1
+
+    def columns(self):
+        # float columns in the shape the comparison chart reads
+        rows = self.rows
+        columns = {name: rows[name].astype(np.float64) for name in ("score", "subjectivity") + EMOTIONS}
+        columns["timestamp"] = [None] * len(rows)
+        return columns
+
+    def select(self, categories=None, min_score=None, max_score=None, query=None,
+               sort="index", descending=False):
+        """Row indexes that pass the filters, in the requested order."""
+        rows = self.rows
+        mask = np.ones(len(rows), dtype=bool)
+        if categories is not None:
+            codes = [CATEGORY_CODES[category] for category in categories]
+            mask &= np.isin(rows["category"], codes)
+        if min_score is not None:
+            mask &= rows["score"] >= min_score
+        if max_score is not None:
+            mask &= rows["score"] <= max_score
+        if query:
+            # only the surviving rows are searched
+            query = query.lower()
+            candidates = np.flatnonzero(mask)
+            mask[candidates] = [query in self._texts[i].lower() for i in candidates]
+        selected = np.flatnonzero(mask)
+        if sort != "index":
+            keys = rows[sort][selected]
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            return selected[order]
+        return selected[::-1] if descending else selected
+
+    def top_k(self, k=5, column="score", largest=True):
+        """Indexes of the k rows with the largest (or smallest) ``column``."""
+        values = self.rows[column]
+        k = min(k, len(values))
+        if not k:
+            return np.empty(0, dtype=np.intp)
+        keys = -values if largest else values
+        if k < len(values):
+            candidates = np.argpartition(keys, k - 1)[:k]
+        else:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(keys[candidates], kind="stable")]
+
+    def records(self, indexes):
+        # plain dicts for the given rows, for rendering a page of details
+        rows = self.rows[indexes]
+        return [{
+            "number": int(row["index"]) + 1,
+            "text": self._texts[row["index"]],
+            "score": float(row["score"]),
+            "category": CATEGORIES[row["category"]],
+            "subjectivity": float(row["subjectivity"]),
+            "emotions": {name: float(row[name]) for name in EMOTIONS},
+        } for row in rows]
+
+    def category_counts(self):
+        counts = np.bincount(self.rows["category"], minlength=len(CATEGORIES))
+        return dict(zip(CATEGORIES, counts.tolist()))
+
+
+def page_count(total, page_size=PAGE_SIZE):
+    return max(1, -(-total // page_size))
+
+
+def page_slice(indexes, page, page_size=PAGE_SIZE):
+    # indexes on the 1-based page, pages past the end are clamped
+    page = min(max(page, 1), page_count(len(indexes), page_size))
+    return indexes[(page - 1) * page_size:page * page_size]
+
+
+def box_stats(values):
+    """Quartiles and Tukey fences of ``values`` for a precomputed box plot."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return None
+    q1, median, q3 = np.percentile(values, (25, 50, 75))
+    spread = 1.5 * (q3 - q1)
+    inside = values[(values >= q1 - spread) & (values <= q3 + spread)]
+    return {"q1": q1, "median": median, "q3": q3, "mean": float(values.mean()),
+            "lowerfence": float(inside.min()), "upperfence": float(inside.max())}
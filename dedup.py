@@ -0,0 +1,288 @@
+"""Group exact and near-duplicate texts so each group is scored once.
+
+Texts are normalized the way the result cache does it (NFC, line endings,
+surrounding whitespace) and hashed for exact matches, so only texts that
+score the same are exact duplicates. Near duplicates are found with MinHash
+signatures over token shingles and an LSH index of banded signatures;
+candidates sharing a band are confirmed by the signature similarity, an
+estimate of the Jaccard similarity of the two shingle sets.
+
+The index keeps at most ``max_groups`` groups and forgets the least recently
+matched ones first, so memory stays bounded on an endless stream.
+"""
+import functools
+import hashlib
+import re
+import zlib
+from collections import OrderedDict, namedtuple
+from itertools import islice
+
+import numpy as np
+
+from cache import normalize_text
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_MAX_GROUPS = 100000
+# shingles hashed per block when building a signature, bounds memory on long texts
+SHINGLE_BLOCK = 4096
+
+# words and runs of punctuation, so "!!" or ":(" tell texts apart
+_TOKEN = re.compile(r"\w+|[^\w\s]+")
+
+# exact digest plus MinHash signature (None for byte-level fingerprints of files)
+Fingerprint = namedtuple("Fingerprint", ["digest", "signature"])
+# kind is "new", "exact" or "near"; similarity is 1.0 for new and exact matches
+Match = namedtuple("Match", ["group", "kind", "similarity"])
+
+
+@functools.lru_cache(maxsize=8)
+def _permutations(num_perm, seed):
+    # multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits, with odd a
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def _shingle_hashes(word_hashes, counts, size):
+    # word k-gram hashes for every text, combined from the per-word CRC32s with
+    # a rolling polynomial over the whole batch; returns (shingles, offsets)
+    # where a text shorter than ``size`` gets one shingle of all its words
+    hashes = np.array(word_hashes, dtype=np.uint64)
+    combined = {}
+    for width in {min(size, count) for count in counts if count}:
+        values = np.zeros(len(hashes) - width + 1, dtype=np.uint64)
+        for offset in range(width):
+            values = (values * np.uint64(1000003) + hashes[offset:len(hashes) - width + 1 + offset]) \
+                & np.uint64(0xFFFFFFFF)
+        combined[width] = values
+
+    pieces, offsets, start, total = [], [], 0, 0
+    for count in counts:
+        if count:
+            width = min(size, count)
+            piece = combined[width][start:start + count - width + 1]
+            pieces.append(piece)
+            offsets.append(total)
+            total += len(piece)
+        else:
+            offsets.append(-1)
+        start += count
+    return (np.concatenate(pieces) if pieces else hashes[:0]), offsets
+
+
+def fingerprint_batch(texts, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+    """Exact digest and MinHash signature for each of ``texts``.
+
+    The shingles of the whole batch are permuted together and reduced per
+    text with ``np.minimum.reduceat``, so the NumPy call overhead is paid
+    once per batch rather than once per text.
+    """
+    digests, word_hashes, counts = [], [], []
+    for text in texts:
+        normalized = normalize_text(text)
+        digests.append(hashlib.blake2b(normalized.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+        tokens = _TOKEN.findall(normalized)
+        word_hashes.extend(zlib.crc32(token.encode("utf-8", "surrogatepass")) for token in tokens)
+        counts.append(len(tokens))
+
+    shingles, offsets = _shingle_hashes(word_hashes, counts, shingle_size)
+    starts = [offset for offset in offsets if offset >= 0]
+    signatures = np.empty((len(starts), num_perm), dtype=np.uint32)
+    if starts:
+        a, b = _permutations(num_perm, seed)
+        ends = starts[1:] + [len(shingles)]
+        # texts are reduced a block of shingles at a time so long batches stay bounded
+        first = 0
+        while first < len(starts):
+            last = first + 1
+            while last < len(starts) and ends[last] - starts[first] <= SHINGLE_BLOCK:
+                last += 1
+            block = shingles[None, starts[first]:ends[last - 1]]
+            permuted = a * block
+            permuted += b
+            permuted >>= np.uint64(32)
+            bounds = np.array(starts[first:last]) - starts[first]
+            signatures[first:last] = np.minimum.reduceat(permuted, bounds, axis=1).T
+            first = last
+
+    results, row = [], 0
+    for digest, offset in zip(digests, offsets):
+        if offset < 0:
+            results.append(Fingerprint(digest, None))
+        else:
+            results.append(Fingerprint(digest, signatures[row]))
+            row += 1
+    return results
+
+
+def fingerprint(text, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+    """Exact digest and MinHash signature of ``text``.
+
+    A module level function so worker processes can fingerprint texts and
+    send back only the small result.
+    """
+    return fingerprint_batch([text], num_perm=num_perm, shingle_size=shingle_size, seed=seed)[0]
+
+
+def file_fingerprint(data):
+    # exact-only fingerprint of raw document bytes
+    return Fingerprint(hashlib.blake2b(data, digest_size=16).digest(), None)
+
+
+def lsh_params(threshold, num_perm):
+    """(bands, rows) whose LSH curve crosses ``threshold`` closest to it.
+
+    Two texts with Jaccard similarity s share at least one band with
+    probability 1 - (1 - s**rows)**bands; its midpoint is (1/bands)**(1/rows).
+    The midpoint is kept at or below the threshold so near duplicates are
+    rarely missed; the signature check weeds out the extra candidates.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        if midpoint <= threshold and (best is None or midpoint > best[0]):
+            best = (midpoint, bands, rows)
+    return (best[1], best[2]) if best else (num_perm, 1)
+
+
+class Deduplicator:
+    """Streaming index of duplicate groups.
+
+    ``add(text)`` (or ``assign(fingerprint)``) returns the ``Match`` for a
+    text: a new group, or the group it exactly or nearly duplicates. A value
+    stored with ``set_result`` (e.g. the representative's score) is kept
+    with its group until the group is evicted.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                 shingle_size=DEFAULT_SHINGLE_SIZE, max_groups=DEFAULT_MAX_GROUPS, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.options = {"num_perm": num_perm, "shingle_size": shingle_size, "seed": seed}
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.max_groups = max_groups
+        self._groups = OrderedDict()  # group -> (fingerprint, result)
+        self._digests = {}
+        self._buckets = {}
+        self._next_group = 0
+        self.counts = {"new": 0, "exact": 0, "near": 0}
+
+    def __len__(self):
+        return len(self._groups)
+
+    def settings(self):
+        # everything that decides the groups, two indexes with equal settings
+        # fed the same texts end up identical
+        return {"threshold": self.threshold, "max_groups": self.max_groups, **self.options}
+
+    def fingerprint(self, text):
+        return fingerprint(text, **self.options)
+
+    def add(self, text):
+        return self.assign(self.fingerprint(text))
+
+    def add_batch(self, texts):
+        # matches for several texts, fingerprinted together
+        return [self.assign(fp) for fp in fingerprint_batch(texts, **self.options)]
+
+    def _band_keys(self, signature):
+        # hashed to plain ints to keep the index small, a rare clash only adds
+        # a candidate that the signature check then rejects
+        rows = self.rows
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def _near(self, signature):
+        # best confirmed candidate among the groups sharing a band
+        candidates = {self._buckets[key] for key in self._band_keys(signature) if key in self._buckets}
+        best, best_similarity = None, 0.0
+        for group in candidates:
+            other = self._groups[group][0].signature
+            similarity = float(np.mean(other == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = group, similarity
+        return best, best_similarity
+
+    def assign(self, fp):
+        group = self._digests.get(fp.digest)
+        if group is not None:
+            match = Match(group, "exact", 1.0)
+        else:
+            group, similarity = (None, 0.0) if fp.signature is None else self._near(fp.signature)
+            if group is not None:
+                match = Match(group, "near", similarity)
+            else:
+                match = Match(self._insert(fp), "new", 1.0)
+        if match.kind != "new":
+            self._groups.move_to_end(match.group)
+        self.counts[match.kind] += 1
+        return match
+
+    def _insert(self, fp):
+        group = self._next_group
+        self._next_group += 1
+        self._groups[group] = (fp, None)
+        self._digests[fp.digest] = group
+        if fp.signature is not None:
+            for key in self._band_keys(fp.signature):
+                # a newer group takes over a shared bucket
+                self._buckets[key] = group
+        while len(self._groups) > self.max_groups:
+            self._evict()
+        return group
+
+    def _evict(self):
+        group, (fp, _) = self._groups.popitem(last=False)
+        if self._digests.get(fp.digest) == group:
+            del self._digests[fp.digest]
+        if fp.signature is not None:
+            for key in self._band_keys(fp.signature):
+                if self._buckets.get(key) == group:
+                    del self._buckets[key]
+
+    def set_result(self, group, result):
+        if group in self._groups:
+            self._groups[group] = (self._groups[group][0], result)
+
+    def result(self, group, default=None):
+        entry = self._groups.get(group)
+        return default if entry is None or entry[1] is None else entry[1]
+
+    def clear(self):
+        self._groups.clear()
+        self._digests.clear()
+        self._buckets.clear()
+        self.counts = {"new": 0, "exact": 0, "near": 0}
+
+    def summary(self):
+        total = sum(self.counts.values())
+        skipped = self.counts["exact"] + self.counts["near"]
+        return {
+            "records": total,
+            "groups": self.counts["new"],
+            "exact_duplicates": self.counts["exact"],
+            "near_duplicates": self.counts["near"],
+            "scored": self.counts["new"],
+            "skipped": skipped,
+            "saved_fraction": round(skipped / total, 4) if total else 0.0,
+        }
+
+
+def dedupe(texts, dedup=None, batch_size=256):
+    """Yield ``(text, match)`` for each text, streaming through ``dedup``.
+
+    Texts are fingerprinted ``batch_size`` at a time.
+    """
+    dedup = dedup or Deduplicator()
+    texts = iter(texts)
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, dedup.add_batch(batch))
@@ -0,0 +1,105 @@
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+P, R, T, HYPERLINK = W + "p", W + "r", W + "t", W + "hyperlink"
+TC, BR, TYPE = W + "tc", W + "br", W + "type"
+BODY, HDR, FTR, FOOTNOTES = W + "body", W + "hdr", W + "ftr", W + "footnotes"
+
+# run children and their text, same mapping python-docx uses for Run.text
+_RUN_TEXT = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+_PART_NUMBER = re.compile(r"(\d+)")
+
+
+def _part_order(name):
+    match = _PART_NUMBER.search(name)
+    return int(match.group(1)) if match else 0
+
+
+def _iter_part(stream, tables=True):
+    # yield (kind, text) for each paragraph of one xml part, kind is "body"
+    # for top level paragraphs and "table" for paragraphs inside table cells
+    stack = []
+    buffers = []
+    container = None
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            stack.append(tag)
+            if tag == P:
+                buffers.append([])
+            elif container is None and tag in (BODY, HDR, FTR, FOOTNOTES):
+                container = elem
+            continue
+
+        # end event, stack[-1] is this element
+        parent = stack[-2] if len(stack) > 1 else None
+        if parent == R and buffers:
+            grandparent = stack[-3]
+            # only runs directly in the paragraph (or in a hyperlink in it) count,
+            # which skips text boxes and tracked insertions like python-docx does
+            if grandparent == P or (grandparent == HYPERLINK and stack[-4] == P):
+                if tag == T:
+                    buffers[-1].append(elem.text or "")
+                elif tag == BR:
+                    if elem.get(TYPE, "textWrapping") == "textWrapping":
+                        buffers[-1].append("\n")
+                elif tag in _RUN_TEXT:
+                    buffers[-1].append(_RUN_TEXT[tag])
+        elif tag == P:
+            text = "".join(buffers.pop())
+            # paragraphs nested in another paragraph live in text boxes
+            if not buffers:
+                in_table = TC in stack
+                if not in_table:
+                    yield "body", text
+                elif tables:
+                    yield "table", text
+
+        stack.pop()
+        # drop finished top level elements so memory stays flat
+        if container is not None and stack and stack[-1] == container.tag:
+            container.clear()
+
+
+def iter_docx_paragraphs(docx_file, tables=True, headers=True, footnotes=True):
+    """Yield paragraph text from a DOCX file as the XML is parsed.
+
+    Body paragraphs (and, with ``tables``, table cell paragraphs) come in
+    document order, followed by non-empty header, footer and footnote
+    paragraphs. Nothing but the zip index is loaded up front.
+    """
+    try:
+        archive = zipfile.ZipFile(docx_file)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Error processing DOCX: {str(e)}")
+
+    with archive:
+        names = set(archive.namelist())
+        if "word/document.xml" not in names:
+            raise ValueError("Error processing DOCX: word/document.xml is missing")
+
+        with archive.open("word/document.xml") as stream:
+            for _, text in _iter_part(stream, tables=tables):
+                yield text
+
+        extra = []
+        if headers:
+            extra += sorted((n for n in names if re.match(r"word/header\d*\.xml$", n)), key=_part_order)
+            extra += sorted((n for n in names if re.match(r"word/footer\d*\.xml$", n)), key=_part_order)
+        if footnotes and "word/footnotes.xml" in names:
+            extra.append("word/footnotes.xml")
+
+        for name in extra:
+            with archive.open(name) as stream:
+                for _, text in _iter_part(stream, tables=tables):
+                    if text.strip():
+                        yield text
+
+
+def extract_docx_text(docx_file, **options):
+    # join the streamed paragraphs once, same layout as the old += loop
+    return "\n".join(iter_docx_paragraphs(docx_file, **options)).strip()
@@ -0,0 +1,255 @@
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+
+# bump this whenever the scoring logic changes so cached results get dropped
+SCORER_VERSION = "2"
+
+VADER_LEXICON = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+
+# the vader lexicon ships with the repo, never download it at runtime
+BUNDLED_NLTK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nlkt_data")
+
+_nltk_data_ready = False
+_nltk_data_lock = threading.Lock()
+
+
+def ensure_nltk_data():
+    # point nltk at the bundled data once and check the lexicon is there
+    global _nltk_data_ready
+    if _nltk_data_ready:
+        return
+    with _nltk_data_lock:
+        if _nltk_data_ready:
+            return
+        import nltk
+
+        if BUNDLED_NLTK_DATA not in nltk.data.path:
+            nltk.data.path.append(BUNDLED_NLTK_DATA)
+        try:
+            nltk.data.find(VADER_LEXICON)
+        except LookupError:
+            raise LookupError(
+                f"VADER lexicon not found in {BUNDLED_NLTK_DATA} or the NLTK data path"
+            )
+        _nltk_data_ready = True
+
+
+class LatencyStats:
+    """Track the cold (first) call and a window of warm per-call latencies."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._warm = deque(maxlen=window)
+        self.cold_ms = None
+        self.load_ms = None
+        self.warm_calls = 0
+        self._warm_total = 0.0
+
+    def record(self, elapsed_ms, cold=False):
+        with self._lock:
+            if cold and self.cold_ms is None:
+                self.cold_ms = elapsed_ms
+                return
+            self.warm_calls += 1
+            self._warm_total += elapsed_ms
+            self._warm.append(elapsed_ms)
+
+    def report(self):
+        with self._lock:
+            warm = sorted(self._warm)
+            total = self._warm_total
+            calls = self.warm_calls
+            cold = self.cold_ms
+            load = self.load_ms
+
+        def pct(p):
+            if not warm:
+                return None
+            return warm[min(len(warm) - 1, int(p / 100 * len(warm)))]
+
+        return {
+            "load_ms": load,
+            "cold_ms": cold,
+            "warm_calls": calls,
+            "warm_mean_ms": total / calls if calls else None,
+            "warm_p50_ms": pct(50),
+            "warm_p95_ms": pct(95),
+            "warm_p99_ms": pct(99),
+        }
+
+
+class SentimentEngine:
+    """Loads the VADER and TextBlob/pattern analyzers once and reuses them.
+
+    Both analyzers only read their lexicons after loading, so one engine can
+    be shared between threads; loading itself is guarded by a lock.
+    """
+
+    def __init__(self, use_compiled=True, fused=True):
+        self.use_compiled = use_compiled
+        self.fused = fused
+        self._load_lock = threading.Lock()
+        self._vader = None
+        self._pattern = None
+        self._fused = None
+        self._fingerprint = None
+        self.latency = LatencyStats()
+
+    @property
+    def loaded(self):
+        return self._vader is not None
+
+    def load(self):
+        # parse the lexicons once, the first caller pays for it
+        if self._vader is not None:
+            return self
+        with self._load_lock:
+            if self._vader is not None:
+                return self
+            start = time.perf_counter()
+            ensure_nltk_data()
+            vader = pattern = None
+            if self.use_compiled:
+                # memory-mapped lexicon indexes shared by every process on the box
+                import lexicon_index
+
+                vader_lexicon = lexicon_index.load_vader_lexicon()
+                pattern_lexicon = lexicon_index.load_pattern_lexicon()
+                if vader_lexicon is not None and pattern_lexicon is not None:
+                    vader = lexicon_index.mapped_vader_analyzer(vader_lexicon)
+                    pattern = lexicon_index.mapped_pattern_sentiment(pattern_lexicon)
+
+            if vader is None:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                import textblob.en
+
+                vader = SentimentIntensityAnalyzer(VADER_LEXICON)
+                pattern = textblob.en.sentiment
+                # the pattern lexicon is a lazy dict, force it to load now while
+                # we hold the lock instead of racing on it later
+                pattern("good")
+
+            if self.fused:
+                from fused import FusedScorer
+
+                self._fused = FusedScorer(vader, pattern)
+            self._pattern = pattern
+            self._vader = vader
+            self.latency.load_ms = (time.perf_counter() - start) * 1000
+        return self
+
+    def polarity(self, text):
+        # textblob polarity and subjectivity, same as TextBlob(text).sentiment
+        self.load()
+        with metrics.stage("textblob"):
+            return tuple(self._pattern(text))
+
+    def vader_scores(self, text):
+        self.load()
+        with metrics.stage("vader"):
+            return self._vader.polarity_scores(text)
+
+    def scores(self, text):
+        # ((polarity, subjectivity), vader scores), tokenizing the text only
+        # once when the fused path is on (see fused.py for its tolerance)
+        self.load()
+        if self._fused is not None:
+            return self._fused.scores(text)
+        return self.polarity(text), self.vader_scores(text)
+
+    def fused_scorer(self):
+        # the loaded FusedScorer, None when the engine scores on the exact path
+        self.load()
+        return self._fused
+
+    def analyze_emotions(self, text):
+        # break down emotions using vader sentiment analysis
+        if not text.strip():
+            return None, None
+        return self._emotions(self.vader_scores(text))
+
+    def _emotions(self, scores):
+        # adjust scores to percentages for better readability
+        emotion_scores = {
+            'joy': max(min((scores['pos'] * 100), 100), 0),
+            'sadness': max(min((scores['neg'] * 100), 100), 0),
+            'neutral': max(min((scores['neu'] * 100), 100), 0)
+        }
+
+        # figure out which emotion dominates
+        dominant_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0]
+
+        return emotion_scores, dominant_emotion
+
+    def analyze_sentiment(self, text):
+        # analyze the text for overall sentiment and subjectivity
+        if not text.strip():
+            return None, None, None, None
+
+        cold = not self.loaded
+        start = time.perf_counter()
+
+        (polarity, subjectivity), vader = self.scores(text)
+        result = self.result_from_scores(polarity, subjectivity, vader)
+        self.latency.record((time.perf_counter() - start) * 1000, cold=cold)
+        return result
+
+    def result_from_scores(self, polarity, subjectivity, vader):
+        # the analyze_sentiment result for pattern's polarity and subjectivity
+        # and vader's scores, scaled and classified
+
+        # scale polarity to a range of 0-100
+        score = (polarity + 1) * 50
+
+        # classify sentiment into positive, negative, or neutral
+        if polarity > 0.1:
+            category = "positive"
+        elif polarity < -0.1:
+            category = "negative"
+        else:
+            category = "neutral"
+
+        # calculate subjectivity percentage
+        subjectivity = subjectivity * 100
+
+        # include a breakdown of emotions
+        emotion_scores, dominant_emotion = self._emotions(vader)
+        return score, category, subjectivity, emotion_scores
+
+    def latency_report(self):
+        return self.latency.report()
+
+    def fingerprint(self):
+        # identify the scorer version, the scoring path and the exact lexicons
+        # it reads, anything cached under a different fingerprint is stale
+        if self._fingerprint is None:
+            ensure_nltk_data()
+            import nltk
+            import textblob.en
+
+            digest = hashlib.sha256(SCORER_VERSION.encode())
+            digest.update(f"fused={self.fused} compiled={self.use_compiled}".encode())
+            digest.update(nltk.data.load(VADER_LEXICON, format="raw"))
+            with open(textblob.en.sentiment._path, "rb") as f:
+                digest.update(f.read())
+            self._fingerprint = f"{SCORER_VERSION}-{digest.hexdigest()[:16]}"
+        return self._fingerprint
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    # one shared engine per process
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SentimentEngine()
+    return _engine
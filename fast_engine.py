@@ -0,0 +1,407 @@
+"""Approximate, vectorized scorer for high-volume batches.
+
+    python -m fast_engine                       # agreement report on the bundled review sample
+    python -m fast_engine reviews.jsonl --limit 5000
+    python -m fast_engine --synthetic           # on generated templated text instead
+
+Tokens are whitespace split once per text and hashed (CRC32) into a sparse
+vocabulary built from the TextBlob/pattern and VADER lexicons, so the whole
+batch becomes one array of vocabulary rows. Scoring is then a handful of
+sparse-matrix x weight-vector products (``np.bincount`` over the row array)
+plus neighbour masks for negations, modifiers and boosters, the rules both
+analyzers apply to the word right before a lexicon word.
+
+It keeps the 0-100 score, the category thresholds and the joy/sadness/neutral
+shape of analyze_sentiment, but skips the rest of the rule sets (caps
+emphasis, "but" clauses, emoticon and sarcasm patterns), so individual scores
+are approximate. ``agreement_report`` measures how far it is from the exact
+engine on a corpus. The generated benchmark corpus reuses a small vocabulary
+and one sentence template, so figures on it flatter the fast engine; the
+bundled ``benchmarks/reviews_sample.jsonl`` holds hand-written review
+sentences in ordinary phrasing and is the default for the report.
+"""
+import argparse
+import json
+import string
+import sys
+import threading
+import time
+import zlib
+from array import array
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from batch import CATEGORIES, CATEGORY_CODES, EMPTY_CODE, scores_from_raw
+
+MEMO_SIZE = 262144
+# tokens scored per vectorized block
+BLOCK_TOKENS = 65536
+
+# rows 0 and 1 of the vocabulary are the unknown word and the one character
+# token, which pattern skips and VADER drops before scoring
+UNKNOWN, SHORT = 0, 1
+# memoized token values carry the row in the low bits and the number of
+# exclamation marks in the token above them
+ROW_BITS = 24
+ROW_MASK = (1 << ROW_BITS) - 1
+MAX_EXCLAMATIONS = 8
+
+# VADER constants (nltk.sentiment.vader.VaderConstants)
+N_SCALAR = -0.74
+EXCLAMATION_BOOST = 0.292
+QUESTION_BOOST = 0.18
+# pattern scales a negated polarity by this, and the polarity of the last
+# known word before each "!" by PATTERN_EXCLAMATION
+PATTERN_NEGATION = -0.5
+PATTERN_EXCLAMATION = 1.25
+
+# hand-written reviews, not produced by benchmarks.corpus
+REVIEW_SAMPLE = Path(__file__).resolve().parent / "benchmarks" / "reviews_sample.jsonl"
+SYNTHETIC_SEED = 20240607
+
+_PUNCTUATION = string.punctuation
+
+
+def _hash(word):
+    return zlib.crc32(word.encode("utf-8", "surrogatepass"))
+
+
+def _lexicon_entries():
+    # (vader {word: valence}, pattern {word: (polarity, subjectivity, intensity, modifier)},
+    #  negations, boosters) read from the compiled indexes, or the sources if those are missing
+    import lexicon_index
+    import textblob.en
+    from engine import ensure_nltk_data
+    from nltk.sentiment.vader import VaderConstants
+
+    ensure_nltk_data()
+    vader_lexicon = lexicon_index.load_vader_lexicon()
+    pattern_lexicon = lexicon_index.load_pattern_lexicon()
+    if vader_lexicon is not None:
+        vader = dict(vader_lexicon.items())
+    else:
+        vader = {}
+        for line in lexicon_index.vader_source().decode("utf-8").split("\n"):
+            word, measure = line.strip().split("\t")[0:2]
+            vader[word] = float(measure)
+
+    if pattern_lexicon is not None:
+        pattern = {key: pattern_lexicon.values(i) + (bool(pattern_lexicon.flags(i) & lexicon_index.FLAG_MODIFIER),)
+                   for i, key in enumerate(pattern_lexicon.keys())}
+    else:
+        sentiment = textblob.en.sentiment
+        sentiment.load()
+        pattern = {word: tuple(senses[None]) + ("RB" in senses,) for word, senses in dict.items(sentiment)}
+
+    constants = VaderConstants()
+    negations = set(constants.NEGATE) | set(textblob.en.sentiment.negations)
+    return vader, pattern, negations, dict(constants.BOOSTER_DICT)
+
+
+class _Memo(dict):
+    # whitespace token -> vocabulary row, misses are resolved by hashing
+
+    def __init__(self, resolve):
+        super().__init__()
+        self._resolve = resolve
+
+    def __missing__(self, token):
+        row = self._resolve(token)
+        if len(self) >= MEMO_SIZE:
+            self.clear()
+        self[token] = row
+        return row
+
+
+class FastEngine:
+    """Lexicon-weight scorer that handles whole batches as NumPy arrays.
+
+    Weight vectors are derived from the lexicons on first use (once per
+    process) and only read afterwards, so one engine can be shared between
+    threads.
+    """
+
+    def __init__(self):
+        self._load_lock = threading.Lock()
+        self._hashes = None
+        self._memo = _Memo(self._row)
+
+    @property
+    def loaded(self):
+        return self._hashes is not None
+
+    def load(self):
+        if self._hashes is not None:
+            return self
+        with self._load_lock:
+            if self._hashes is not None:
+                return self
+            vader, pattern, negations, boosters = _lexicon_entries()
+            words = {}
+            for word in list(vader) + list(pattern) + sorted(negations) + sorted(boosters):
+                word = word.lower()
+                if " " in word:
+                    continue
+                # on a hash collision the first word keeps the row
+                words.setdefault(_hash(word), word)
+            hashes = np.array(sorted(words), dtype=np.uint32)
+            size = len(hashes) + 2
+
+            polarity, subjectivity, intensity = np.zeros(size), np.zeros(size), np.ones(size)
+            pattern_hit, modifier = np.zeros(size, bool), np.zeros(size, bool)
+            valence, boost = np.zeros(size), np.zeros(size)
+            negation, counted = np.zeros(size, bool), np.ones(size, bool)
+            counted[SHORT] = False
+            for row, key in enumerate(hashes.tolist(), start=2):
+                word = words[key]
+                if word in pattern:
+                    polarity[row], subjectivity[row], intensity[row], modifier[row] = pattern[word]
+                    pattern_hit[row] = True
+                # boosters only scale their neighbour, VADER scores them as neutral
+                if word in boosters:
+                    boost[row] = boosters[word]
+                else:
+                    valence[row] = vader.get(word, 0.0)
+                negation[row] = word in negations or "n't" in word
+
+            self._polarity, self._subjectivity, self._intensity = polarity, subjectivity, intensity
+            self._pattern_hit, self._modifier = pattern_hit, modifier
+            self._valence, self._boost = valence, boost
+            self._negation, self._counted = negation, counted
+            self._hashes = hashes
+        return self
+
+    def _lookup(self, word):
+        key = _hash(word)
+        i = int(np.searchsorted(self._hashes, key))
+        if i < len(self._hashes) and self._hashes[i] == key:
+            return i + 2
+        return None
+
+    def _row(self, token):
+        # vocabulary row for one lowercased whitespace token, edge punctuation
+        # is stripped the way both analyzers do when the token itself is unknown
+        exclamations = min(token.count("!"), MAX_EXCLAMATIONS) << ROW_BITS
+        if len(token) <= 1:
+            return SHORT | exclamations
+        row = self._lookup(token)
+        if row is None:
+            stripped = token.strip(_PUNCTUATION)
+            row = self._lookup(stripped) if len(stripped) > 1 else None
+        return (UNKNOWN if row is None else row) | exclamations
+
+    def raw_scores_batch(self, texts):
+        """Return (polarity, subjectivity, pos, neg, neu, empty) arrays for ``texts``.
+
+        Same meaning as the raw analyzer outputs batch.scores_from_raw takes.
+        Texts are scored in blocks of about ``BLOCK_TOKENS`` tokens, so memory
+        stays bounded however large the batch is.
+        """
+        self.load()
+        lookup = self._memo.__getitem__
+        blocks = []
+        rows, lengths = array("i"), array("q")
+        exclamations, questions = array("q"), array("q")
+        for text in texts:
+            text = text or ""
+            tokens = text.lower().split()
+            rows.extend(map(lookup, tokens))
+            lengths.append(len(tokens))
+            exclamations.append(text.count("!"))
+            questions.append(text.count("?"))
+            if len(rows) >= BLOCK_TOKENS:
+                blocks.append(self._score_block(rows, lengths, exclamations, questions))
+                rows, lengths = array("i"), array("q")
+                exclamations, questions = array("q"), array("q")
+        if lengths or not blocks:
+            blocks.append(self._score_block(rows, lengths, exclamations, questions))
+        return tuple(np.concatenate(column) for column in zip(*blocks))
+
+    def _score_block(self, rows, lengths, exclamations, questions):
+        count = len(lengths)
+        rows = np.frombuffer(rows, dtype=np.int32) if rows else np.empty(0, dtype=np.int32)
+        bangs = rows >> ROW_BITS
+        rows = rows & ROW_MASK
+        lengths = np.frombuffer(lengths, dtype=np.int64) if count else np.empty(0, dtype=np.int64)
+        doc = np.repeat(np.arange(count), lengths)
+        total = len(rows)
+
+        def before(mask, k):
+            # mask shifted onto the token k places later in the same text
+            out = np.zeros(total, dtype=bool)
+            if total > k:
+                out[k:] = mask[:-k] & (doc[k:] == doc[:-k])
+            return out
+
+        def per_text(weights):
+            return np.bincount(doc, weights=weights, minlength=count)
+
+        negation = self._negation[rows]
+        modifier = self._modifier[rows]
+        hit = self._pattern_hit[rows]
+
+        # pattern: a known modifier right before a known word merges into it
+        # ("very good"), a negation right before it (or before its modifier) flips it
+        modifies = np.zeros(total, dtype=bool)
+        if total > 1:
+            modifies[:-1] = modifier[:-1] & hit[1:] & (doc[1:] == doc[:-1])
+        scale = np.ones(total)
+        scale[1:] = np.where(modifies[:-1], self._intensity[rows[:-1]], 1.0)
+        polarity = np.clip(self._polarity[rows] * scale, -1.0, 1.0)
+        subjectivity = np.clip(self._subjectivity[rows] * scale, -1.0, 1.0)
+        assessed = hit & ~modifies
+        marked = np.flatnonzero(bangs)
+        if len(marked):
+            # each "!" boosts the last known word up to and including its token
+            last = np.maximum.accumulate(np.where(assessed, np.arange(total), -1))[marked]
+            keep = (last >= 0) & (doc[np.maximum(last, 0)] == doc[marked])
+            factor = np.ones(total)
+            np.multiply.at(factor, last[keep], PATTERN_EXCLAMATION ** bangs[marked][keep])
+            polarity = np.clip(polarity * factor, -1.0, 1.0)
+        negated = before(negation, 1) | (before(modifier, 1) & before(negation, 2))
+        polarity = np.where(negated, polarity * PATTERN_NEGATION, polarity)
+        assessments = np.maximum(per_text(assessed), 1)
+        text_polarity = per_text(np.where(assessed, polarity, 0.0)) / assessments
+        text_subjectivity = per_text(np.where(assessed, subjectivity, 0.0)) / assessments
+
+        # vader: boosters add to the next word's magnitude, a negation in the
+        # three words before a word scales it by N_SCALAR
+        valence = self._valence[rows]
+        boost = np.zeros(total)
+        if total > 1:
+            boost[1:] = np.where(doc[1:] == doc[:-1], self._boost[rows[:-1]], 0.0)
+        valence = valence + np.sign(valence) * boost
+        negated = before(negation, 1) | before(negation, 2) | before(negation, 3)
+        valence = np.where(negated, valence * N_SCALAR, valence)
+        counted = self._counted[rows]
+        pos_sum = per_text(np.where(counted & (valence > 0), valence + 1, 0.0))
+        neg_sum = per_text(np.where(counted & (valence < 0), valence - 1, 0.0))
+        neu_count = per_text(counted & (valence == 0))
+
+        # punctuation emphasis goes to whichever side already dominates
+        exclamations = np.frombuffer(exclamations, dtype=np.int64) if count else np.empty(0)
+        questions = np.frombuffer(questions, dtype=np.int64) if count else np.empty(0)
+        emphasis = np.minimum(exclamations, 4) * EXCLAMATION_BOOST
+        emphasis = emphasis + np.where(questions > 3, 0.96,
+                                       np.where(questions > 1, questions * QUESTION_BOOST, 0.0))
+        pos_sum = pos_sum + np.where(pos_sum > -neg_sum, emphasis, 0.0)
+        neg_sum = neg_sum - np.where(pos_sum < -neg_sum, emphasis, 0.0)
+        denominator = pos_sum - neg_sum + neu_count
+        safe = np.where(denominator > 0, denominator, 1.0)
+        pos = np.round(np.abs(pos_sum / safe), 3) * (denominator > 0)
+        neg = np.round(np.abs(neg_sum / safe), 3) * (denominator > 0)
+        neu = np.round(np.abs(neu_count / safe), 3) * (denominator > 0)
+
+        empty = lengths == 0
+        nan = np.where(empty, np.nan, 0.0)
+        return (text_polarity + nan, text_subjectivity + nan, pos + nan, neg + nan, neu + nan, empty)
+
+    def scores(self, text):
+        # ((polarity, subjectivity), vader-shaped scores), like SentimentEngine.scores
+        polarity, subjectivity, pos, neg, neu, _ = self.raw_scores_batch([text])
+        return (float(polarity[0]), float(subjectivity[0])), \
+            {"pos": float(pos[0]), "neg": float(neg[0]), "neu": float(neu[0])}
+
+    def analyze_sentiment(self, text):
+        # same result shape as SentimentEngine.analyze_sentiment
+        if not text.strip():
+            return None, None, None, None
+        columns = scores_from_raw(*self.raw_scores_batch([text]))
+        return (float(columns["score"][0]), CATEGORIES[columns["category"][0]],
+                float(columns["subjectivity"][0]),
+                {name: float(columns[name][0]) for name in ("joy", "sadness", "neutral")})
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_fast_engine():
+    # one shared fast engine per process
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FastEngine()
+    return _engine
+
+
+def agreement_report(texts, fast=None, exact=None):
+    """Compare the fast engine with the exact one on ``texts``.
+
+    Reports category agreement and the confusion matrix (exact category ->
+    fast category counts), mean absolute differences and the correlation of
+    the scores, and the texts per second of each engine.
+    """
+    from batch import analyze_sentiment_batch
+    from engine import get_engine
+
+    texts = list(texts)
+    fast = (fast or get_fast_engine()).load()
+    exact = (exact or get_engine()).load()
+
+    start = time.perf_counter()
+    expected = analyze_sentiment_batch(texts, engine=exact)
+    exact_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = analyze_sentiment_batch(texts, engine=fast)
+    fast_seconds = time.perf_counter() - start
+
+    scored = expected["category"] != EMPTY_CODE
+    confusion = np.zeros((len(CATEGORIES), len(CATEGORIES)), dtype=np.int64)
+    np.add.at(confusion, (expected["category"][scored], actual["category"][scored]), 1)
+
+    def mae(name):
+        return round(float(np.mean(np.abs(expected[name][scored] - actual[name][scored]))), 3) \
+            if scored.any() else None
+
+    scores_exact, scores_fast = expected["score"][scored], actual["score"][scored]
+    correlation = None
+    if len(scores_exact) > 1 and scores_exact.std() and scores_fast.std():
+        correlation = round(float(np.corrcoef(scores_exact, scores_fast)[0, 1]), 4)
+    return {
+        "texts": len(texts),
+        "scored": int(scored.sum()),
+        "category_agreement": round(float(np.trace(confusion) / max(scored.sum(), 1)), 4),
+        "confusion": {name: dict(zip(CATEGORIES, confusion[code].tolist()))
+                      for name, code in CATEGORY_CODES.items()},
+        "score_mae": mae("score"),
+        "score_correlation": correlation,
+        "subjectivity_mae": mae("subjectivity"),
+        "emotion_mae": {name: mae(name) for name in ("joy", "sadness", "neutral")},
+        "exact_texts_per_second": round(len(texts) / exact_seconds, 1) if exact_seconds else None,
+        "fast_texts_per_second": round(len(texts) / fast_seconds, 1) if fast_seconds else None,
+        "speedup": round(exact_seconds / fast_seconds, 1) if fast_seconds else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agreement report of the fast engine against the exact one")
+    parser.add_argument("source", nargs="?", help="JSONL or CSV corpus (default: the bundled review sample)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--limit", type=int, default=5000, help="texts to compare")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use generated templated text; agreement on it is higher than on real text")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        from benchmarks.corpus import make_corpus
+
+        corpus = "synthetic templated text (benchmarks.corpus)"
+        texts = make_corpus(args.limit, sentences=3, seed=SYNTHETIC_SEED)
+    else:
+        from batch_cli import iter_records
+
+        source = args.source or str(REVIEW_SAMPLE)
+        corpus = source
+        texts = [text for _, text in islice(iter_records(source, text_field=args.text_field), args.limit)
+                 if isinstance(text, str)]
+    json.dump(dict(corpus=corpus, **agreement_report(texts)), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
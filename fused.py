@@ -0,0 +1,215 @@
+"""Score polarity, subjectivity and VADER emotions from one tokenization pass.
+
+The exact path tokenizes every text twice: pattern runs its sentence
+tokenizer over the whole string and VADER splits it again, strips edge
+punctuation and builds a punctuation x word product table to do so. Here
+the text is split on whitespace once and each distinct whitespace token is
+mapped, once per process, to both its VADER form and its pattern tokens.
+
+Tolerance: the VADER scores are identical to ``polarity_scores``. Pattern
+tokens are produced per whitespace token, which only matches pattern's own
+tokenizer while no emoticon or sarcasm sequence ("; )", "( ! )") and no
+paragraph break is involved: pattern splits sentences first, so such a
+sequence can come out differently across a sentence boundary. Texts that
+have either are handed to pattern whole, so both paths agree to within
+``TOLERANCE`` on the score scale (0-100); ``tests/test_fused.py`` fuzzes
+the two against each other.
+"""
+import re
+import string
+import threading
+
+import metrics
+
+TOLERANCE = 1e-9
+
+MEMO_SIZE = 65536
+# whitespace tokens on each side of a joint that can hold part of an
+# emoticon or sarcasm mark (the longest is five characters)
+MARK_TOKENS = 5
+# a known word, used to find out whether a modifier or negation is left open
+_PROBE = "good"
+
+_PUNCTUATION = set(string.punctuation)
+# what pattern's find_tokens treats as a paragraph break
+_PARAGRAPH_BREAK = re.compile(r"\n{2,}")
+
+
+def _strip_edge_punctuation(word, punc_list):
+    # what SentiText._words_plus_punc maps "cat," and ",cat" to: the rest must be
+    # a punctuation free word of two or more characters
+    for p in punc_list:
+        if word.startswith(p):
+            rest = word[len(p):]
+            if len(rest) > 1 and not _PUNCTUATION.intersection(rest):
+                return rest
+        if word.endswith(p):
+            rest = word[:-len(p)]
+            if len(rest) > 1 and not _PUNCTUATION.intersection(rest):
+                return rest
+    return word
+
+
+class FusedScorer:
+    """Scores a text with loaded VADER and pattern analyzers from one token stream.
+
+    Token mappings are memoized per process, so repeated vocabulary costs a
+    dict lookup; the memo is dropped once it holds ``MEMO_SIZE`` tokens.
+    """
+
+    def __init__(self, vader, pattern):
+        from nltk.sentiment.vader import SentiText
+        from textblob._text import RE_EMOTICONS, RE_SARCASM, find_tokens
+
+        self._vader = vader
+        self._pattern = pattern
+        self._constants = vader.constants
+        self._sentitext = SentiText
+        self._find_tokens = find_tokens
+        self._emoticons = RE_EMOTICONS
+        self._sarcasm = RE_SARCASM
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def _token(self, word):
+        # (vader word or None, pattern tokens) for one whitespace token
+        entry = self._memo.get(word)
+        if entry is not None:
+            return entry
+        vader_word = None
+        if len(word) > 1:
+            vader_word = _strip_edge_punctuation(word, self._constants.PUNC_LIST)
+        entry = (vader_word, " ".join(self._find_tokens(word)))
+        with self._memo_lock:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[word] = entry
+        return entry
+
+    def tokenize(self, text):
+        """Return (vader words, pattern words) for ``text``.
+
+        The pattern words are None when the text has an emoticon, sarcasm
+        mark or paragraph break, which only pattern's tokenizer gets right.
+        """
+        entries = [self._token(word) for word in text.split()]
+        vader_words = [vader_word for vader_word, _ in entries if vader_word is not None]
+        joined = " ".join(tokens for _, tokens in entries if tokens)
+        joined, sarcasm = self._sarcasm.subn("(!)", joined)
+        joined, emoticons = self._emoticons.subn(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+        if sarcasm or emoticons or _PARAGRAPH_BREAK.search(text.replace("\r\n", "\n")):
+            return vader_words, None
+        return vader_words, joined.lower().split()
+
+    def edges(self, text):
+        """(first, last) pattern tokens of ``text`` that could be part of a mark."""
+        words = text.split()
+        head = [self._token(word)[1] for word in words[:MARK_TOKENS]]
+        tail = [self._token(word)[1] for word in words[-MARK_TOKENS:]]
+        return " ".join(tokens for tokens in head if tokens), " ".join(tokens for tokens in tail if tokens)
+
+    def marks_across(self, tail, head):
+        """Whether an emoticon or sarcasm mark forms where ``tail`` meets ``head``."""
+        joint = f"{tail} {head}"
+        return bool(self._sarcasm.search(joint) or self._emoticons.search(joint))
+
+    def allcaps(self, words):
+        # how many words are in ALL CAPS, VADER's is_cap_diff is
+        # 0 < len(words) - allcaps < len(words)
+        return sum(1 for word in words if word.isupper())
+
+    def valences(self, words, is_cap_diff, start=0, stop=None):
+        """VADER valence of ``words[start:stop]``, each read at its own position.
+
+        The words outside the range are only context, so a piece of a longer
+        text gets the valences it has inside that text when it is passed with
+        the three words before it and the two after it.
+        """
+        vader = self._vader
+        sentitext = self._sentitext.__new__(self._sentitext)
+        sentitext.words_and_emoticons = words
+        sentitext.is_cap_diff = is_cap_diff
+        boosters = self._constants.BOOSTER_DICT
+        valences = []
+        for i in range(start, len(words) if stop is None else stop):
+            item = words[i]
+            lowered = item.lower()
+            if (i < len(words) - 1 and lowered == "kind" and words[i + 1].lower() == "of") \
+                    or lowered in boosters:
+                valences.append(0)
+                continue
+            valences = vader.sentiment_valence(0, sentitext, item, i, valences)
+        return valences
+
+    def vader_from_valences(self, text, words, valences):
+        """polarity_scores for ``text`` from the valences of its words.
+
+        VADER reads a repeated word at its first position, so every later
+        occurrence takes the valence of the first.
+        """
+        first = {}
+        sentiments = [first.setdefault(word, valence) for word, valence in zip(words, valences)]
+        sentiments = self._vader._but_check(words, sentiments)
+        return self._vader.score_valence(sentiments, text)
+
+    def _vader_scores(self, text, words):
+        # SentimentIntensityAnalyzer.polarity_scores with the words precomputed
+        allcaps = self.allcaps(words)
+        return self.vader_from_valences(text, words, self.valences(words, 0 < len(words) - allcaps < len(words)))
+
+    def _known(self, word):
+        # what pattern's assessments take for a known word when there is no tag
+        return word in self._pattern and None in self._pattern[word]
+
+    def assessments(self, words):
+        """pattern's assessments of ``words`` and whether they reach outside them.
+
+        Returns (assessments, reaches_back, reaches_forward). pattern keeps
+        a modifier or negation open across short words, and boosts the last
+        assessment on "!", so pieces can only be scored apart where the
+        first has nothing open at its end and the second has no "!" before
+        its first known word. Words without any known word pass on whatever
+        was open before them and leave a "!" after them to the assessment
+        before them, so they reach both ways.
+        """
+        pattern = self._pattern
+        assessments = pattern.assessments((word, None) for word in words)
+        reaches_back = False
+        for word in words:
+            if self._known(word):
+                break
+            if word == "!":
+                reaches_back = True
+                break
+        last = len(words) - 1
+        while last >= 0 and not self._known(words[last]):
+            last -= 1
+        if last < 0:
+            return assessments, True, True
+        # the state at the end only depends on the words from the last known
+        # one on: a known word after them must start an assessment of its own
+        tail = words[last:]
+        closed = pattern.assessments((word, None) for word in tail)
+        probed = pattern.assessments((word, None) for word in tail + [_PROBE])
+        reaches_forward = len(probed) != len(closed) + 1 or probed[-1][0] != [_PROBE]
+        return assessments, reaches_back, reaches_forward
+
+    def scores(self, text):
+        """Return ((polarity, subjectivity), vader scores) for ``text``."""
+        with metrics.stage("tokenize"):
+            vader_words, pattern_words = self.tokenize(text)
+        with metrics.stage("textblob"):
+            polarity = tuple(self._pattern(text if pattern_words is None else pattern_words))
+        with metrics.stage("vader"):
+            return polarity, self._vader_scores(text, vader_words)
+
+
+def pattern_scores(assessments):
+    # (polarity, subjectivity) from pattern assessments, averaged in the same
+    # order and the same way as pattern's Sentiment.__call__
+    polarity = subjectivity = 0
+    for _, p, s, _ in assessments:
+        polarity += p
+        subjectivity += s
+    count = float(len(assessments) or 1)
+    return polarity / count, subjectivity / count
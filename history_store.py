@@ -0,0 +1,568 @@
+"""Persistent, append-only analysis history in SQLite.
+
+Each analysis is one row of plain columns indexed by timestamp. Appends go
+through a queue to a background writer that commits them in batches, so
+the UI thread never waits on disk to record a result. Reads don't wait for
+the writer either: rows still queued are kept in memory and merged into
+every query's result. Queries hand back
+columns (NumPy arrays) rather than per-row dicts, and charts read a time
+bucketed aggregate so even millions of rows come back as a few hundred
+points.
+
+Rows (and trend state) belong to an owner. The app gives every browser
+its own owner through ``get_session_history``, so one visitor never sees
+another's analyses; setting ``SENTIMENT_SHARED_HISTORY`` makes every
+session read and write one shared history instead. Owners that have not
+written anything for ``IDLE_OWNER_SECONDS`` are pruned, rows and trend.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from trend import TrendEngine
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".sentiment-analyzer", "history.sqlite")
+WRITE_BATCH = 512
+DEFAULT_BUCKETS = 500
+# owner of rows written without one, and of every session's rows when
+# the history is shared
+SHARED_OWNER = ""
+# owners (other than the shared one) that wrote nothing for this long are
+# deleted when the store is opened and once a day after that
+IDLE_OWNER_SECONDS = 90 * 24 * 3600
+PRUNE_INTERVAL_SECONDS = 24 * 3600
+# trends kept in memory, the least recently used are dropped (their state
+# is saved with the rows)
+MAX_LIVE_TRENDS = 1024
+_OWNER_ID = re.compile(r"[0-9a-f]{32}")
+# a batch that fails to commit (database locked, disk full) is retried this
+# many times, RETRY_DELAY seconds apart, and then dropped
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = ("score", "subjectivity", "joy", "sadness", "neutral")
+EMOTIONS = ("joy", "sadness", "neutral")
+
+# timestamps are stored as seconds since this naive epoch so they come back
+# as the same wall clock times they went in as
+_EPOCH = datetime(1970, 1, 1)
+
+_STOP = object()
+
+
+def to_seconds(timestamp):
+    if isinstance(timestamp, datetime):
+        return (timestamp.replace(tzinfo=None) - _EPOCH).total_seconds()
+    return float(timestamp)
+
+
+def _to_datetime64(seconds):
+    return (np.asarray(seconds, dtype=np.float64) * 1000).astype("datetime64[ms]")
+
+
+def _columns(rows, names):
+    # transpose sqlite rows into a dict of numpy columns
+    columns = {}
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    for name, column in zip(names, values):
+        if name == "timestamp":
+            columns[name] = _to_datetime64(column)
+        elif name in ("category", "text"):
+            columns[name] = np.array(column, dtype=object)
+        elif name == "count":
+            columns[name] = np.array(column, dtype=np.int64)
+        else:
+            columns[name] = np.array([np.nan if v is None else v for v in column], dtype=np.float64)
+    return columns
+
+
+class HistoryStore:
+    """Analysis history that outlives the Streamlit session.
+
+    ``append`` only enqueues; a writer thread commits queued rows in
+    batches. Queued rows are also kept in a pending list until they are
+    committed, and reads combine the database with it, so a query sees
+    everything appended before it without waiting for the writer. ``version`` grows with every
+    append and can key caches of anything derived from the history.
+    ``trend`` is a TrendEngine fed by every append; its state is saved
+    with each written batch and restored when the store is reopened.
+
+    The store's own methods read and write the shared owner's rows,
+    ``scoped(owner)`` gives a view of another owner's rows with the same
+    methods. Every batch records when its owners last wrote, and owners
+    idle for ``idle_owner_seconds`` are pruned (None keeps them). A batch
+    that keeps failing to commit is logged and dropped, counted in
+    ``dropped``, and the writer goes on with the next one.
+    """
+
+    owner = SHARED_OWNER
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=WRITE_BATCH, idle_owner_seconds=IDLE_OWNER_SECONDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.idle_owner_seconds = idle_owner_seconds
+        self.version = 0
+        self.dropped = 0  # rows given up on after failed commits
+        self._queue = queue.Queue()
+        self._pending = []  # queued rows, in queue order, until committed
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writer = None
+        self._trend_lock = threading.Lock()
+        self._trends = OrderedDict()
+        self._connect()
+        self._pruned_at = time.monotonic()
+        if idle_owner_seconds is not None:
+            self.prune(idle_owner_seconds)
+        self.trend_for(SHARED_OWNER)
+
+    def _connect(self):
+        # sqlite connections must not be shared across a fork, reopen per process
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "ts REAL NOT NULL, score REAL NOT NULL, category TEXT NOT NULL, "
+            "subjectivity REAL, joy REAL, sadness REAL, neutral REAL, text TEXT, "
+            "owner TEXT NOT NULL DEFAULT '')"
+        )
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(history)")}:
+            # histories written before rows had owners become the shared history
+            conn.execute("ALTER TABLE history ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS history_ts ON history (ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS history_owner_ts ON history (owner, ts)")
+        conn.execute("CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'owners'").fetchone() is None:
+            # owners from before writes were recorded count as active now
+            conn.execute("CREATE TABLE owners (owner TEXT PRIMARY KEY, written REAL NOT NULL)")
+            conn.execute("INSERT INTO owners SELECT DISTINCT owner, ? FROM history WHERE owner != ?",
+                         (time.time(), SHARED_OWNER))
+        conn.commit()
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="history-writer",
+                                                    daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not _STOP]
+            try:
+                if rows:
+                    self._commit_rows(rows)
+                if self.idle_owner_seconds is not None \
+                        and time.monotonic() - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                    self.prune(self.idle_owner_seconds)
+            except Exception:
+                # keep the writer alive for the rows queued after these
+                logger.exception("history writer for %s failed", self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def _commit_rows(self, rows):
+        # write one batch, retrying a failed commit a few times before the
+        # rows are dropped (they are logged, and leave the pending list either way)
+        owners = {row[-1] for row in rows}
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                with self._trend_lock:
+                    trend_states = [(_trend_name(owner), json.dumps(self._trends[owner].to_dict()))
+                                    for owner in owners if owner in self._trends]
+                with self._lock:
+                    conn = self._connect()
+                    try:
+                        conn.executemany(
+                            "INSERT INTO history (ts, score, category, subjectivity, joy, sadness, neutral, "
+                            "text, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                        )
+                        conn.executemany("INSERT OR REPLACE INTO state VALUES (?, ?)", trend_states)
+                        conn.executemany("INSERT OR REPLACE INTO owners VALUES (?, ?)",
+                                         [(owner, time.time()) for owner in owners if owner != SHARED_OWNER])
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    self._drop_pending(rows)
+                return
+            except Exception:
+                if attempt < WRITE_ATTEMPTS:
+                    logger.warning("writing %d history rows to %s failed, retrying", len(rows), self.path,
+                                   exc_info=True)
+                    time.sleep(RETRY_DELAY)
+                    continue
+                logger.exception("dropping %d history rows that could not be written to %s",
+                                 len(rows), self.path)
+                with self._lock:
+                    self._drop_pending(rows)
+                self.dropped += len(rows)
+                self.version += 1
+
+    def _drop_pending(self, rows):
+        # take exactly these rows off the pending list, call with the lock held
+        done = {id(row) for row in rows}
+        self._pending = [row for row in self._pending if id(row) not in done]
+
+    @property
+    def trend(self):
+        return self.trend_for(SHARED_OWNER)
+
+    def scoped(self, owner):
+        """View of ``owner``'s rows, with the same methods as the store."""
+        return self if owner == SHARED_OWNER else HistoryView(self, owner)
+
+    def append(self, entry, owner=SHARED_OWNER):
+        """Queue one history entry (the dict main.py builds) for writing."""
+        emotions = entry.get("emotions") or {}
+        row = (to_seconds(entry.get("timestamp") or datetime.now()), float(entry["score"]),
+               entry["category"], entry.get("subjectivity"),
+               *(emotions.get(name) for name in EMOTIONS), entry.get("text"), owner)
+        trend = self.trend_for(owner)
+        with self._trend_lock:
+            trend.update(row[1])
+        self._ensure_writer()
+        with self._lock:
+            self._pending.append(row)
+            self._queue.put(row)
+        self.version += 1
+
+    def extend(self, entries, owner=SHARED_OWNER):
+        for entry in entries:
+            self.append(entry, owner=owner)
+
+    def flush(self):
+        # block until every queued row is committed
+        self._queue.join()
+
+    def trend_for(self, owner):
+        # the owner's trend engine, loaded on first use
+        with self._trend_lock:
+            trend = self._trends.get(owner)
+            if trend is not None:
+                self._trends.move_to_end(owner)
+                return trend
+        trend = self._load_trend(owner)
+        with self._lock:
+            queued = {row[-1] for row in self._pending}
+        with self._trend_lock:
+            trend = self._trends.setdefault(owner, trend)
+            # drop the least recently used trends, not ones with rows still to save
+            for stale in list(self._trends)[:max(len(self._trends) - MAX_LIVE_TRENDS, 0)]:
+                if stale not in queued and stale != SHARED_OWNER:
+                    del self._trends[stale]
+        return trend
+
+    def _load_trend(self, owner):
+        # saved trend state, or one seeded from the newest rows for stores
+        # written before trends were kept
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM state WHERE name = ?", (_trend_name(owner),)).fetchone()
+        if row is not None:
+            return TrendEngine.from_dict(json.loads(row[0]))
+        trend = TrendEngine()
+        rows = self._query("SELECT score FROM (SELECT ts, score FROM history WHERE owner = ? "
+                           "ORDER BY ts DESC LIMIT ?) ORDER BY ts", (owner, max(trend.windows)))
+        return trend.extend(score for (score,) in rows)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _pending_rows(self, owner, start=None, end=None):
+        # the owner's still queued rows in the window, without the owner;
+        # call with the lock held so a row being committed is seen only once
+        low = to_seconds(start) if start is not None else -np.inf
+        high = to_seconds(end) if end is not None else np.inf
+        return [row[:-1] for row in self._pending if row[-1] == owner and low <= row[0] < high]
+
+    def _read(self, sql, params, owner, start=None, end=None):
+        # rows from the database plus the queued rows, taken together
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+            return rows, self._pending_rows(owner, start, end)
+
+    def __len__(self):
+        return self.count()
+
+    def count(self, owner=SHARED_OWNER):
+        rows, pending = self._read("SELECT COUNT(*) FROM history WHERE owner = ?", (owner,), owner)
+        return rows[0][0] + len(pending)
+
+    def _where(self, start, end, owner):
+        clauses, params = ["owner = ?"], [owner]
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(to_seconds(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(to_seconds(end))
+        return " WHERE " + " AND ".join(clauses), params
+
+    def window(self, start=None, end=None, limit=None, offset=0, owner=SHARED_OWNER):
+        """Raw columns for rows with start <= timestamp < end, oldest first.
+
+        With ``limit``, only the newest ``limit`` rows after skipping the
+        ``offset`` newest ones.
+        """
+        names = ("timestamp", "score", "category", "subjectivity") + EMOTIONS + ("text",)
+        where, params = self._where(start, end, owner)
+        sql = f"SELECT ts, score, category, subjectivity, joy, sadness, neutral, text FROM history{where}"
+        if limit is not None:
+            # newest `limit` rows of the window, still returned oldest first;
+            # the skipped ones are read too since queued rows may fall among them
+            sql = f"SELECT * FROM ({sql} ORDER BY ts DESC LIMIT ?) ORDER BY ts"
+            params.append(int(limit) + int(offset))
+        else:
+            sql += " ORDER BY ts"
+        rows, pending = self._read(sql, params, owner, start, end)
+        if pending:
+            rows = sorted(rows + pending, key=lambda row: row[0])
+        if limit is not None:
+            rows = rows[max(len(rows) - int(limit) - int(offset), 0):len(rows) - int(offset)]
+        return _columns(rows, names)
+
+    def latest(self, n, owner=SHARED_OWNER):
+        return self.window(limit=n, owner=owner)
+
+    def recent_entries(self, n=10, offset=0, owner=SHARED_OWNER):
+        # newest first, as the dicts main.py shows in "Recent Analyses",
+        # ``offset`` skips that many newer entries to reach later pages
+        columns = self.window(limit=n, offset=offset, owner=owner)
+        entries = []
+        for i in range(len(columns["score"]) - 1, -1, -1):
+            entries.append({
+                "text": columns["text"][i],
+                "score": float(columns["score"][i]),
+                "category": columns["category"][i],
+                "subjectivity": float(columns["subjectivity"][i]),
+                "emotions": {name: float(columns[name][i]) for name in EMOTIONS
+                             if not np.isnan(columns[name][i])},
+                "timestamp": columns["timestamp"][i].astype(datetime),
+            })
+        return entries
+
+    def downsample(self, start=None, end=None, buckets=DEFAULT_BUCKETS, owner=SHARED_OWNER):
+        """Per time bucket averages over the window, at most ``buckets`` rows.
+
+        Returns the same columns as window() (minus text and category) plus
+        ``count``, the number of analyses behind each point. Windows with no
+        more rows than buckets come back unaggregated.
+        """
+        where, params = self._where(start, end, owner)
+        with self._lock:
+            # one consistent read of the database and the queued rows
+            return self._downsample(where, params, self._pending_rows(owner, start, end), buckets)
+
+    def _downsample(self, where, params, pending, buckets):
+        conn = self._connect()
+
+        def query(sql, params):
+            return conn.execute(sql, params).fetchall()
+
+        names = ("timestamp",) + NUMERIC_COLUMNS + ("count",)
+        columns = ", ".join(NUMERIC_COLUMNS)
+        low, high, total = query(f"SELECT MIN(ts), MAX(ts), COUNT(*) FROM history{where}", params)[0]
+        if pending:
+            times = [row[0] for row in pending] + ([low, high] if total else [])
+            low, high, total = min(times), max(times), total + len(pending)
+        if not total or total <= buckets:
+            rows = query(f"SELECT ts, {columns}, 1 FROM history{where} ORDER BY ts", params)
+            # queued rows have the history columns in table order
+            rows += [(row[0], row[1], row[3], row[4], row[5], row[6], 1) for row in pending]
+            return _columns(sorted(rows, key=lambda row: row[0]), names)
+        width = (high - low) / buckets or 1.0
+        bucket = f"MIN(CAST((ts - ?) / ? AS INTEGER), {buckets - 1})"
+        if not pending:
+            averages = ", ".join(f"AVG({name})" for name in NUMERIC_COLUMNS)
+            rows = query(
+                f"SELECT AVG(ts), {averages}, COUNT(*) FROM history{where} "
+                f"GROUP BY {bucket} ORDER BY 1",
+                params + [low, width],
+            )
+            return _columns(rows, names)
+
+        # per bucket sums and counts, so queued rows can be added in before
+        # averaging; a column's average skips its NULLs like AVG does
+        sums = ", ".join(f"SUM({name}), COUNT({name})" for name in NUMERIC_COLUMNS)
+        totals = {row[0]: [0.0 if value is None else value for value in row[1:]] for row in query(
+            f"SELECT {bucket}, SUM(ts), {sums}, COUNT(*) FROM history{where} GROUP BY 1",
+            [low, width] + params,
+        )}
+        for row in pending:
+            index = min(int((row[0] - low) / width), buckets - 1)
+            entry = totals.setdefault(index, [0.0] + [0.0, 0] * len(NUMERIC_COLUMNS) + [0])
+            entry[0] += row[0]
+            for i, value in enumerate((row[1], row[3], row[4], row[5], row[6])):
+                if value is not None:
+                    entry[1 + 2 * i] += value
+                    entry[2 + 2 * i] += 1
+            entry[-1] += 1
+        rows = sorted(
+            (entry[0] / entry[-1],
+             *(entry[1 + 2 * i] / entry[2 + 2 * i] if entry[2 + 2 * i] else None
+               for i in range(len(NUMERIC_COLUMNS))),
+             entry[-1])
+            for entry in totals.values()
+        )
+        return _columns(rows, names)
+
+    def clear(self, owner=SHARED_OWNER):
+        # forget the owner's rows and trend
+        self.flush()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM history WHERE owner = ?", (owner,))
+            conn.execute("DELETE FROM state WHERE name = ?", (_trend_name(owner),))
+            conn.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+            conn.commit()
+        with self._trend_lock:
+            self._trends[owner] = TrendEngine()
+        self.version += 1
+
+    def prune(self, idle_seconds=IDLE_OWNER_SECONDS):
+        """Delete the rows and trend of every owner idle for ``idle_seconds``.
+
+        The shared history is never pruned. Returns the number of owners removed.
+        """
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            queued = {row[-1] for row in self._pending}
+            conn = self._connect()
+            owners = [(owner,) for (owner,) in conn.execute("SELECT owner FROM owners WHERE written < ?",
+                                                            (cutoff,))
+                      if owner not in queued]
+            conn.executemany("DELETE FROM history WHERE owner = ?", owners)
+            conn.executemany("DELETE FROM state WHERE name = ?", [(_trend_name(owner),) for (owner,) in owners])
+            conn.executemany("DELETE FROM owners WHERE owner = ?", owners)
+            conn.commit()
+            self._pruned_at = time.monotonic()
+        with self._trend_lock:
+            for (owner,) in owners:
+                self._trends.pop(owner, None)
+        if owners:
+            self.version += 1
+        return len(owners)
+
+    def close(self):
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class HistoryView:
+    """One owner's rows of a HistoryStore, with the store's methods."""
+
+    def __init__(self, store, owner):
+        self.store = store
+        self.owner = owner
+
+    @property
+    def path(self):
+        return self.store.path
+
+    @property
+    def version(self):
+        return self.store.version
+
+    @property
+    def trend(self):
+        return self.store.trend_for(self.owner)
+
+    def append(self, entry):
+        self.store.append(entry, owner=self.owner)
+
+    def extend(self, entries):
+        self.store.extend(entries, owner=self.owner)
+
+    def flush(self):
+        self.store.flush()
+
+    def __len__(self):
+        return self.store.count(self.owner)
+
+    def window(self, start=None, end=None, limit=None, offset=0):
+        return self.store.window(start, end, limit, offset, owner=self.owner)
+
+    def latest(self, n):
+        return self.store.latest(n, owner=self.owner)
+
+    def recent_entries(self, n=10, offset=0):
+        return self.store.recent_entries(n, offset, owner=self.owner)
+
+    def downsample(self, start=None, end=None, buckets=DEFAULT_BUCKETS):
+        return self.store.downsample(start, end, buckets, owner=self.owner)
+
+    def clear(self):
+        self.store.clear(owner=self.owner)
+
+
+def _trend_name(owner):
+    # state row holding the owner's trend, the shared one keeps its old name
+    return "trend" if owner == SHARED_OWNER else f"trend:{owner}"
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    # one store per process, SENTIMENT_HISTORY_PATH overrides the location
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(os.environ.get("SENTIMENT_HISTORY_PATH") or DEFAULT_PATH)
+    return _store
+
+
+def shared_history():
+    return os.environ.get("SENTIMENT_SHARED_HISTORY", "").lower() in ("1", "true", "yes")
+
+
+def history_owner(requested=None):
+    # ``requested`` if it is an owner id this module handed out, else a new one
+    if requested and _OWNER_ID.fullmatch(requested):
+        return requested
+    return uuid.uuid4().hex
+
+
+def get_session_history(owner):
+    # the owner's own history, or the shared one when SENTIMENT_SHARED_HISTORY is set
+    return get_history_store().scoped(SHARED_OWNER if shared_history() else owner)
@@ -0,0 +1,322 @@
+"""Compile the VADER and pattern lexicons into memory-mapped binary indexes.
+
+    python -m lexicon_index            # (re)build nlkt_data/compiled/*.lexidx
+
+Layout of a .lexidx file (little endian):
+
+    8 bytes   magic b"LEXIDX1\\0"
+    4 bytes   header length H
+    H bytes   JSON header {"count", "width", "labels", "source_sha256", ...}
+    padding   to an 8 byte boundary
+    float64   values[count * width]
+    uint32    key offsets[count + 1] into the key blob
+    uint8     flags[count]
+    uint8     label ids[count] (0 = no label, else labels[id - 1])
+    bytes     UTF-8 key blob, keys sorted bytewise
+
+Every process that maps the same file shares its pages, and lookups return
+the exact float64 values the original parsers produce.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b"LEXIDX1\0"
+COMPILED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nlkt_data", "compiled")
+VADER_INDEX = os.path.join(COMPILED_DIR, "vader.lexidx")
+PATTERN_INDEX = os.path.join(COMPILED_DIR, "pattern.lexidx")
+
+# pattern words that also carry an adverb ("RB") reading act as modifiers
+FLAG_MODIFIER = 1
+
+MEMO_SIZE = 65536
+
+
+def write_index(path, entries, width, source_sha256, labels=(), meta=None):
+    """Write ``entries`` of (key, values, flags, label) to ``path`` atomically."""
+    entries = sorted(entries, key=lambda entry: entry[0].encode("utf-8"))
+    labels = sorted(set(labels))
+    label_ids = {label: i + 1 for i, label in enumerate(labels)}
+
+    header = json.dumps(dict(meta or {}, count=len(entries), width=width, labels=labels,
+                             source_sha256=source_sha256)).encode("utf-8")
+    blob, offsets = bytearray(), [0]
+    for key, _, _, _ in entries:
+        blob += key.encode("utf-8")
+        offsets.append(len(blob))
+
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % 8)
+    values = [float(v) for _, vals, _, _ in entries for v in vals]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        f.write(struct.pack(f"<{len(values)}d", *values))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(bytes(flags for _, _, flags, _ in entries))
+        f.write(bytes(label_ids.get(label, 0) for _, _, _, label in entries))
+        f.write(bytes(blob))
+    os.replace(tmp, path)
+
+
+class MappedLexicon:
+    """Read-only mapping over a memory-mapped .lexidx file.
+
+    Keys are found by binary search over the sorted key table. Recent
+    lookups (hits and misses) are memoized per process, so hot words cost
+    a dict lookup while the bulk of the lexicon stays in shared pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a lexicon index")
+        (header_len,) = struct.unpack_from("<I", self._mm, 8)
+        self.header = json.loads(self._mm[12:12 + header_len])
+        self.count = count = self.header["count"]
+        self.width = width = self.header["width"]
+        self.labels = self.header["labels"]
+
+        start = 12 + header_len
+        start += -start % 8
+        view = memoryview(self._mm)
+        values_end = start + 8 * count * width
+        offsets_end = values_end + 4 * (count + 1)
+        self._values = view[start:values_end].cast("d")
+        self._offsets = view[values_end:offsets_end].cast("I")
+        self._flags = view[offsets_end:offsets_end + count]
+        self._label_ids = view[offsets_end + count:offsets_end + 2 * count]
+        self._keys = view[offsets_end + 2 * count:]
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, i):
+        return bytes(self._keys[self._offsets[i]:self._offsets[i + 1]])
+
+    def index(self, key):
+        # position of key in the table, or -1
+        memo = self._memo.get(key)
+        if memo is not None:
+            return memo
+        target = key.encode("utf-8", "surrogatepass")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = lo if lo < self.count and self._key(lo) == target else -1
+        with self._memo_lock:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = found
+        return found
+
+    def values(self, i):
+        return tuple(self._values[i * self.width:(i + 1) * self.width])
+
+    def flags(self, i):
+        return self._flags[i]
+
+    def label(self, i):
+        label_id = self._label_ids[i]
+        return self.labels[label_id - 1] if label_id else None
+
+    def __contains__(self, key):
+        return self.index(key) >= 0
+
+    def __getitem__(self, key):
+        i = self.index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._values[i] if self.width == 1 else self.values(i)
+
+    def get(self, key, default=None):
+        i = self.index(key)
+        if i < 0:
+            return default
+        return self._values[i] if self.width == 1 else self.values(i)
+
+    def keys(self):
+        for i in range(self.count):
+            yield self._key(i).decode("utf-8")
+
+    def items(self):
+        for i, key in enumerate(self.keys()):
+            yield key, self.get(key) if self.width == 1 else self.values(i)
+
+
+class _MappedLabels:
+    # stands in for Sentiment.labeler ({"dammit": "profanity"})
+
+    def __init__(self, lexicon):
+        self._lexicon = lexicon
+
+    def get(self, word, default=None):
+        i = self._lexicon.index(word)
+        return self._lexicon.label(i) if i >= 0 else default
+
+
+def vader_source():
+    # raw bytes of the vader lexicon text file
+    import nltk
+
+    from engine import VADER_LEXICON, ensure_nltk_data
+
+    ensure_nltk_data()
+    return nltk.data.load(VADER_LEXICON, format="raw")
+
+
+def pattern_source_path():
+    import textblob.en
+
+    return textblob.en.sentiment._path
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sha256_file(path):
+    with open(path, "rb") as f:
+        return sha256_bytes(f.read())
+
+
+def compile_vader(path=VADER_INDEX):
+    data = vader_source()
+    # same parsing as SentimentIntensityAnalyzer.make_lex_dict
+    lexicon = {}
+    for line in data.decode("utf-8").split("\n"):
+        word, measure = line.strip().split("\t")[0:2]
+        lexicon[word] = float(measure)
+    entries = [(word, (value,), 0, None) for word, value in lexicon.items()]
+    write_index(path, entries, 1, sha256_bytes(data), meta={"lexicon": "vader"})
+    return path
+
+
+def compile_pattern(path=PATTERN_INDEX):
+    # load the full pattern lexicon once and keep what string scoring reads:
+    # the all-senses average, whether the word has an adverb reading, its label
+    from textblob.en import Sentiment
+
+    source = pattern_source_path()
+    sentiment = Sentiment(path=source, synset="wordnet_id", language="en")
+    sentiment.load()
+    entries = []
+    for word, senses in dict.items(sentiment):
+        flags = FLAG_MODIFIER if "RB" in senses else 0
+        entries.append((word, tuple(senses[None]), flags, sentiment.labeler.get(word)))
+    labels = [label for *_, label in entries if label]
+    write_index(path, entries, 3, _sha256_file(source), labels=labels, meta={"lexicon": "pattern"})
+    return path
+
+
+def _fresh(path, source_sha256):
+    if not os.path.exists(path):
+        return False
+    try:
+        return MappedLexicon(path).header.get("source_sha256") == source_sha256
+    except (ValueError, OSError):
+        return False
+
+
+def load_vader_lexicon(path=VADER_INDEX, build=True):
+    # mapped vader lexicon, compiled on first use; None if that is impossible
+    try:
+        if not _fresh(path, sha256_bytes(vader_source())):
+            if not build:
+                return None
+            compile_vader(path)
+        return MappedLexicon(path)
+    except OSError:
+        return None
+
+
+def load_pattern_lexicon(path=PATTERN_INDEX, build=True):
+    try:
+        if not _fresh(path, _sha256_file(pattern_source_path())):
+            if not build:
+                return None
+            compile_pattern(path)
+        return MappedLexicon(path)
+    except OSError:
+        return None
+
+
+def mapped_vader_analyzer(lexicon):
+    # a SentimentIntensityAnalyzer reading from the mapped lexicon instead of
+    # parsing the text file into a dict
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon_file = None
+    analyzer.lexicon = lexicon
+    analyzer.constants = VaderConstants()
+    return analyzer
+
+
+def mapped_pattern_sentiment(lexicon):
+    """A textblob Sentiment scorer whose word lookups go to the mapped index.
+
+    Only string input is supported, which is all the engine passes in: for
+    strings pattern looks words up without a part-of-speech tag, so the
+    all-senses average and the adverb flag are everything it reads.
+    """
+    import textblob.en
+    from textblob.en import Sentiment
+
+    class MappedSentiment(Sentiment):
+        def load(self, path=None):
+            pass
+
+        def __len__(self):
+            return len(lexicon)
+
+        def __contains__(self, word):
+            return word in lexicon
+
+        def __getitem__(self, word):
+            i = lexicon.index(word)
+            if i < 0:
+                raise KeyError(word)
+            values = lexicon.values(i)
+            if lexicon.flags(i) & FLAG_MODIFIER:
+                return {None: values, "RB": values}
+            return {None: values}
+
+        def get(self, word, default=None):
+            return self[word] if word in lexicon else default
+
+    original = textblob.en.sentiment
+    sentiment = MappedSentiment(
+        path="",
+        synset="wordnet_id",
+        negations=original.negations,
+        modifiers=original.modifiers,
+        modifier=original.modifier,
+        tokenizer=original.tokenizer,
+        language="en",
+    )
+    sentiment.labeler = _MappedLabels(lexicon)
+    return sentiment
+
+
+def main():
+    for build in (compile_vader, compile_pattern):
+        path = build()
+        print(f"wrote {path} ({os.path.getsize(path) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
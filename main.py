@@ -1,14 +1,24 @@
-import nltk
 import streamlit as st
-from datetime import datetime
+import hashlib
+import io
+import uuid
+from datetime import datetime, timedelta
 from utils import (
     analyze_sentiment, get_color_scheme, create_sentiment_chart,
     get_emotion_color, extract_text_from_pdf, extract_text_from_docx,
-    create_comparison_chart, get_text_summary, calculate_trend
+    create_comparison_chart, get_text_summary, calculate_trend,
+    create_document_curve_chart, create_distribution_chart
 )
-
-nltk.data.path.append('nlkt_data')
-nltk.download('vader_lexicon', download_dir='nlkt_data')
+from streaming import cached_document_stream, IncrementalAnalyzer, INCREMENTAL_MIN_CHARS
+from pdf_extract import iter_pdf_pages, parse_page_range
+from docx_extract import iter_docx_paragraphs
+import metrics
+from history_store import get_session_history, history_owner
+from charting import figure_cache
+from comparison import ComparisonTable, CATEGORIES, SORT_COLUMNS, PAGE_SIZE, page_count, page_slice
+from uploads import count_uploads, iter_uploads, process_uploads
+from dedup import Deduplicator
+from rendering import BlockCache, HISTORY_PAGE_SIZE, stylesheet
 
 # set up the page with a nice title, icon, and layout
 st.set_page_config(
@@ -17,15 +27,91 @@ st.set_page_config(
     layout="wide"
 )
 
-# load the custom styles from the css file
+# load the custom styles from the css file, plus the color classes the
+# history and comparison lists use
 with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(f"<style>{f.read()}\n{stylesheet()}</style>", unsafe_allow_html=True)
 
 # initialize some storage for user interactions
-if 'history' not in st.session_state:
-    st.session_state.history = []
-if 'comparison_texts' not in st.session_state:
-    st.session_state.comparison_texts = []
+if 'last_recorded' not in st.session_state:
+    st.session_state.last_recorded = None
+if 'comparison' not in st.session_state:
+    # compared texts live in an array-backed table, its version keys the
+    # cached comparison charts
+    st.session_state.comparison = ComparisonTable()
+if 'comparison_dedup' not in st.session_state:
+    # groups of (near) duplicate compared texts, each remembers its text number
+    st.session_state.comparison_dedup = Deduplicator()
+if 'html_blocks' not in st.session_state:
+    # rendered pages of the history and comparison lists
+    st.session_state.html_blocks = BlockCache()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'incremental' not in st.session_state:
+    st.session_state.incremental = IncrementalAnalyzer()
+if 'history_owner' not in st.session_state:
+    # the history id rides along in the page's address, so a reload or a
+    # bookmarked link comes back to the same history
+    st.session_state.history_owner = history_owner(st.query_params.get("history"))
+if st.query_params.get("history") != st.session_state.history_owner:
+    st.query_params["history"] = st.session_state.history_owner
+# past analyses live in a persistent store, each visitor only sees their own
+# unless SENTIMENT_SHARED_HISTORY is set
+history_store = get_session_history(st.session_state.history_owner)
+
+def run_uploads(files, **options):
+    # extract (and score) uploaded documents in a worker pool, yielding each
+    # result as it finishes while a progress bar counts them off; archive
+    # members are only decompressed as the pool takes them
+    total = count_uploads(files)
+    progress = st.progress(0.0, text=f"Processing {total} documents...")
+    with metrics.stage("process_uploads"):
+        for done, result in enumerate(process_uploads(iter_uploads(files), **options), start=1):
+            progress.progress(min(done / total, 1.0), text=f"Processed {done} of {total} documents")
+            yield result
+    progress.empty()
+
+@st.fragment
+def show_text_details(comparison):
+    # sorting and filtering run on the table's arrays and the page is one
+    # cached html block; as a fragment, changing the page reruns only this
+    st.markdown("### Text Details")
+    filter_cols = st.columns([2, 2, 1, 1])
+    categories = filter_cols[0].multiselect(
+        "Categories", list(CATEGORIES), default=list(CATEGORIES), key="comparison_categories"
+    )
+    query = filter_cols[1].text_input("Search", key="comparison_query")
+    sort = filter_cols[2].selectbox("Sort by", SORT_COLUMNS, key="comparison_sort")
+    descending = filter_cols[3].checkbox("Descending", key="comparison_descending")
+    selected = comparison.select(categories=categories, query=query, sort=sort, descending=descending)
+    pages = page_count(len(selected))
+    page = st.number_input(f"Page (of {pages}, {len(selected)} texts)", min_value=1, max_value=pages,
+                           value=1, step=1, key="comparison_page")
+    with metrics.stage("render_html"):
+        block = st.session_state.html_blocks.comparison_page(comparison, page_slice(selected, page, PAGE_SIZE))
+        st.markdown(block, unsafe_allow_html=True)
+
+@st.fragment
+def show_recent_analyses():
+    # the stored history a page at a time, newest first, as one cached html block
+    st.markdown("### Recent Analyses")
+    total = len(history_store)
+    pages = page_count(total, HISTORY_PAGE_SIZE)
+    page = st.number_input(f"Page (of {pages}, {total} analyses)", min_value=1, max_value=pages,
+                           value=1, step=1, key="history_page")
+    with metrics.stage("render_html"):
+        block = st.session_state.html_blocks.history_page(history_store, min(page, pages))
+        st.markdown(block, unsafe_allow_html=True)
+
+# optional per-stage timing, shown in the performance panel at the bottom;
+# it only switches collection on for this session's runs, other sessions
+# keep their own setting
+show_performance = st.sidebar.checkbox(
+    "Show performance metrics",
+    value=metrics.enabled(),
+    help="Time each processing stage and show the results in a Performance panel"
+)
+metrics.enable_here(show_performance)
 
 # show the main title and a brief explanation of the app
 st.title("✨ Real-time Sentiment Analyzer")
@@ -53,34 +139,104 @@ with tab1:
             st.caption(f"Character count: {char_count}")
 
     with col2:
-        # allow users to upload a document instead of typing
-        st.markdown("### Or upload a document")
-        uploaded_file = st.file_uploader(
-            "Choose a file",
-            type=["pdf", "docx"],
-            help="Upload a PDF or DOCX file for analysis",
+        # allow users to upload documents (or zip archives of them) instead of typing
+        st.markdown("### Or upload documents")
+        uploaded_files = st.file_uploader(
+            "Choose files",
+            type=["pdf", "docx", "zip"],
+            accept_multiple_files=True,
+            help="Upload PDF or DOCX files, or ZIP archives of them, for analysis",
             key="single_upload"
         )
         
-        if uploaded_file is not None:
-            # handle file processing for pdf and docx
-            if uploaded_file.type == "application/pdf":
-                text_input = extract_text_from_pdf(uploaded_file)
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                text_input = extract_text_from_docx(uploaded_file)
+        document_stream = None
+        document_name = None
+        # (content key, function yielding its pages) for the document curve
+        document_source = None
+        if uploaded_files:
+            page_spec = None
+            if any(not f.name.lower().endswith(".docx") for f in uploaded_files):
+                page_spec = st.text_input(
+                    "Pages to analyze (optional)",
+                    key="single_pages",
+                    placeholder="e.g. 40-60",
+                    help="Only extract and analyze these pages of each PDF"
+                )
+            try:
+                pages = parse_page_range(page_spec)
+            except ValueError as e:
+                st.error(str(e))
+                pages = None
+                text_input = None
+                uploaded_files = []
+
+            if len(uploaded_files) == 1 and not uploaded_files[0].name.lower().endswith(".zip"):
+                # one document: extract it right here, big PDFs still get page-parallel extraction
+                uploaded_file = uploaded_files[0]
+                document_name = uploaded_file.name
+                data = uploaded_file.getvalue()
+                document_key = (hashlib.sha256(data).hexdigest(), page_spec)
+                if uploaded_file.name.lower().endswith(".pdf"):
+                    try:
+                        text_input = extract_text_from_pdf(uploaded_file, pages=pages)
+                    except ValueError as e:
+                        st.error(str(e))
+                        text_input = None
+                    document_source = (document_key, lambda: iter_pdf_pages(data, pages=pages))
+                else:
+                    text_input = extract_text_from_docx(uploaded_file)
+                    document_source = (document_key, lambda: iter_docx_paragraphs(io.BytesIO(data)))
+            elif uploaded_files:
+                # several documents: extract them all in a pool, once per set of
+                # uploads, and pick the one to show
+                upload_key = (tuple((getattr(f, "file_id", None), f.name, f.size) for f in uploaded_files),
+                              page_spec)
+                if st.session_state.get("single_documents_key") != upload_key:
+                    documents, failures = {}, []
+                    for result in run_uploads(uploaded_files, pages=pages, score=False, keep_text=True):
+                        if result["error"]:
+                            failures.append((result["name"], result["error"]))
+                        else:
+                            documents[result["name"]] = result["text"]
+                    st.session_state.single_documents = (dict(sorted(documents.items())), failures)
+                    st.session_state.single_documents_key = upload_key
+                documents, failures = st.session_state.single_documents
+                for name, error in failures:
+                    st.warning(f"{name}: {error}")
+                if documents:
+                    document_name = st.selectbox("Document to analyze", list(documents),
+                                                 key="single_document")
+                    text_input = documents[document_name]
+                    document_source = (hashlib.sha256(text_input.encode("utf-8", "surrogatepass")).hexdigest(),
+                                       lambda: [text_input])
+                else:
+                    text_input = None
                 
             if text_input:
                 # let the user know the file was processed
                 st.success("File processed successfully!")
                 char_count = len(text_input)
                 st.caption(f"Character count: {char_count}")
-            else:
+            elif uploaded_files:
                 # show an error if the file couldn't be processed
                 st.error("Failed to process the file. Please ensure it contains readable text.")
 
     # analyze the input text
     if text_input:
-        score, category, subjectivity, emotion_scores = analyze_sentiment(text_input)
+        if document_source is not None:
+            # documents are scored whole (through the result cache) like typed
+            # text; the curve across the document is scored page by page and
+            # cached by the document's content
+            score, category, subjectivity, emotion_scores = analyze_sentiment(text_input)
+            with metrics.stage("analyze_document"):
+                document_stream = cached_document_stream(*document_source)
+        elif len(text_input) >= INCREMENTAL_MIN_CHARS:
+            # long pasted text: only the sentences edited since the last run
+            # are re-scored, the result is the same as scoring it whole
+            with metrics.stage("analyze_incremental"):
+                score, category, subjectivity, emotion_scores = st.session_state.incremental.update(text_input)
+        else:
+            score, category, subjectivity, emotion_scores = analyze_sentiment(text_input)
         
         if score is not None:
             # get the color scheme for the sentiment
@@ -130,18 +286,26 @@ with tab1:
                         unsafe_allow_html=True
                     )
             
-            # keep track of the analysis history
-            if len(st.session_state.history) >= 10:
-                st.session_state.history.pop(0)
-            
-            st.session_state.history.append({
-                "text": get_text_summary(text_input),
-                "score": score,
-                "category": category,
-                "subjectivity": subjectivity,
-                "emotions": emotion_scores,
-                "timestamp": datetime.now()
-            })
+            # show how sentiment moves through longer documents
+            if document_stream is not None:
+                curve = create_document_curve_chart(document_stream)
+                if curve:
+                    st.markdown("### Sentiment Across the Document")
+                    with metrics.stage("plotly_render"):
+                        st.plotly_chart(curve, use_container_width=True)
+
+            # keep track of the analysis history, once per distinct text so
+            # reruns of the page don't record the same analysis again
+            if st.session_state.last_recorded != text_input:
+                st.session_state.last_recorded = text_input
+                history_store.append({
+                    "text": get_text_summary(text_input),
+                    "score": score,
+                    "category": category,
+                    "subjectivity": subjectivity,
+                    "emotions": emotion_scores,
+                    "timestamp": datetime.now()
+                })
 
 with tab2:
     st.markdown("### Comparative Analysis")
@@ -158,74 +322,112 @@ with tab2:
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # allow users to upload files for comparison
-        uploaded_file = st.file_uploader(
-            "Or upload a document",
-            type=["pdf", "docx"],
-            help="Upload a PDF or DOCX file for comparison",
+        # allow users to upload files (or zip archives of them) for comparison
+        uploaded_files = st.file_uploader(
+            "Or upload documents",
+            type=["pdf", "docx", "zip"],
+            accept_multiple_files=True,
+            help="Upload PDF or DOCX files, or ZIP archives of them, for comparison",
             key="comparison_upload"
         )
-        
-        if uploaded_file is not None:
-            # handle file processing for comparison
-            if uploaded_file.type == "application/pdf":
-                comparison_text = extract_text_from_pdf(uploaded_file)
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                comparison_text = extract_text_from_docx(uploaded_file)
     
     with col2:
-        # button to add the current text to the comparison list
+        # button to add the current text (or every uploaded document) to the comparison list
         if st.button("Add to Comparison", help="Add the current text to comparison"):
-            if comparison_text:
-                score, category, subjectivity, emotion_scores = analyze_sentiment(comparison_text)
-                if score is not None:
-                    st.session_state.comparison_texts.append({
-                        "text": get_text_summary(comparison_text),
-                        "score": score,
-                        "category": category,
-                        "subjectivity": subjectivity,
-                        "emotions": emotion_scores,
-                        "timestamp": datetime.now()
-                    })
-                    st.success("Text added to comparison!")
+            dedup = st.session_state.comparison_dedup
+            if uploaded_files:
+                # documents are extracted and scored in a pool and added as each one finishes,
+                # duplicates of texts already in the comparison are left out
+                added, duplicates, failures = 0, [], []
+                live = st.empty()
+                for result in run_uploads(uploaded_files, fingerprint=dedup.options):
+                    if result["error"]:
+                        failures.append((result["name"], result["error"]))
+                        continue
+                    match = dedup.assign(result["fingerprint"])
+                    number = dedup.result(match.group)
+                    if number is not None:
+                        duplicates.append((result["name"], number, match.similarity))
+                        continue
+                    score, category, subjectivity, emotion_scores = result["result"]
+                    st.session_state.comparison.append(
+                        result["summary"], score, category, subjectivity, emotion_scores
+                    )
+                    dedup.set_result(match.group, len(st.session_state.comparison))
+                    added += 1
+                    live.caption(f"Added {result['name']} ({added} so far)")
+                live.empty()
+                if added:
+                    st.success(f"{added} document{'s' if added != 1 else ''} added to comparison!")
+                for name, number, similarity in duplicates:
+                    st.info(f"{name} skipped: it duplicates Text {number} ({similarity:.0%} similar)")
+                for name, error in failures:
+                    st.warning(f"{name}: {error}")
+            elif comparison_text:
+                match = dedup.add(comparison_text)
+                number = dedup.result(match.group)
+                if number is not None:
+                    st.info(f"This text is already in the comparison as Text {number} "
+                            f"({match.similarity:.0%} similar).")
+                else:
+                    score, category, subjectivity, emotion_scores = analyze_sentiment(comparison_text)
+                    if score is not None:
+                        st.session_state.comparison.append(
+                            get_text_summary(comparison_text), score, category, subjectivity, emotion_scores
+                        )
+                        dedup.set_result(match.group, len(st.session_state.comparison))
+                        st.success("Text added to comparison!")
             else:
                 st.error("Please enter some text or upload a file first.")
         
         # button to clear all texts from comparison
         if st.button("Clear Comparison", help="Clear all texts from comparison"):
-            st.session_state.comparison_texts = []
+            st.session_state.comparison.clear()
+            st.session_state.comparison_dedup.clear()
             st.success("Comparison cleared!")
     
     # show the results of the comparison
-    if len(st.session_state.comparison_texts) > 1:
+    comparison = st.session_state.comparison
+    if len(comparison) > 1:
         st.markdown("### Comparison Results")
+        counts = comparison.category_counts()
+        count_cols = st.columns(4)
+        count_cols[0].metric("Texts", len(comparison))
+        for col, name in zip(count_cols[1:], CATEGORIES):
+            col.metric(name.title(), counts[name])
         
-        # create a chart comparing the texts
-        chart = create_comparison_chart(st.session_state.comparison_texts)
-        if chart:
-            st.plotly_chart(chart, use_container_width=True)
+        # create the charts comparing the texts
+        # reuse the figures until the comparison table changes
+        cache_key = (st.session_state.session_id, comparison.version)
+        chart = figure_cache.get_or_build(
+            ("comparison",) + cache_key,
+            lambda: create_comparison_chart(comparison.columns())
+        )
+        distribution = figure_cache.get_or_build(
+            ("distribution",) + cache_key,
+            lambda: create_distribution_chart(comparison.columns())
+        )
+        with metrics.stage("plotly_render"):
+            if distribution:
+                st.plotly_chart(distribution, use_container_width=True)
+            if chart:
+                st.plotly_chart(chart, use_container_width=True)
         
-        # display individual text details
-        st.markdown("### Text Details")
-        for i, item in enumerate(st.session_state.comparison_texts):
-            _, bg_color, text_color = get_color_scheme(item["category"])
-            emotions_html = "".join([
-                f'<span style="color: {get_emotion_color(emotion)};">{emotion.title()}: {int(score)}%</span> | '
-                for emotion, score in item["emotions"].items()
-            ])
-            
-            st.markdown(
-                f"""
-                <div class="history-item" 
-                     style="background-color: {bg_color}; color: {text_color};">
-                    <strong>Text {i+1}:</strong> {item["text"]}<br>
-                    Score: {int(item["score"])} | Category: {item["category"].title()}<br>
-                    <small>{emotions_html}</small>
-                </div>
-                """,
-                unsafe_allow_html=True
+        # the most positive and most negative texts
+        top_cols = st.columns(2)
+        for col, title, largest in ((top_cols[0], "Most Positive", True),
+                                    (top_cols[1], "Most Negative", False)):
+            records = comparison.records(comparison.top_k(5, largest=largest))
+            col.markdown(f"#### {title}")
+            col.dataframe(
+                {"Text": [r["number"] for r in records], "Summary": [r["text"] for r in records],
+                 "Score": [round(r["score"], 1) for r in records]},
+                hide_index=True, use_container_width=True
             )
-    elif len(st.session_state.comparison_texts) == 1:
+        
+        # display individual text details a page at a time
+        show_text_details(comparison)
+    elif len(comparison) == 1:
         # remind the user they need at least two texts
         st.info("Add at least one more text to see the comparison.")
     else:
@@ -233,11 +435,15 @@ with tab2:
         st.info("Add texts using the form above to start comparison.")
 
 # show a summary of recent sentiment analyses and trends
-if st.session_state.history:
+if len(history_store):
     st.markdown("### Sentiment Trend Analysis")
     
-    # calculate and display trends
-    trend, slope = calculate_trend(st.session_state.history)
+    # calculate and display trends, the store keeps its trend estimators
+    # up to date as analyses are recorded
+    trend_summary = history_store.trend.summary()
+    trend, slope = calculate_trend(history_store.trend)
+    confidence = trend_summary["confidence"]
+    long_window = trend_summary["windows"][max(trend_summary["windows"])]
     trend_color = {
         "improving": "#28a745",
         "declining": "#dc3545",
@@ -250,39 +456,68 @@ if st.session_state.history:
                     border-left: 4px solid {trend_color}; margin-bottom: 20px;">
             <strong>Current Trend:</strong> {trend.title()}
             {f' (Rate of change: {slope:.2f} points per analysis)' if trend != 'stable' else ''}
+            {f' &middot; confidence {confidence:.0%}' if confidence is not None else ''}
+            <br><small>Smoothed score {trend_summary["ewma"]:.1f} &plusmn; {trend_summary["ewm_std"]:.1f}
+            &middot; long-run slope {long_window["slope"]:.2f} over the last {long_window["count"]} analyses</small>
         </div>
         """,
         unsafe_allow_html=True
     )
     
-    # show a chart of the sentiment history
-    chart = create_sentiment_chart(st.session_state.history)
+    # show a chart of the sentiment history over the chosen window, the store
+    # averages it into time buckets so the chart stays small
+    history_windows = {
+        "Last hour": timedelta(hours=1),
+        "Last day": timedelta(days=1),
+        "Last week": timedelta(weeks=1),
+        "All time": None
+    }
+    window_label = st.selectbox("History window", list(history_windows), index=3, key="history_window")
+    window = history_windows[window_label]
+    start = datetime.now() - window if window is not None else None
+    # the figure (and the query behind it) is reused until the history grows,
+    # or for sliding windows, until the next minute
+    chart = figure_cache.get_or_build(
+        ("sentiment", history_store.owner, history_store.version, window_label,
+         start.replace(second=0, microsecond=0) if start is not None else None),
+        lambda: create_sentiment_chart(history_store.downsample(start=start))
+    )
     if chart:
-        st.plotly_chart(chart, use_container_width=True)
+        with metrics.stage("plotly_render"):
+            st.plotly_chart(chart, use_container_width=True)
     
     # show details of recent analyses
-    st.markdown("### Recent Analyses")
-    for item in reversed(st.session_state.history):
-        _, bg_color, text_color = get_color_scheme(item["category"])
-        emotions_html = "".join([
-            f'<span style="color: {get_emotion_color(emotion)};">{emotion.title()}: {int(score)}%</span> | '
-            for emotion, score in item.get("emotions", {}).items()
-        ])
-        
-        timestamp_str = item["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-        
-        st.markdown(
-            f"""
-            <div class="history-item" 
-                 style="background-color: {bg_color}; color: {text_color};">
-                <small>{item["text"]}</small><br>
-                Score: {int(item["score"])} | Category: {item["category"].title()}<br>
-                <small>{emotions_html}</small><br>
-                <small>Analyzed at: {timestamp_str}</small>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+    show_recent_analyses()
+
+# per-stage timings collected so far in this process, from every session
+# that has the panel open
+if show_performance:
+    with st.expander("Performance", expanded=True):
+        report = metrics.snapshot()
+        if report["stages"]:
+            st.table([
+                {
+                    "stage": name,
+                    "calls": stats["count"],
+                    "mean ms": round(stats["mean_ms"], 2),
+                    "p50 ms": round(stats["p50_ms"], 2),
+                    "p95 ms": round(stats["p95_ms"], 2),
+                    "max ms": round(stats["max_ms"], 2),
+                    "total ms": round(stats["total_ms"], 1)
+                }
+                for name, stats in report["stages"].items()
+            ])
+        else:
+            st.info("No stages timed yet. Analyze some text to collect timings.")
+        if report["counters"]:
+            st.markdown(" | ".join(f"**{name}**: {value:,}" for name, value in report["counters"].items()))
+        col1, col2, col3 = st.columns(3)
+        col1.download_button("Download JSON", metrics.to_json(), file_name="metrics.json",
+                             mime="application/json")
+        col2.download_button("Download Prometheus", metrics.to_prometheus(), file_name="metrics.prom",
+                             mime="text/plain")
+        if col3.button("Reset metrics"):
+            metrics.reset()
 
 # add a little footer with credits
 st.markdown("---")
@@ -0,0 +1,208 @@
+"""Per-stage timing and volume metrics.
+
+    with metrics.stage("extract_pdf"):
+        ...
+
+    @metrics.timed("chart_sentiment")
+    def create_sentiment_chart(history):
+        ...
+
+    metrics.count("pdf_bytes", len(data))
+
+Collection is off unless SENTIMENT_METRICS=1 is set or enable() is called,
+or enable_here() turns it on for the calling thread only (one Streamlit
+session's script run, say). While off, stage() hands back one shared no-op
+context manager and count() returns straight away, so instrumented code
+pays a flag check and nothing else. Collected data exports as JSON (snapshot) or Prometheus text format.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# upper bounds in seconds, the last bucket (+Inf) catches everything else
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "sentiment"
+
+_enabled = os.environ.get("SENTIMENT_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        # estimate by linear interpolation inside the bucket holding the rank
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+_histograms = {}
+_counters = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enable_here(on=True):
+    # collect (or not) in the calling thread, whatever the process-wide setting
+    _local.enabled = on
+
+
+def _on():
+    return _enabled or getattr(_local, "enabled", False)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def count(name, amount=1):
+    if not _on():
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoOp()
+
+
+def stage(name):
+    """Context manager timing one run of the stage ``name``."""
+    return _Timer(name) if _on() else _NOOP
+
+
+def timed(name):
+    """Decorator timing every call of the function as the stage ``name``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _on():
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Plain dict of every stage histogram and counter, times in milliseconds."""
+    with _lock:
+        stages = {}
+        for name, h in sorted(_histograms.items()):
+            stages[name] = {
+                "count": h.count,
+                "total_ms": h.sum * 1000,
+                "mean_ms": h.sum / h.count * 1000,
+                "p50_ms": h.quantile(0.5) * 1000,
+                "p95_ms": h.quantile(0.95) * 1000,
+                "max_ms": h.max * 1000,
+                "buckets": {("+Inf" if i == len(BUCKETS) else repr(BUCKETS[i])): c
+                            for i, c in enumerate(h.counts)},
+            }
+        return {"enabled": _enabled, "stages": stages, "counters": dict(sorted(_counters.items()))}
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def to_prometheus():
+    """Render the metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        if _histograms:
+            metric = f"{PREFIX}_stage_seconds"
+            lines.append(f"# HELP {metric} Time spent per processing stage.")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, h in sorted(_histograms.items()):
+                cumulative = 0
+                for i, bucket_count in enumerate(h.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if i == len(BUCKETS) else repr(BUCKETS[i])
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {h.sum!r}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {h.count}')
+        for name, value in sorted(_counters.items()):
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
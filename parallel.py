@@ -0,0 +1,116 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from engine import get_engine
+
+MIN_CHUNK = 1
+MAX_CHUNK = 2048
+
+
+def warm_worker():
+    # load the lexicons as soon as the worker starts, not on its first chunk
+    get_engine().load()
+
+
+def _analyze(text):
+    return get_engine().analyze_sentiment(text)
+
+
+def _run_chunk(func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+class ChunkSizer:
+    """Grow or shrink chunks so each one takes about ``target_seconds``.
+
+    Small chunks waste time on pickling and IPC, big ones hurt latency and
+    load balancing near the end of the corpus.
+    """
+
+    def __init__(self, initial=16, target_seconds=0.2, minimum=MIN_CHUNK, maximum=MAX_CHUNK):
+        self.size = initial
+        self.target_seconds = target_seconds
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def update(self, count, elapsed):
+        if count <= 0:
+            return self.size
+        per_item = max(elapsed / count, 1e-6)
+        wanted = int(self.target_seconds / per_item)
+        # move half way towards the new estimate to damp noisy chunks
+        self.size = max(self.minimum, min(self.maximum, (self.size + wanted) // 2 or 1))
+        return self.size
+
+
+def score_corpus(texts, workers=None, ordered=True, chunk_size=None, max_pending=None,
+                 target_chunk_seconds=0.2):
+    """Score an iterable of texts across a process pool.
+
+    Yields ``(index, result)`` pairs where result is what analyze_sentiment
+    returns. The input is consumed lazily and at most ``max_pending`` chunks
+    are in flight, so memory stays flat however long the corpus is. With
+    ``ordered=False`` results are yielded as soon as any chunk finishes.
+    """
+    return map_corpus(_analyze, texts, workers=workers, ordered=ordered, chunk_size=chunk_size,
+                      max_pending=max_pending, target_chunk_seconds=target_chunk_seconds)
+
+
+def map_corpus(func, items, workers=None, ordered=True, chunk_size=None, max_pending=None,
+               target_chunk_seconds=0.2):
+    # same as score_corpus for any picklable top level ``func``
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for index, item in enumerate(items):
+            yield index, func(item)
+        return
+
+    max_pending = max_pending or workers * 2
+    sizer = ChunkSizer(initial=chunk_size or 16, target_seconds=target_chunk_seconds)
+    if chunk_size:
+        # a fixed chunk size turns adaptation off
+        sizer.minimum = sizer.maximum = chunk_size
+
+    source = iter(items)
+    next_index = 0
+    next_to_yield = 0
+    pending = {}
+    done_chunks = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker) as pool:
+        exhausted = False
+        while True:
+            # results waiting for an earlier chunk count against the budget too
+            while not exhausted and len(pending) + len(done_chunks) < max_pending:
+                chunk = list(islice(source, sizer.size))
+                if not chunk:
+                    exhausted = True
+                    break
+                future = pool.submit(_run_chunk, func, chunk)
+                pending[future] = (next_index, len(chunk))
+                next_index += len(chunk)
+
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start, count = pending.pop(future)
+                results, elapsed = future.result()
+                sizer.update(count, elapsed)
+                if ordered:
+                    done_chunks[start] = results
+                else:
+                    for offset, result in enumerate(results):
+                        yield start + offset, result
+
+            # release finished chunks in input order
+            while next_to_yield in done_chunks:
+                results = done_chunks.pop(next_to_yield)
+                for offset, result in enumerate(results):
+                    yield next_to_yield + offset, result
+                next_to_yield += len(results)
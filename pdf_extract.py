@@ -0,0 +1,177 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import ByteLRU
+
+PAGE_CACHE_BYTES = 128 * 1024 * 1024
+# below this many uncached pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 64
+PAGES_PER_TASK = 8
+
+# extracted page text keyed by (file hash, page index)
+_page_cache = ByteLRU(PAGE_CACHE_BYTES)
+
+
+def read_pdf_bytes(pdf_file):
+    # accept a path, raw bytes or any file-like object (e.g. a streamlit upload)
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def parse_page_range(spec):
+    # turn "40-60", "7" or "3-" (1-based, inclusive) into a 0-based range
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    try:
+        if "-" in spec:
+            start, end = spec.split("-", 1)
+            start = int(start) if start.strip() else 1
+            end = int(end) if end.strip() else None
+        else:
+            start = end = int(spec)
+    except ValueError:
+        raise ValueError(f"Invalid page range: {spec!r}")
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Invalid page range: {spec!r}")
+    return range(start - 1, end if end is not None else 10 ** 9)
+
+
+def _open_reader(data):
+    from pypdf import PdfReader
+
+    try:
+        return PdfReader(io.BytesIO(data))
+    except Exception as e:
+        raise ValueError(f"Error processing PDF: {str(e)}")
+
+
+def _page_text(reader, index):
+    # parser errors on a page surface as ValueError, like errors opening the file
+    try:
+        return reader.pages[index].extract_text()
+    except Exception as e:
+        raise ValueError(f"Error processing PDF page {index + 1}: {str(e)}")
+
+
+_worker_reader = None
+
+
+def _init_worker(data):
+    # each worker parses the document structure once and keeps it around
+    global _worker_reader
+    from pypdf import PdfReader
+
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_pages(indexes):
+    return [(i, _page_text(_worker_reader, i)) for i in indexes]
+
+
+def _batches(indexes, size):
+    for start in range(0, len(indexes), size):
+        yield indexes[start:start + size]
+
+
+def _extract_parallel(data, indexes, workers):
+    # page batches are submitted a window at a time and yielded in page order
+    window = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        batches = _batches(indexes, PAGES_PER_TASK)
+        in_flight = []
+        for batch in batches:
+            in_flight.append(pool.submit(_extract_pages, batch))
+            if len(in_flight) >= window:
+                break
+        while in_flight:
+            try:
+                items = in_flight.pop(0).result()
+            except ValueError:
+                raise
+            except Exception as e:
+                # e.g. a worker that couldn't parse the document
+                raise ValueError(f"Error processing PDF: {str(e)}")
+            yield from items
+            batch = next(batches, None)
+            if batch is not None:
+                in_flight.append(pool.submit(_extract_pages, batch))
+
+
+def iter_pdf_pages(pdf_file, pages=None, max_pages=None, max_bytes=None, workers=None,
+                   cache=_page_cache):
+    """Yield the text of each page, one page at a time.
+
+    ``pages`` is an iterable of 0-based page indexes (see parse_page_range).
+    Extraction stops after ``max_pages`` pages or once ``max_bytes`` of UTF-8
+    text has been produced. Pages already extracted from the same file come
+    from the cache; large uncached runs are spread over a process pool.
+    """
+    data = read_pdf_bytes(pdf_file)
+    digest = hashlib.sha256(data).hexdigest()
+
+    # only parse the document structure when something isn't cached yet
+    reader = None
+    total = cache.get((digest, "pages"))
+    if total is None:
+        reader = _open_reader(data)
+        total = len(reader.pages)
+        cache.put((digest, "pages"), total)
+
+    if pages is None:
+        pages = range(total)
+    elif isinstance(pages, range):
+        # open ended ranges from parse_page_range stop at the last page
+        pages = range(pages.start, min(pages.stop, total), pages.step)
+    indexes = [i for i in pages if 0 <= i < total]
+    if max_pages is not None:
+        indexes = indexes[:max_pages]
+
+    missing = {i for i in indexes if (digest, i) not in cache}
+    workers = workers or os.cpu_count() or 1
+    use_pool = workers > 1 and len(missing) >= PARALLEL_MIN_PAGES
+    if use_pool:
+        fresh = _extract_parallel(data, sorted(missing), workers)
+        extracted = {}
+
+    produced = 0
+    for i in indexes:
+        text = cache.get((digest, i))
+        if text is None:
+            if use_pool and i in missing:
+                # pull from the pool until this page arrives
+                while i not in extracted:
+                    index, page_text = next(fresh)
+                    extracted[index] = page_text
+                text = extracted.pop(i)
+            else:
+                if reader is None:
+                    reader = _open_reader(data)
+                text = _page_text(reader, i)
+            cache.put((digest, i), text)
+
+        if max_bytes is not None:
+            size = len(text.encode("utf-8"))
+            if produced + size > max_bytes:
+                remaining = max_bytes - produced
+                text = text.encode("utf-8")[:remaining].decode("utf-8", "ignore")
+                if text:
+                    yield text
+                return
+            produced += size
+        yield text
+
+
+def extract_text_from_pdf(pdf_file, pages=None, max_pages=None, max_bytes=None):
+    """Extract text from a PDF file."""
+    return "\n".join(iter_pdf_pages(pdf_file, pages=pages, max_pages=max_pages,
+                                    max_bytes=max_bytes)).strip()
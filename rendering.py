@@ -0,0 +1,103 @@
+"""Batched HTML for the "Recent Analyses" and "Text Details" lists.
+
+Category and emotion colors are turned into CSS classes once, so an item
+is a few short tags instead of a block of inline styles. A page of items
+is rendered into a single HTML block (one element for the browser rather
+than one per item), and ``BlockCache`` keeps built blocks keyed by the
+data version and page, so an unchanged page is neither rebuilt nor
+changed between reruns.
+"""
+import functools
+import html
+
+from batch import CATEGORIES, EMOTIONS
+from charting import FigureCache
+from utils import get_color_scheme, get_emotion_color
+
+HISTORY_PAGE_SIZE = 10
+BLOCK_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=1)
+def stylesheet():
+    """CSS classes for every category and emotion color, built once."""
+    rules = []
+    for category in CATEGORIES:
+        _, bg_color, text_color = get_color_scheme(category)
+        rules.append(f".item-{category} {{ background-color: {bg_color}; color: {text_color}; }}")
+    for emotion in EMOTIONS + ("other",):
+        rules.append(f".emotion-{emotion} {{ color: {get_emotion_color(emotion)}; }}")
+    return "\n".join(rules)
+
+
+def _category_class(category):
+    # anything unknown gets the neutral colors, like get_color_scheme
+    return f"item-{category if category in CATEGORIES else 'neutral'}"
+
+
+def _text(text):
+    # escaped, on one line so the block stays a single html block in markdown
+    return html.escape(str(text or "")).replace("\r", "").replace("\n", "<br>")
+
+
+def _emotions(emotions):
+    return "".join(
+        f'<span class="emotion-{emotion if emotion in EMOTIONS else "other"}">'
+        f'{html.escape(emotion.title())}: {int(score)}%</span> | '
+        for emotion, score in (emotions or {}).items()
+    )
+
+
+def comparison_item(item):
+    # one text from ComparisonTable.records
+    return (
+        f'<div class="history-item {_category_class(item["category"])}">'
+        f'<strong>Text {item["number"]}:</strong> {_text(item["text"])}<br>'
+        f'Score: {int(item["score"])} | Category: {item["category"].title()}<br>'
+        f'<small>{_emotions(item["emotions"])}</small></div>'
+    )
+
+
+def history_item(item):
+    # one entry from HistoryStore.recent_entries
+    timestamp = item["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
+    return (
+        f'<div class="history-item {_category_class(item["category"])}">'
+        f'<small>{_text(item["text"])}</small><br>'
+        f'Score: {int(item["score"])} | Category: {item["category"].title()}<br>'
+        f'<small>{_emotions(item.get("emotions"))}</small><br>'
+        f'<small>Analyzed at: {timestamp}</small></div>'
+    )
+
+
+def render_block(items, render_item):
+    """One HTML block for a page of ``items``, each drawn by ``render_item``."""
+    return '<div class="item-list">' + "".join(render_item(item) for item in items) + "</div>"
+
+
+class BlockCache(FigureCache):
+    """LRU of rendered page blocks keyed by (list, data version, page).
+
+    Kept per session: the key only changes when the page's contents can,
+    so reruns reuse the same string and the element sent for the page
+    stays byte-for-byte identical.
+    """
+
+    def __init__(self, max_entries=BLOCK_CACHE_SIZE):
+        super().__init__(max_entries=max_entries)
+
+    def comparison_page(self, table, indexes):
+        # ``indexes`` is the page of the table's current selection
+        indexes = list(indexes)
+        return self.get_or_build(
+            ("comparison", table.version, tuple(indexes)),
+            lambda: render_block(table.records(indexes), comparison_item)
+        )
+
+    def history_page(self, store, page, page_size=HISTORY_PAGE_SIZE):
+        # 1-based page of the history, newest entries first
+        return self.get_or_build(
+            ("history", store.path, store.owner, store.version, page, page_size),
+            lambda: render_block(store.recent_entries(page_size, offset=(page - 1) * page_size),
+                                 history_item)
+        )
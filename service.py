@@ -0,0 +1,289 @@
+"""Async HTTP scoring service with micro-batching.
+
+    python -m service --port 8080 --workers 4
+
+Endpoints:
+    GET  /health        queue depth and batching stats
+    POST /score         {"text": "..."}        -> one result
+    POST /score/batch   {"texts": ["...", ...]} -> {"results": [...]}
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from engine import get_engine
+from parallel import warm_worker
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_TEXTS = 1000
+MAX_HEADER_BYTES = 16 * 1024
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def result_row(result):
+    score, category, subjectivity, emotions = result
+    row = {"score": score, "category": category, "subjectivity": subjectivity}
+    row.update(emotions or {"joy": None, "sadness": None, "neutral": None})
+    return row
+
+
+def score_texts(texts):
+    # runs in a warm worker, one call per micro-batch
+    engine = get_engine()
+    return [result_row(engine.analyze_sentiment(text)) for text in texts]
+
+
+class Overloaded(Exception):
+    pass
+
+
+class MicroBatcher:
+    """Collects concurrent requests into batches for the worker pool.
+
+    A batch is dispatched once it holds ``max_batch`` texts or ``max_wait``
+    seconds after its first text arrived, whichever comes first. At most
+    ``concurrency`` batches run at once; texts queue up behind them and
+    new work is refused once ``max_queue`` texts are waiting.
+    """
+
+    def __init__(self, executor, max_batch=64, max_wait=0.005, max_queue=10000, concurrency=1):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(concurrency)
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.depth = 0
+        self.batches = 0
+        self.texts = 0
+        self.shed = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, texts):
+        if self.depth + len(texts) > self.max_queue:
+            self.shed += 1
+            raise Overloaded()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        self.depth += len(texts)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # wait for a free worker slot first so texts keep batching meanwhile
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, score_texts, [t for t, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.depth -= len(batch)
+            self.batches += 1
+            self.texts += len(batch)
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth,
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "shed": self.shed,
+        }
+
+
+class ScoringService:
+    def __init__(self, workers=None, use_processes=True, max_batch=64, max_wait=0.005,
+                 max_queue=10000, max_body_bytes=MAX_BODY_BYTES, max_batch_texts=MAX_BATCH_TEXTS):
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.batch_options = dict(max_batch=max_batch, max_wait=max_wait, max_queue=max_queue)
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_texts = max_batch_texts
+        self.executor = None
+        self.batcher = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        if self.use_processes:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=warm_worker)
+            # make sure every worker has loaded its lexicons before taking traffic
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.executor, score_texts, [""])
+                                   for _ in range(self.workers)))
+        else:
+            get_engine().load()
+            self.executor = ThreadPoolExecutor(self.workers)
+        self.batcher = MicroBatcher(self.executor, concurrency=self.workers, **self.batch_options)
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.batcher is not None:
+            await self.batcher.stop()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "headers too large"}, close=True)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = (lines[0].split(" ") + ["", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                close = headers.get("connection", "").lower() == "close"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad content-length"}, close=True)
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, payload, extra = await self._route(method, path, body)
+                await self._respond(writer, status, payload, close=close, headers=extra)
+                if close:
+                    break
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, dict(status="ok", **self.batcher.stats()), None
+        if path not in ("/score", "/score/batch"):
+            return 404, {"error": "not found"}, None
+        if method != "POST":
+            return 405, {"error": "use POST"}, None
+
+        try:
+            data = json.loads(body or b"{}")
+            if path == "/score":
+                texts = [data["text"]]
+            else:
+                texts = data["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise TypeError()
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "expected {\"text\": str} or {\"texts\": [str, ...]}"}, None
+        if len(texts) > self.max_batch_texts:
+            return 413, {"error": f"at most {self.max_batch_texts} texts per request"}, None
+
+        try:
+            results = await self.batcher.submit(texts)
+        except Overloaded:
+            return 503, {"error": "overloaded, retry later"}, {"Retry-After": "1"}
+        except Exception:
+            # e.g. a broken worker pool; answer instead of dropping the connection
+            logger.exception("scoring %d texts failed", len(texts))
+            return 500, {"error": "scoring failed"}, None
+
+        if path == "/score":
+            return 200, results[0], None
+        return 200, {"results": results}, None
+
+    async def _respond(self, writer, status, payload, close=False, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'close' if close else 'keep-alive'}"]
+        for name, value in (headers or {}).items():
+            head.append(f"{name}: {value}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def serve(host, port, **options):
+    service = ScoringService(**options)
+    port = await service.start(host, port)
+    print(f"scoring service listening on http://{host}:{port} with {service.workers} workers", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=10000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_batch=args.max_batch,
+                          max_wait=args.max_wait_ms / 1000, max_queue=args.max_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
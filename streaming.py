@@ -0,0 +1,364 @@
+import hashlib
+import re
+from collections import namedtuple
+
+from cache import ByteLRU, approx_size
+from engine import get_engine
+from fused import pattern_scores
+
+DEFAULT_CHUNK_CHARS = 2000
+DEFAULT_MAX_POINTS = 1000
+# from this many characters on, the text area is scored by IncrementalAnalyzer
+INCREMENTAL_MIN_CHARS = 2000
+RECENT_SENTENCE_BYTES = 8 * 1024 * 1024
+DOCUMENT_CACHE_BYTES = 16 * 1024 * 1024
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# one point on the "sentiment across the document" curve, scores use the
+# same 0-100 scales as analyze_sentiment
+ChunkResult = namedtuple(
+    "ChunkResult",
+    ["index", "start", "chars", "score", "subjectivity", "joy", "sadness", "neutral"],
+)
+
+
+def iter_sentences(pieces, max_chars=DEFAULT_CHUNK_CHARS):
+    # split pages/paragraphs into sentences without joining them first; text
+    # that runs on past max_chars without a sentence end is handed on in
+    # pieces so the carry (and memory) stays bounded
+    if isinstance(pieces, str):
+        pieces = [pieces]
+    carry = ""
+    for piece in pieces:
+        parts = _SENTENCE_END.split(carry + piece)
+        # the last part may continue in the next piece
+        carry = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part.strip()
+        if len(carry) > max_chars:
+            wrapped = list(_wrap(carry, max_chars))
+            carry = wrapped.pop()
+            yield from (part.strip() for part in wrapped if part.strip())
+        if carry:
+            carry += " "
+    if carry.strip():
+        yield carry.strip()
+
+
+def _wrap(sentence, max_chars):
+    # hard-split run-on "sentences" (tables, lists without punctuation) at
+    # spaces, walking an offset so a long input isn't copied over and over
+    start, end = 0, len(sentence)
+    while end - start > max_chars:
+        cut = sentence.rfind(" ", start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield sentence[start:cut]
+        start = cut
+        while start < end and sentence[start].isspace():
+            start += 1
+    if start < end:
+        yield sentence[start:]
+
+
+def iter_chunks(pieces, max_chars=DEFAULT_CHUNK_CHARS):
+    # group sentences into chunks of roughly max_chars so each parse stays small
+    buffer, size = [], 0
+    for long_sentence in iter_sentences(pieces, max_chars):
+        for sentence in _wrap(long_sentence, max_chars):
+            if buffer and size + len(sentence) > max_chars:
+                yield " ".join(buffer)
+                buffer, size = [], 0
+            buffer.append(sentence)
+            size += len(sentence) + 1
+    if buffer:
+        yield " ".join(buffer)
+
+
+def category_for(polarity):
+    # same thresholds as analyze_sentiment
+    if polarity > 0.1:
+        return "positive"
+    elif polarity < -0.1:
+        return "negative"
+    return "neutral"
+
+
+class SentimentAccumulator:
+    """Length-weighted running totals of per-chunk analyzer outputs.
+
+    Chunks can be added and removed again.
+    """
+
+    __slots__ = ("weight", "polarity", "subjectivity", "pos", "neg", "neu")
+
+    def __init__(self):
+        self.weight = 0.0
+        self.polarity = self.subjectivity = 0.0
+        self.pos = self.neg = self.neu = 0.0
+
+    def add(self, raw, weight, sign=1):
+        polarity, subjectivity, pos, neg, neu = raw
+        weight *= sign
+        self.weight += weight
+        self.polarity += polarity * weight
+        self.subjectivity += subjectivity * weight
+        self.pos += pos * weight
+        self.neg += neg * weight
+        self.neu += neu * weight
+
+    def remove(self, raw, weight):
+        self.add(raw, weight, sign=-1)
+
+    def result(self):
+        # combined result with the same shape as analyze_sentiment
+        if self.weight <= 0:
+            return None, None, None, None
+        polarity = self.polarity / self.weight
+        emotion_scores = {
+            'joy': max(min(self.pos / self.weight * 100, 100), 0),
+            'sadness': max(min(self.neg / self.weight * 100, 100), 0),
+            'neutral': max(min(self.neu / self.weight * 100, 100), 0),
+        }
+        return ((polarity + 1) * 50, category_for(polarity),
+                self.subjectivity / self.weight * 100, emotion_scores)
+
+
+def raw_scores(text, engine=None):
+    # polarity, subjectivity and vader pos/neg/neu for one chunk
+    engine = engine or get_engine()
+    (polarity, subjectivity), vader = engine.scores(text)
+    return polarity, subjectivity, vader['pos'], vader['neg'], vader['neu']
+
+
+def _merge_points(a, b):
+    total = a.chars + b.chars
+
+    def mix(x, y):
+        return (x * a.chars + y * b.chars) / total
+
+    return ChunkResult(a.index, a.start, total, mix(a.score, b.score),
+                       mix(a.subjectivity, b.subjectivity), mix(a.joy, b.joy),
+                       mix(a.sadness, b.sadness), mix(a.neutral, b.neutral))
+
+
+class StreamResult:
+    """Document-level result plus the per-chunk curve."""
+
+    def __init__(self, accumulator, chunks, chars):
+        self.score, self.category, self.subjectivity, self.emotions = accumulator.result()
+        self.chunks = chunks
+        self.chars = chars
+
+    def as_tuple(self):
+        return self.score, self.category, self.subjectivity, self.emotions
+
+
+def analyze_sentiment_stream(pieces, max_chunk_chars=DEFAULT_CHUNK_CHARS,
+                             max_points=DEFAULT_MAX_POINTS, engine=None):
+    """Score a document given as an iterable of pages, paragraphs or sentences.
+
+    Each chunk is scored on its own and combined weighted by its length.
+    Only one chunk is held at a time, and once the curve has more than
+    ``max_points`` points neighbouring points are merged pairwise, so memory
+    stays bounded however long the document is.
+    """
+    engine = engine or get_engine()
+    accumulator = SentimentAccumulator()
+    points = []
+    stride = 1  # how many chunks one curve point covers
+    pending = None
+    chars = 0
+
+    for index, chunk in enumerate(iter_chunks(pieces, max_chunk_chars)):
+        raw = raw_scores(chunk, engine)
+        weight = len(chunk)
+        accumulator.add(raw, weight)
+
+        polarity, subjectivity, pos, neg, neu = raw
+        point = ChunkResult(index, chars, weight, (polarity + 1) * 50, subjectivity * 100,
+                            min(pos * 100, 100), min(neg * 100, 100), min(neu * 100, 100))
+        chars += weight + 1
+
+        # fold new chunks into the current point until it covers `stride` chunks
+        pending = point if pending is None else _merge_points(pending, point)
+        if (index + 1) % stride == 0:
+            points.append(pending)
+            pending = None
+        if len(points) > max_points:
+            points = [_merge_points(points[i], points[i + 1]) if i + 1 < len(points) else points[i]
+                      for i in range(0, len(points), 2)]
+            stride *= 2
+
+    if pending is not None:
+        points.append(pending)
+    return StreamResult(accumulator, points, chars)
+
+
+def _stream_size(value):
+    # cached stream results are sized by their curve, keys as they are
+    return approx_size(value.chunks if isinstance(value, StreamResult) else value)
+
+
+_document_cache = ByteLRU(DOCUMENT_CACHE_BYTES, sizeof=_stream_size)
+
+
+def cached_document_stream(key, pieces, engine=None, **options):
+    """analyze_sentiment_stream over ``pieces()``, cached under ``key``.
+
+    ``key`` should name the content, e.g. a hash of the document bytes plus
+    the page selection. ``pieces`` is only called on a miss, so a rerun on
+    the same document doesn't read it again.
+    """
+    engine = engine or get_engine()
+    key = (key, engine.fingerprint(), tuple(sorted(options.items())))
+    result = _document_cache.get(key)
+    if result is None:
+        result = analyze_sentiment_stream(pieces(), engine=engine, **options)
+        _document_cache.put(key, result)
+    return result
+
+
+def _sentence_key(sentence):
+    return hashlib.blake2b(sentence.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+# one sentence of an incrementally analyzed text, tokenized and scored on its own
+_Sentence = namedtuple(
+    "_Sentence",
+    ["vader_words", "allcaps", "pattern_words", "head", "tail",
+     "assessments", "reaches_back", "reaches_forward"],
+)
+
+
+class IncrementalAnalyzer:
+    """Keeps per-sentence work so an edited text only re-scores what changed.
+
+    Each sentence is tokenized once, keyed by a hash of its content, and
+    keeps its pattern assessments and VADER valences. An update joins the
+    kept pieces in order and finishes scoring them the way the fused scorer
+    does the whole text: the assessments are averaged, a repeated word takes
+    the valence of its first occurrence, and "but" and punctuation emphasis
+    are applied across the text, so the result equals analyze_sentiment.
+
+    Sentences only depend on each other at their edges. The VADER valences
+    of a sentence are redone when the three words before it or the two
+    after it change, and sentences pattern reads across (an open "not" or
+    "very" at the end, a "!" before the first known word) are assessed
+    together. Text with an emoticon or sarcasm mark, which pattern tokenizes
+    whole, and engines without the fused scorer score the whole text.
+    """
+
+    def __init__(self, engine=None, max_sentence_chars=DEFAULT_CHUNK_CHARS,
+                 recent_bytes=RECENT_SENTENCE_BYTES):
+        self.engine = engine
+        self.max_sentence_chars = max_sentence_chars
+        self._current = {}  # everything the current text uses
+        self._recent = ByteLRU(recent_bytes)  # recently dropped, makes undo cheap
+        self.scored = 0  # sentences tokenized and scored by the last update
+
+    def _units(self, text):
+        # sentences, run-on ones cut at spaces (never inside a word, so the
+        # pieces have exactly the words of the text)
+        for part in _SENTENCE_END.split(text):
+            if len(part) <= self.max_sentence_chars:
+                if part.strip():
+                    yield part.strip()
+                continue
+            unit, size = [], 0
+            for word in part.split():
+                if unit and size + len(word) > self.max_sentence_chars:
+                    yield " ".join(unit)
+                    unit, size = [], 0
+                unit.append(word)
+                size += len(word) + 1
+            if unit:
+                yield " ".join(unit)
+
+    def _get(self, current, key, build):
+        entry = self._current.get(key)
+        if entry is None:
+            entry = self._recent.get(key)
+            if entry is None:
+                entry = build()
+        current[key] = entry
+        return entry
+
+    def _sentence(self, scorer, unit):
+        vader_words, pattern_words = scorer.tokenize(unit)
+        head, tail = scorer.edges(unit)
+        self.scored += 1
+        if pattern_words is None:
+            return _Sentence(vader_words, 0, None, head, tail, None, False, False)
+        return _Sentence(vader_words, scorer.allcaps(vader_words), pattern_words, head, tail,
+                         *scorer.assessments(pattern_words))
+
+    def update(self, text):
+        """Bring the kept pieces in line with ``text`` and return its result."""
+        engine = self.engine or get_engine()
+        if not text.strip():
+            self.reset()
+            return None, None, None, None
+        scorer = engine.fused_scorer()
+        if scorer is None:
+            return engine.analyze_sentiment(text)
+
+        self.scored = 0
+        current = {}
+        keys, sentences = [], []
+        for unit in self._units(text):
+            key = _sentence_key(unit)
+            keys.append(key)
+            sentences.append(self._get(current, key, lambda: self._sentence(scorer, unit)))
+        result = self._combine(engine, scorer, text, keys, sentences, current)
+
+        # keep what the text no longer uses around for a while (undo)
+        for key, entry in self._current.items():
+            if key not in current:
+                self._recent.put(key, entry)
+        self._current = current
+        return result
+
+    def _combine(self, engine, scorer, text, keys, sentences, current):
+        if any(sentence.pattern_words is None for sentence in sentences) or any(
+                scorer.marks_across(a.tail, b.head) for a, b in zip(sentences, sentences[1:])):
+            return engine.analyze_sentiment(text)
+
+        # vader: valences read with the words around each sentence as context
+        words = [word for sentence in sentences for word in sentence.vader_words]
+        allcaps = sum(sentence.allcaps for sentence in sentences)
+        is_cap_diff = 0 < len(words) - allcaps < len(words)
+        valences = []
+        offset = 0
+        for key, sentence in zip(keys, sentences):
+            end = offset + len(sentence.vader_words)
+            before, after = tuple(words[max(offset - 3, 0):offset]), tuple(words[end:end + 2])
+            valences.extend(self._get(current, (key, before, after, is_cap_diff), lambda: scorer.valences(
+                list(before) + sentence.vader_words + list(after), is_cap_diff,
+                len(before), len(before) + len(sentence.vader_words))))
+            offset = end
+        vader = scorer.vader_from_valences(text, words, valences)
+
+        # pattern: sentences that read across their joint are assessed as one
+        groups = []
+        for key, sentence in zip(keys, sentences):
+            if groups and (groups[-1][-1][1].reaches_forward or sentence.reaches_back):
+                groups[-1].append((key, sentence))
+            else:
+                groups.append([(key, sentence)])
+        assessments = []
+        for group in groups:
+            if len(group) == 1:
+                assessments.extend(group[0][1].assessments)
+                continue
+            group_words = [word for _, sentence in group for word in sentence.pattern_words]
+            assessments.extend(self._get(current, tuple(key for key, _ in group),
+                                         lambda: scorer.assessments(group_words)[0]))
+
+        return engine.result_from_scores(*pattern_scores(assessments), vader)
+
+    def reset(self):
+        self._current = {}
+        self._recent.clear()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from batch import CATEGORIES, EMPTY_CODE, analyze_sentiment_batch, category_names
+from utils import analyze_sentiment
+
+
+TEXTS = [
+    "This is a great day!",
+    "This is a terrible day.",
+    "The meeting is on Tuesday.",
+    "   ",
+]
+
+
+def test_batch_matches_single_analysis():
+    result = analyze_sentiment_batch(TEXTS)
+    for i, text in enumerate(TEXTS[:3]):
+        score, category, subjectivity, emotions = analyze_sentiment(text)
+        assert result["score"][i] == score
+        assert CATEGORIES[result["category"][i]] == category
+        assert result["subjectivity"][i] == subjectivity
+        for emotion in ("joy", "sadness", "neutral"):
+            assert result[emotion][i] == emotions[emotion]
+
+
+def test_batch_marks_empty_texts():
+    result = analyze_sentiment_batch(TEXTS)
+    assert result["category"][3] == EMPTY_CODE
+    assert np.isnan(result["score"][3])
+    assert list(category_names(result["category"])) == ["positive", "negative", "neutral", None]
+
+
+def test_batch_accepts_generators_and_returns_frame():
+    frame = analyze_sentiment_batch((t for t in TEXTS[:2]), as_frame=True)
+    assert list(frame.columns) == ["score", "category", "subjectivity", "joy", "sadness", "neutral"]
+    assert len(frame) == 2
+
+
+def test_batch_handles_no_texts():
+    result = analyze_sentiment_batch([])
+    assert all(len(column) == 0 for column in result.values())
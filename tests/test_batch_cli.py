@@ -0,0 +1,91 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import docx
+
+from batch_cli import Checkpoint, run
+from benchmarks.documents import make_pdf_bytes
+from engine import get_engine
+
+TEXTS = ["This is a great day!", "This is a terrible day.", "", "The meeting is on Tuesday."]
+
+
+def _read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_scores_jsonl_like_analyze_sentiment(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": f"r{i}", "text": t}) + "\n" for i, t in enumerate(TEXTS)))
+    output = tmp_path / "out.jsonl"
+
+    summary = run(str(source), str(output), workers=1)
+
+    rows = _read_jsonl(output)
+    assert [row["id"] for row in rows] == ["r0", "r1", "r2", "r3"]
+    score, category, _, emotions = get_engine().analyze_sentiment(TEXTS[0])
+    assert rows[0]["score"] == score and rows[0]["joy"] == emotions["joy"]
+    assert rows[2]["score"] is None
+    assert summary["records"] == 4 and summary["errors"] == 0
+
+
+def test_scores_csv_to_parquet(tmp_path):
+    import pyarrow.parquet as pq
+
+    source = tmp_path / "in.csv"
+    source.write_text("id,body\n1,This is a great day!\n2,This is a terrible day.\n")
+    run(str(source), str(tmp_path / "out.parquet"), workers=1, text_field="body")
+    table = pq.read_table(str(tmp_path / "out-00000.parquet"))
+    assert table.column("category").to_pylist() == ["positive", "negative"]
+
+
+def test_scores_document_directory_and_reports_errors(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.pdf").write_bytes(make_pdf_bytes(["A great report.", "Really wonderful."]))
+    document = docx.Document()
+    document.add_paragraph("A terrible contract.")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    (tmp_path / "docs" / "b.docx").write_bytes(buffer.getvalue())
+    (tmp_path / "docs" / "c.pdf").write_bytes(b"Not a PDF")
+
+    summary = run(str(tmp_path / "docs"), str(tmp_path / "out.jsonl"), workers=2)
+
+    rows = _read_jsonl(tmp_path / "out.jsonl")
+    assert [row["id"] for row in rows] == ["a.pdf", "b.docx", "c.pdf"]
+    assert rows[0]["category"] == "positive" and rows[1]["category"] == "negative"
+    assert "error" in rows[2]
+    assert summary["errors"] == 1
+    # documents score like the same document uploaded in the app
+    from uploads import extract_upload
+
+    text = extract_upload("a.pdf", (tmp_path / "docs" / "a.pdf").read_bytes())
+    assert rows[0]["score"] == get_engine().analyze_sentiment(text)[0]
+
+
+def test_resume_truncates_partial_output(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps(t) + "\n" for t in TEXTS))
+    output = tmp_path / "out.jsonl"
+    run(str(source), str(output), workers=1, checkpoint_every=2)
+
+    # pretend the run died after the first checkpoint with a torn line
+    first_two = "".join(output.read_text().splitlines(keepends=True)[:2])
+    output.write_text(first_two + '{"id": 2, "sco')
+    checkpoint = Checkpoint(str(output) + ".ckpt")
+    checkpoint.done, checkpoint.offset = 2, len(first_two.encode())
+    checkpoint.save()
+
+    summary = run(str(source), str(output), workers=1, resume=True)
+    assert summary["resumed_from"] == 2 and summary["records"] == 2
+    assert [row["id"] for row in _read_jsonl(output)] == [0, 1, 2, 3]
+
+
+def test_import_does_not_pull_in_streamlit():
+    code = "import sys, batch_cli; sys.exit('streamlit' in sys.modules or 'plotly' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
@@ -0,0 +1,34 @@
+from benchmarks.suite import Case, compare, load_baselines, measure, save_baselines
+
+
+def test_measure_reports_latency_and_memory():
+    case = Case("sum", lambda n: sum(range(n)), [1000, 2000], units=2)
+    result = measure(case, min_time=0.01, min_calls=5)
+    assert result["calls"] >= 5
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert result["units_per_second"] > 0
+    assert result["peak_kib"] >= 0
+
+
+def test_compare_flags_latency_and_memory_regressions():
+    baselines = {"a": {"p50_ms": 10.0, "peak_kib": 1000.0}, "b": {"p50_ms": 10.0, "peak_kib": 1000.0}}
+    results = {
+        "a": {"p50_ms": 12.0, "peak_kib": 1100.0},    # within 25%
+        "b": {"p50_ms": 13.0, "peak_kib": 2000.0},    # both regress
+        "new": {"p50_ms": 99.0, "peak_kib": 99.0},    # no baseline yet
+    }
+    regressions = compare(results, baselines, threshold=0.25)
+    assert len(regressions) == 2
+    assert all(line.startswith("b:") for line in regressions)
+
+
+def test_compare_ignores_noise_on_tiny_timings():
+    baselines = {"fast": {"p50_ms": 0.001, "peak_kib": 0.3}}
+    assert compare({"fast": {"p50_ms": 0.01, "peak_kib": 1.0}}, baselines) == []
+
+
+def test_baselines_round_trip(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    assert load_baselines(path) == {}
+    save_baselines({"a": {"p50_ms": 1.0, "peak_kib": 2.0}}, path)
+    assert load_baselines(path) == {"a": {"p50_ms": 1.0, "peak_kib": 2.0}}
@@ -0,0 +1,61 @@
+import sqlite3
+
+from cache import ByteLRU, ResultCache, normalize_text
+from engine import get_engine
+
+
+def test_normalize_text():
+    assert normalize_text("  café \r\nbar ") == "café \nbar"
+
+
+def test_byte_lru_evicts_by_size():
+    lru = ByteLRU(max_bytes=300, sizeof=lambda value: len(value))
+    lru.put("a", "x" * 100)
+    lru.put("b", "x" * 100)
+    lru.get("a")
+    lru.put("c", "x" * 100)
+    assert "a" in lru and "c" in lru and "b" not in lru
+    assert lru.nbytes <= 300
+    assert lru.stats()["evictions"] == 1
+    assert not lru.put("d", "x" * 1000)
+
+
+def test_result_cache_counts_hits_and_misses():
+    cache = ResultCache()
+    first = cache.analyze("This is a great day!")
+    second = cache.analyze("  This is a great day!\r\n")
+    assert first == second == get_engine().analyze_sentiment("This is a great day!")
+    stats = cache.stats()["memory"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_result_cache_hands_out_copies():
+    cache = ResultCache()
+    cache.analyze("This is a great day!")[3]["joy"] = -1
+    assert cache.analyze("This is a great day!")[3]["joy"] >= 0
+
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    expected = ResultCache(disk_path=path).analyze("This is a terrible day.")
+    cache = ResultCache(disk_path=path)
+    assert cache.analyze("This is a terrible day.") == expected
+    assert cache.stats()["disk"]["hits"] == 1
+
+
+def test_disk_tier_keeps_other_versions_until_stale(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(disk_path=path).analyze("This is a terrible day.")
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO results SELECT 'a', 'old', value, created FROM results")
+        conn.execute("INSERT INTO results SELECT 'b', 'older', value, 0 FROM results WHERE key = 'a'")
+    cache = ResultCache(disk_path=path)
+    # another version's recent rows stay for the processes still using it
+    with sqlite3.connect(path) as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT version FROM results")) == \
+            sorted(["old", cache.version])
+    cache.analyze("This is a terrible day.")
+    assert cache.stats()["disk"]["hits"] == 1
+    cache.disk.vacuum()
+    with sqlite3.connect(path) as conn:
+        assert [row[0] for row in conn.execute("SELECT version FROM results")] == [cache.version]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.corpus import make_history
+from charting import POINT_BUDGET, FigureCache, downsample, lttb_indices, rolling_mean
+from utils import create_comparison_chart, create_sentiment_chart, history_columns
+
+
+def test_lttb_keeps_end_points_and_spikes():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    keep = lttb_indices(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == 9999
+    assert np.all(np.diff(keep) > 0)
+    assert 4321 in keep
+
+
+def test_downsample_leaves_small_series_alone():
+    x, y = downsample(np.arange(10), np.arange(10.0), budget=100)
+    assert list(y) == list(range(10))
+
+
+def test_rolling_mean_matches_pandas():
+    values = np.random.default_rng(0).uniform(0, 100, 50)
+    expected = pd.Series(values).rolling(window=3).mean().to_numpy()
+    np.testing.assert_allclose(rolling_mean(values, 3), expected, equal_nan=True)
+
+
+def test_large_history_chart_is_downsampled_webgl():
+    figure = create_sentiment_chart(history_columns(make_history(100000)))
+    assert len(figure.data) == 6
+    assert all(trace.type == "scattergl" for trace in figure.data)
+    assert all(len(trace.y) <= POINT_BUDGET for trace in figure.data)
+    assert len(figure.to_json()) < 1_000_000
+
+
+def test_small_history_chart_keeps_every_point():
+    history = make_history(20)
+    figure = create_sentiment_chart(history)
+    assert [trace.type for trace in figure.data] == ["scatter"] * 6
+    assert list(figure.data[0].y) == [item["score"] for item in history]
+
+
+def test_comparison_chart_switches_to_lines_for_many_texts():
+    assert all(trace.type == "bar" for trace in create_comparison_chart(make_history(10)).data)
+    figure = create_comparison_chart(make_history(50000))
+    assert all(trace.type == "scattergl" and len(trace.y) <= POINT_BUDGET for trace in figure.data)
+
+
+def test_figure_cache_builds_once_per_key():
+    cache = FigureCache(max_entries=2)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return object()
+
+    first = cache.get_or_build(("chart", 1), build)
+    assert cache.get_or_build(("chart", 1), build) is first
+    cache.get_or_build(("chart", 2), build)
+    cache.get_or_build(("chart", 3), build)
+    cache.get_or_build(("chart", 1), build)
+    assert len(calls) == 4 and cache.hits == 1
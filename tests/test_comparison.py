@@ -0,0 +1,65 @@
+import numpy as np
+
+from batch import CATEGORY_CODES
+from benchmarks.corpus import make_history
+from comparison import ComparisonTable, box_stats, page_count, page_slice
+from utils import create_comparison_chart, create_distribution_chart
+
+
+def make_table(size):
+    table = ComparisonTable(capacity=4)
+    for item in make_history(size, seed=2):
+        table.append(item["text"], item["score"], item["category"], item["subjectivity"], item["emotions"])
+    return table
+
+
+def test_append_grows_and_keeps_rows():
+    table = make_table(300)
+    assert len(table) == 300
+    assert table.rows["index"].tolist() == list(range(300))
+    record = table.records([0])[0]
+    first = make_history(300, seed=2)[0]
+    assert record["number"] == 1 and record["category"] == first["category"]
+    assert record["score"] == np.float32(first["score"])
+    version = table.version
+    table.clear()
+    assert len(table) == 0 and table.version > version
+
+
+def test_select_filters_and_sorts():
+    table = make_table(500)
+    rows = table.rows
+    selected = table.select(categories=["positive"], min_score=60, sort="score", descending=True)
+    assert np.all(rows["score"][selected][:-1] >= rows["score"][selected][1:])
+    expected = np.flatnonzero((rows["category"] == CATEGORY_CODES["positive"]) & (rows["score"] >= 60))
+    assert sorted(selected.tolist()) == expected.tolist()
+    assert table.select(query="TEXT 12").tolist() == [i for i in range(500) if "text 12" in f"text {i}"]
+    assert table.select(descending=True)[0] == 499
+
+
+def test_top_k_matches_full_sort():
+    table = make_table(1000)
+    scores = table.rows["score"]
+    assert table.top_k(5).tolist() == np.argsort(-scores, kind="stable")[:5].tolist()
+    assert table.top_k(5, largest=False).tolist() == np.argsort(scores, kind="stable")[:5].tolist()
+    assert len(ComparisonTable().top_k(5)) == 0
+
+
+def test_pagination():
+    indexes = np.arange(60)
+    assert page_count(60, 25) == 3 and page_count(0, 25) == 1
+    assert page_slice(indexes, 3, 25).tolist() == list(range(50, 60))
+    assert page_slice(indexes, 9, 25).tolist() == list(range(50, 60))
+
+
+def test_distribution_chart_is_summarised():
+    table = make_table(5000)
+    fig = create_distribution_chart(table.columns())
+    histogram = fig.data[0]
+    assert sum(histogram.y) == 5000 and len(histogram.y) == 20
+    box = fig.data[2]
+    stats = box_stats(table.rows["score"])
+    assert box.median[0] == stats["median"]
+    assert stats["lowerfence"] >= stats["q1"] - 1.5 * (stats["q3"] - stats["q1"])
+    # large comparisons are drawn as downsampled lines, not 5000 bar groups
+    assert all(len(trace.x) <= 2000 for trace in create_comparison_chart(table.columns()).data)
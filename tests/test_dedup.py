@@ -0,0 +1,135 @@
+import json
+
+from batch_cli import run
+from benchmarks.corpus import make_corpus
+from dedup import Deduplicator, dedupe, fingerprint, lsh_params
+from engine import get_engine
+
+BASE = ("The delivery was late again and the support team never answered my emails, "
+        "which is really disappointing after three years as a customer.")
+
+
+def test_exact_and_near_duplicates_are_grouped():
+    dedup = Deduplicator(threshold=0.7)
+    new = dedup.add(BASE)
+    exact = dedup.add("  " + BASE + "\n")
+    near = dedup.add(BASE + " Never again.")
+    other = dedup.add("What a lovely product, it works perfectly and arrived early.")
+    assert new.kind == "new" and other.kind == "new" and other.group != new.group
+    assert exact == (new.group, "exact", 1.0)
+    assert near.kind == "near" and near.group == new.group and 0.7 <= near.similarity < 1
+    assert dedup.summary()["skipped"] == 2 and dedup.summary()["groups"] == 2
+
+
+def test_texts_that_score_differently_are_not_duplicates():
+    dedup = Deduplicator()
+    for text in ["I love it :)", "I love it :(", "This is GREAT!!!", "this is great.",
+                 "Such a wonderful product!", "Such a wonderful product!!"]:
+        assert dedup.add(text).kind == "new", text
+
+
+def test_distinct_texts_stay_apart():
+    texts = make_corpus(500, sentences=3, seed=4)
+    matches = [match for _, match in dedupe(texts, Deduplicator(threshold=0.8))]
+    assert sum(match.kind == "new" for match in matches) == len(set(texts))
+
+
+def test_index_is_bounded():
+    dedup = Deduplicator(max_groups=10)
+    for text in make_corpus(50, sentences=2, seed=6):
+        dedup.add(text)
+    assert len(dedup) == 10
+    assert len(dedup._buckets) <= 10 * dedup.bands and len(dedup._digests) == 10
+    assert dedup.add(make_corpus(50, sentences=2, seed=6)[0]).kind == "new"
+
+
+def test_signature_estimates_jaccard():
+    a, b = fingerprint(BASE, num_perm=256), fingerprint(BASE + " Never again.", num_perm=256)
+    assert 0.75 < (a.signature == b.signature).mean() < 1
+    assert fingerprint("").signature is None
+    bands, rows = lsh_params(0.8, 64)
+    assert bands * rows == 64 and (1 / bands) ** (1 / rows) <= 0.8
+
+
+def test_batch_cli_scores_each_group_once(tmp_path):
+    texts = [BASE, "A great day!", BASE + "  ", BASE + " Never again.", "A great day!", ""]
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(texts)))
+    summary = run(str(source), str(tmp_path / "out.jsonl"), workers=1, dedup=Deduplicator(threshold=0.7))
+    with open(tmp_path / "out.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["id"] for row in rows] == list(range(6))
+    assert [row["group"] for row in rows] == [0, 1, 0, 0, 1, 2]
+    assert [row.get("duplicate") for row in rows] == [None, None, "exact", "near", "exact", None]
+    assert rows[3]["score"] == rows[0]["score"] == get_engine().analyze_sentiment(BASE)[0]
+    assert summary["dedup"]["scored"] == 3 and summary["dedup"]["skipped"] == 3
+    assert summary["dedup"]["saved_fraction"] == 0.5
+
+
+def test_batch_cli_resume_keeps_the_groups(tmp_path, monkeypatch):
+    import pytest
+
+    import batch_cli
+
+    texts = [BASE, "A great day!", BASE + "  ", "A great day!", BASE + " Never again.", "Awful."]
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(texts)))
+    run(str(source), str(tmp_path / "whole.jsonl"), workers=1, dedup=Deduplicator(threshold=0.7))
+
+    # an interrupted run got through the first three records
+    source.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(texts[:3])))
+    run(str(source), str(tmp_path / "out.jsonl"), workers=1, dedup=Deduplicator(threshold=0.7))
+    source.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(texts)))
+    with pytest.raises(SystemExit):
+        run(str(source), str(tmp_path / "out.jsonl"), workers=1, resume=True, dedup=Deduplicator())
+    scored = []
+    real_score_record = batch_cli.score_record
+    monkeypatch.setattr(batch_cli, "score_record",
+                        lambda record: scored.append(record[1]) or real_score_record(record))
+    summary = run(str(source), str(tmp_path / "out.jsonl"), workers=1, resume=True,
+                  dedup=Deduplicator(threshold=0.7))
+
+    assert (tmp_path / "out.jsonl").read_text() == (tmp_path / "whole.jsonl").read_text()
+    assert [text for text in scored if text is not None] == ["Awful."]
+    assert summary["dedup"]["records"] == 3 and summary["dedup"]["skipped"] == 2
+
+
+def test_batch_cli_checkpoints_on_duplicate_rows(tmp_path, monkeypatch):
+    import batch_cli
+
+    saved = []
+    real_save = batch_cli.Checkpoint.save
+
+    def save(checkpoint):
+        saved.append(checkpoint.done)
+        real_save(checkpoint)
+
+    monkeypatch.setattr(batch_cli.Checkpoint, "save", save)
+    # every second record duplicates the one before it, and lands on the boundary
+    texts = [text for text in make_corpus(5, sentences=1, seed=3) for _ in range(2)]
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps(t) + "\n" for t in texts))
+    run(str(source), str(tmp_path / "out.jsonl"), workers=1, checkpoint_every=2, dedup=Deduplicator())
+    assert saved[:5] == [2, 4, 6, 8, 10]
+
+
+def test_batch_cli_fast_engine_with_dedup(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps(t) + "\n" for t in ["Good.", " Good.", "Bad."]))
+    run(str(source), str(tmp_path / "out.jsonl"), workers=1, engine="fast", dedup=Deduplicator())
+    with open(tmp_path / "out.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    assert rows[1]["score"] == rows[0]["score"] and rows[1]["duplicate"] == "exact"
+    assert rows[2]["category"] == "negative"
+
+
+def test_uploads_return_fingerprints():
+    from benchmarks.documents import make_docx_bytes
+    from uploads import process_uploads
+
+    data = make_docx_bytes([BASE])
+    items = [("a.docx", data, None), ("b.docx", data, None)]
+    dedup = Deduplicator()
+    results = list(process_uploads(items, workers=1, fingerprint=dedup.options, processes=False))
+    kinds = [dedup.assign(result["fingerprint"]).kind for result in results]
+    assert kinds == ["new", "exact"]
@@ -0,0 +1,57 @@
+import io
+
+import docx
+import pytest
+
+from docx_extract import extract_docx_text, iter_docx_paragraphs
+
+
+def _save(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _python_docx_text(buffer):
+    # the output of the original python-docx based extractor
+    document = docx.Document(buffer)
+    buffer.seek(0)
+    return "\n".join(paragraph.text for paragraph in document.paragraphs).strip()
+
+
+def test_matches_python_docx_on_plain_documents():
+    document = docx.Document()
+    document.add_heading("Supply agreement", 1)
+    document.add_paragraph("The supplier shall deliver\tgreat products.")
+    paragraph = document.add_paragraph("Line one")
+    paragraph.add_run().add_break()
+    paragraph.add_run("line two")
+    document.add_paragraph("")
+    document.add_paragraph("Late delivery is terrible.")
+    buffer = _save(document)
+    assert extract_docx_text(buffer) == _python_docx_text(buffer)
+
+
+def test_includes_tables_headers_and_footers():
+    document = docx.Document()
+    document.add_paragraph("Body text.")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Left cell"
+    table.cell(0, 1).text = "Right cell"
+    document.add_paragraph("After the table.")
+    document.sections[0].header.paragraphs[0].text = "Header text"
+    document.sections[0].footer.paragraphs[0].text = "Footer text"
+    buffer = _save(document)
+
+    paragraphs = list(iter_docx_paragraphs(buffer))
+    assert paragraphs == ["Body text.", "Left cell", "Right cell", "After the table.",
+                          "Header text", "Footer text"]
+    buffer.seek(0)
+    assert list(iter_docx_paragraphs(buffer, tables=False, headers=False)) == [
+        "Body text.", "After the table."]
+
+
+def test_invalid_docx_raises_value_error():
+    with pytest.raises(ValueError):
+        extract_docx_text(io.BytesIO(b"Not a DOCX"))
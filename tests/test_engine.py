@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from textblob import TextBlob
+
+from engine import SCORER_VERSION, SentimentEngine, get_engine
+from utils import analyze_sentiment
+
+
+def test_get_engine_is_shared():
+    assert get_engine() is get_engine()
+
+
+def test_engine_loads_analyzers_once():
+    engine = SentimentEngine()
+    engine.analyze_sentiment("What a lovely morning.")
+    vader, pattern = engine._vader, engine._pattern
+    engine.analyze_sentiment("What a dreadful evening.")
+    assert engine._vader is vader
+    assert engine._pattern is pattern
+
+
+def test_engine_matches_textblob():
+    text = "The service was slow but the food was excellent."
+    score, category, subjectivity, emotions = get_engine().analyze_sentiment(text)
+    blob = TextBlob(text)
+    assert score == (blob.sentiment.polarity + 1) * 50
+    assert subjectivity == blob.sentiment.subjectivity * 100
+    assert set(emotions) == {"joy", "sadness", "neutral"}
+    assert analyze_sentiment(text) == (score, category, subjectivity, emotions)
+
+
+def test_engine_reports_cold_and_warm_latency():
+    engine = SentimentEngine()
+    for _ in range(3):
+        engine.analyze_sentiment("This is a great day!")
+    report = engine.latency_report()
+    assert report["cold_ms"] is not None
+    assert report["load_ms"] is not None
+    assert report["warm_calls"] == 2
+    assert report["warm_p50_ms"] <= report["cold_ms"]
+
+
+def test_engine_is_thread_safe():
+    engine = SentimentEngine()
+    texts = ["This is a great day!", "This is a terrible day."] * 20
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(engine.analyze_sentiment, texts))
+    assert results == [get_engine().analyze_sentiment(t) for t in texts]
+
+
+def test_fingerprint_covers_the_scoring_path():
+    default = SentimentEngine().fingerprint()
+    assert default.startswith(SCORER_VERSION + "-")
+    assert default != SentimentEngine(fused=False).fingerprint()
+    assert default != SentimentEngine(use_compiled=False).fingerprint()
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+
+from batch import EMPTY_CODE, analyze_sentiment_batch
+from batch_cli import run
+from benchmarks.corpus import make_corpus
+from engine import get_engine
+from fast_engine import REVIEW_SAMPLE, FastEngine, agreement_report, get_fast_engine, main
+
+TEXTS = ["This is a great day!", "This is a terrible day.", "", "The meeting is on Tuesday.",
+         "I don't like this at all.", "The food was very good.", "a"]
+
+
+def test_result_shape_matches_exact_engine():
+    fast, exact = get_fast_engine(), get_engine()
+    for text in TEXTS:
+        result, expected = fast.analyze_sentiment(text), exact.analyze_sentiment(text)
+        if expected[0] is None:
+            assert result == expected
+            continue
+        assert result[1] == expected[1]
+        assert abs(result[0] - expected[0]) < 10
+        assert set(result[3]) == set(expected[3])
+        assert 0 <= result[0] <= 100 and 0 <= result[2] <= 100
+
+
+def test_batch_matches_single_calls_across_blocks(monkeypatch):
+    import fast_engine
+
+    texts = make_corpus(300, sentences=2, seed=5) + [""]
+    whole = analyze_sentiment_batch(texts, engine=get_fast_engine())
+    monkeypatch.setattr(fast_engine, "BLOCK_TOKENS", 50)
+    blocked = analyze_sentiment_batch(texts, engine=FastEngine())
+    for name in ("score", "subjectivity", "joy", "sadness", "neutral"):
+        np.testing.assert_allclose(whole[name], blocked[name])
+    assert whole["category"][-1] == EMPTY_CODE
+    assert get_fast_engine().analyze_sentiment(texts[7])[0] == whole["score"][7]
+
+
+def test_negation_and_modifiers_follow_the_lexicon_rules():
+    fast = get_fast_engine()
+    good = fast.analyze_sentiment("good")
+    assert fast.analyze_sentiment("not good")[0] < 50 < good[0]
+    assert fast.analyze_sentiment("very good")[0] > good[0]
+    assert fast.analyze_sentiment("not good")[3] == get_engine().analyze_sentiment("not good")[3]
+
+
+def test_agreement_report_on_held_out_corpus():
+    report = agreement_report(make_corpus(400, sentences=3, seed=11))
+    assert report["texts"] == report["scored"] == 400
+    assert report["category_agreement"] > 0.9
+    assert report["score_correlation"] > 0.95
+    assert sum(sum(row.values()) for row in report["confusion"].values()) == 400
+
+
+def test_agreement_report_on_review_sample(capsys):
+    assert main([]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["corpus"] == str(REVIEW_SAMPLE)
+    assert report["texts"] == report["scored"] > 100
+    assert report["category_agreement"] > 0.9
+
+
+def test_batch_cli_fast_engine(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(TEXTS)))
+    summary = run(str(source), str(tmp_path / "out.jsonl"), workers=1, engine="fast")
+    with open(tmp_path / "out.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["id"] for row in rows] == list(range(len(TEXTS)))
+    assert rows[0]["category"] == "positive" and rows[2]["score"] is None
+    assert rows[1]["score"] == get_fast_engine().analyze_sentiment(TEXTS[1])[0]
+    assert summary["records"] == len(TEXTS) and summary["errors"] == 0
@@ -0,0 +1,65 @@
+import random
+
+from benchmarks.corpus import make_corpus
+from engine import SentimentEngine
+from fused import TOLERANCE
+
+EDGE_CASES = [
+    "I don't like it :( but the staff were lovely :)",
+    "It was kind of great, but the ending was AWFUL!!!",
+    "Not bad at all... U.S. prices, e.g. taxes, are high?!",
+    "“Smart” quotes’s and 'single' quotes ; ) ( ! ) : D",
+    "First paragraph is good.\n\nSecond one is terrible\r\nthird is fine",
+    ",cat cat, !!good ?!?bad #BAD @user http://example.com x:D",
+    ":\n\n(great) don't --- hate it's ! great ) ;",
+    "e.g.\ne.g. :( ! )\n... ",
+]
+
+# pieces the fuzzer glues together: sentiment words, emoticon and sarcasm
+# fragments, abbreviations and line breaks
+FUZZ_TOKENS = ["great", "hate", "don't", "it's", "not", "very", "good", "bad", "love", "terrible", "wow",
+               "!", "?", ".", ",", ";", ":", "(", ")", ":)", ":(", ";)", "(!)", "---", "...", "D", "P",
+               "-", "'", '"', "U.S.", "e.g.", "\n", "\n\n"]
+
+
+def _fuzz_texts(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_TOKENS) + rng.choice(["", " ", " ", "\n"])
+                    for _ in range(rng.randint(1, 12)))
+            for _ in range(count)]
+
+
+def test_fused_matches_exact_path():
+    fused, exact = SentimentEngine(fused=True), SentimentEngine(fused=False)
+    for text in make_corpus(300, sentences=4) + EDGE_CASES:
+        a, b = fused.analyze_sentiment(text), exact.analyze_sentiment(text)
+        assert a[1] == b[1]
+        assert abs(a[0] - b[0]) <= TOLERANCE and abs(a[2] - b[2]) <= TOLERANCE
+        assert a[3] == b[3]
+
+
+def test_fused_matches_exact_path_on_fuzzed_text():
+    fused, exact = SentimentEngine(fused=True).load(), SentimentEngine(fused=False).load()
+    for text in _fuzz_texts(3000):
+        (polarity, subjectivity), vader = fused.scores(text)
+        (exact_polarity, exact_subjectivity), exact_vader = exact.scores(text)
+        assert abs(polarity - exact_polarity) * 50 <= TOLERANCE, text
+        assert abs(subjectivity - exact_subjectivity) * 100 <= TOLERANCE, text
+        assert vader == exact_vader, text
+
+
+def test_fused_tokens_match_vader_tokens():
+    from nltk.sentiment.vader import SentiText
+
+    engine = SentimentEngine().load()
+    constants = engine._vader.constants
+    for text in EDGE_CASES:
+        vader_words, _ = engine._fused.tokenize(text)
+        expected = SentiText(text, constants.PUNC_LIST, constants.REGEX_REMOVE_PUNCTUATION)
+        assert vader_words == expected.words_and_emoticons
+
+
+def test_fused_can_be_switched_off():
+    engine = SentimentEngine(fused=False).load()
+    assert engine._fused is None
+    assert engine.scores("good") == (engine.polarity("good"), engine.vader_scores("good"))
@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import make_history
+from history_store import HistoryStore
+from utils import calculate_trend, create_sentiment_chart
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    yield store
+    store.close()
+
+
+def test_appends_are_batched_and_persist(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    store = HistoryStore(path)
+    store.extend(make_history(1000))
+    assert store.version == 1000
+    assert len(store) == 1000
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert len(reopened) == 1000
+    reopened.close()
+
+
+def test_window_and_latest(store):
+    history = make_history(100)
+    store.extend(history)
+    start = history[10]["timestamp"]
+    columns = store.window(start=start, end=start + timedelta(minutes=5))
+    assert list(columns["score"]) == [item["score"] for item in history[10:15]]
+    assert columns["timestamp"][0].astype(datetime) == start
+
+    latest = store.latest(3)
+    assert list(latest["score"]) == [item["score"] for item in history[-3:]]
+    recent = store.recent_entries(2)
+    assert recent[0]["text"] == history[-1]["text"]
+    assert recent[0]["emotions"] == history[-1]["emotions"]
+    assert recent[0]["timestamp"] == history[-1]["timestamp"]
+    # later pages of recent entries
+    assert [e["text"] for e in store.recent_entries(3, offset=2)] == [h["text"] for h in history[-3:-6:-1]]
+
+
+def test_downsample_averages_into_buckets(store):
+    history = make_history(10000)
+    store.extend(history)
+    points = store.downsample(buckets=100)
+    assert len(points["score"]) <= 100
+    assert points["count"].sum() == 10000
+    weighted = (points["score"] * points["count"]).sum() / points["count"].sum()
+    assert weighted == pytest.approx(np.mean([item["score"] for item in history]))
+
+    small = store.downsample(start=history[-20]["timestamp"], buckets=100)
+    assert list(small["score"]) == [item["score"] for item in history[-20:]]
+
+
+def test_trend_and_chart_accept_store_columns(store):
+    history = make_history(50)
+    store.extend(history)
+    assert calculate_trend(store.latest(5)) == calculate_trend(history)
+    figure = create_sentiment_chart(store.downsample(buckets=20))
+    assert len(figure.data[0].x) <= 20
+    assert create_sentiment_chart(store.window(end=datetime(2000, 1, 1))) is None
+
+
+def test_trend_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    store = HistoryStore(path)
+    for i in range(30):
+        store.append({"score": float(i * 3), "category": "Positive"})
+    store.flush()
+    expected = store.trend.summary()
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert reopened.trend.summary() == expected
+    assert reopened.trend.direction()[0] == "improving"
+    reopened.clear()
+    assert reopened.trend.count == 0
+    reopened.close()
+
+
+def test_owners_only_see_their_own_rows(store):
+    alice, bob = store.scoped("alice"), store.scoped("bob")
+    alice.extend(make_history(30))
+    bob.append({"text": "bob's text", "score": 10.0, "category": "negative"})
+    assert (len(alice), len(bob), len(store)) == (30, 1, 0)
+    assert [e["text"] for e in bob.recent_entries(10)] == ["bob's text"]
+    assert len(alice.downsample(buckets=10)["score"]) <= 10 and bob.trend.count == 1
+    bob.clear()
+    assert (len(alice), len(bob)) == (30, 0) and alice.trend.count == 30
+
+
+def test_rows_from_before_owners_become_shared(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE history (ts REAL NOT NULL, score REAL NOT NULL, category TEXT NOT NULL, "
+                 "subjectivity REAL, joy REAL, sadness REAL, neutral REAL, text TEXT)")
+    conn.execute("INSERT INTO history VALUES (0, 80, 'positive', 50, 1, 0, 0, 'old')")
+    conn.commit()
+    conn.close()
+    store = HistoryStore(path)
+    assert [e["text"] for e in store.recent_entries()] == ["old"] and len(store.scoped("x")) == 0
+    store.close()
+
+
+def test_reads_include_queued_rows_without_waiting(tmp_path):
+    history = make_history(300)
+    for item in history[::7]:
+        item["emotions"] = {}
+    written = HistoryStore(str(tmp_path / "written.sqlite"))
+    written.extend(history)
+    written.flush()
+    # no writer: half the rows stay queued, a read that waited on them would hang
+    queued = HistoryStore(str(tmp_path / "queued.sqlite"))
+    queued.extend(history[:150])
+    queued.flush()
+    queued._ensure_writer = lambda: None
+    queued.extend(history[150:])
+
+    results = {}
+
+    def read():
+        for name, store in (("written", written), ("queued", queued)):
+            results[name] = (len(store), store.recent_entries(10, offset=145), store.latest(20),
+                             store.downsample(buckets=1000), store.downsample(buckets=40))
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    reader.join(timeout=10)
+    assert not reader.is_alive()
+    (count, entries, latest, raw, buckets), expected = results["queued"], results["written"]
+    assert count == expected[0] == 300 and entries == expected[1]
+    for got, want in ((latest, expected[2]), (raw, expected[3]), (buckets, expected[4])):
+        for name in ("timestamp", "score", "joy", "neutral"):
+            np.testing.assert_allclose(got[name].astype(np.float64), want[name].astype(np.float64),
+                                       equal_nan=True)
+    written.close()
+    queued.close()
+
+
+def test_idle_owners_are_pruned(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    store = HistoryStore(path)
+    store.scoped("alice").extend(make_history(5))
+    store.extend(make_history(3))
+    store.flush()
+    assert store.prune(idle_seconds=3600) == 0
+    assert store.prune(idle_seconds=0) == 1
+    assert (len(store.scoped("alice")), len(store)) == (0, 3)
+    assert "alice" not in store._trends
+    store.close()
+
+    store = HistoryStore(path, idle_owner_seconds=0)
+    assert len(store) == 3
+    store.close()
+
+
+def test_live_trends_are_bounded(store, monkeypatch):
+    import history_store
+
+    monkeypatch.setattr(history_store, "MAX_LIVE_TRENDS", 4)
+    for i in range(10):
+        store.scoped(f"owner{i}").append({"text": "t", "score": 60.0, "category": "positive"})
+    store.flush()
+    store.trend_for("late")
+    assert len(store._trends) <= 5
+    # a dropped trend is loaded again from its saved state
+    assert store.scoped("owner0").trend.count == 1
+
+
+def test_writer_survives_a_failed_commit(store, monkeypatch):
+    import history_store
+
+    monkeypatch.setattr(history_store, "RETRY_DELAY", 0)
+    store.append({"text": "first", "score": 60.0, "category": "positive"})
+    store.flush()
+    real_connect, failures = store._connect, []
+
+    class Locked:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def executemany(self, *args):
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+
+        def rollback(self):
+            self.conn.rollback()
+
+    # the first batch fails on every attempt and is dropped, the next is written
+    store._connect = lambda: Locked(real_connect())
+    store.append({"text": "lost", "score": 10.0, "category": "negative"})
+    store.flush()
+    store._connect = real_connect
+    store.append({"text": "after", "score": 70.0, "category": "positive"})
+    store.flush()
+    assert len(failures) == history_store.WRITE_ATTEMPTS and store.dropped == 1
+    assert [e["text"] for e in store.recent_entries()] == ["after", "first"]
+    assert store._pending == []
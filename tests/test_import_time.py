@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.import_time import measure
+
+# generous budgets, a few ms each on a laptop, so only real regressions
+# (an eager plotly or nltk import) trip them
+IMPORT_BUDGET_MS = {
+    "engine": 150,
+    "cache": 150,
+    "utils": 200,
+    "batch_cli": 250,
+}
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_MS))
+def test_import_stays_within_budget(module):
+    ms, heavy = measure(module)
+    assert heavy == []
+    assert ms <= IMPORT_BUDGET_MS[module]
+
+
+def test_engine_finds_bundled_lexicon_without_downloading(monkeypatch):
+    import nltk
+
+    from engine import SentimentEngine
+
+    def no_download(*args, **kwargs):
+        raise AssertionError("tried to download NLTK data")
+
+    monkeypatch.setattr(nltk, "download", no_download)
+    assert SentimentEngine().analyze_sentiment("This is a great day!")[1] == "positive"
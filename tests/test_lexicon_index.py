@@ -0,0 +1,56 @@
+import textblob.en
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+import lexicon_index
+from engine import VADER_LEXICON, SentimentEngine, ensure_nltk_data
+from lexicon_index import MappedLexicon, write_index
+
+TEXTS = [
+    "This is a great day!",
+    "I am not very happy with this terribly slow service :(",
+    "The food was really not good (!) but the staff were lovely.",
+    "Damn, what an AMAZING result!!!",
+]
+
+
+def test_write_and_read_index(tmp_path):
+    path = str(tmp_path / "tiny.lexidx")
+    write_index(path, [("zeta", (1.0, 2.0), 0, None), ("alpha", (-0.5, 0.25), 1, "mood"), ("é", (3.0, 4.0), 0, None)],
+                width=2, source_sha256="abc", labels=["mood"])
+    lexicon = MappedLexicon(path)
+    assert list(lexicon.keys()) == ["alpha", "zeta", "é"]
+    assert lexicon["alpha"] == (-0.5, 0.25) and lexicon["é"] == (3.0, 4.0)
+    assert "missing" not in lexicon and lexicon.get("missing") is None
+    assert lexicon.flags(lexicon.index("alpha")) == 1
+    assert lexicon.label(lexicon.index("alpha")) == "mood"
+    assert lexicon.header["source_sha256"] == "abc"
+
+
+def test_vader_index_matches_parsed_lexicon(tmp_path):
+    ensure_nltk_data()
+    parsed = SentimentIntensityAnalyzer(VADER_LEXICON).lexicon
+    mapped = lexicon_index.load_vader_lexicon(str(tmp_path / "vader.lexidx"))
+    assert len(mapped) == len(parsed)
+    assert all(mapped[word] == value for word, value in parsed.items())
+
+
+def test_mapped_scorers_match_originals(tmp_path):
+    vader = lexicon_index.mapped_vader_analyzer(lexicon_index.load_vader_lexicon(str(tmp_path / "v.lexidx")))
+    pattern = lexicon_index.mapped_pattern_sentiment(lexicon_index.load_pattern_lexicon(str(tmp_path / "p.lexidx")))
+    original = SentimentIntensityAnalyzer(VADER_LEXICON)
+    for text in TEXTS:
+        assert vader.polarity_scores(text) == original.polarity_scores(text)
+        assert tuple(pattern(text)) == tuple(textblob.en.sentiment(text))
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / "vader.lexidx")
+    write_index(path, [("good", (9.0,), 0, None)], width=1, source_sha256="stale")
+    assert lexicon_index.load_vader_lexicon(path, build=False) is None
+    assert lexicon_index.load_vader_lexicon(path)["good"] != 9.0
+
+
+def test_engine_results_identical_with_and_without_index():
+    compiled, parsed = SentimentEngine(use_compiled=True), SentimentEngine(use_compiled=False)
+    for text in TEXTS:
+        assert compiled.analyze_sentiment(text) == parsed.analyze_sentiment(text)
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def collecting():
+    was_enabled = metrics.enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def test_disabled_stage_records_nothing():
+    was_enabled = metrics.enabled()
+    metrics.disable()
+    metrics.reset()
+    try:
+        with metrics.stage("idle"):
+            pass
+        metrics.count("bytes", 10)
+        assert metrics.snapshot()["stages"] == {} and metrics.snapshot()["counters"] == {}
+    finally:
+        if was_enabled:
+            metrics.enable()
+
+
+def test_stage_and_timed_record_histograms(collecting):
+    @metrics.timed("double")
+    def double(x):
+        return x * 2
+
+    with metrics.stage("block"):
+        assert double(2) == 4
+    metrics.count("chars", 5)
+    metrics.count("chars", 7)
+
+    report = metrics.snapshot()
+    assert report["stages"]["double"]["count"] == 1
+    assert report["stages"]["block"]["count"] == 1
+    assert report["stages"]["block"]["total_ms"] >= report["stages"]["double"]["total_ms"]
+    assert sum(report["stages"]["block"]["buckets"].values()) == 1
+    assert report["counters"] == {"chars": 12}
+    assert json.loads(metrics.to_json())["counters"] == {"chars": 12}
+
+
+def test_prometheus_export(collecting):
+    for seconds in (0.0002, 0.003, 0.003, 20.0):
+        metrics.observe("vader", seconds)
+    metrics.count("pdf_bytes", 1024)
+    text = metrics.to_prometheus()
+    assert "# TYPE sentiment_stage_seconds histogram" in text
+    assert 'sentiment_stage_seconds_bucket{stage="vader",le="0.0005"} 1' in text
+    assert 'sentiment_stage_seconds_bucket{stage="vader",le="0.005"} 3' in text
+    assert 'sentiment_stage_seconds_bucket{stage="vader",le="+Inf"} 4' in text
+    assert 'sentiment_stage_seconds_count{stage="vader"} 4' in text
+    assert "sentiment_pdf_bytes_total 1024" in text
+
+
+def test_engine_stages_are_timed(collecting):
+    from utils import analyze_sentiment
+
+    analyze_sentiment("Metrics make slow days less mysterious.")
+    stages = metrics.snapshot()["stages"]
+    assert {"analyze_sentiment", "textblob", "vader"} <= set(stages)
+
+
+def test_histogram_quantile_interpolates():
+    histogram = metrics.Histogram()
+    for _ in range(100):
+        histogram.observe(0.002)
+    assert 0.001 <= histogram.quantile(0.5) <= 0.0025
+
+
+def test_enable_here_only_collects_in_that_thread():
+    import threading
+
+    was_enabled = metrics.enabled()
+    metrics.disable()
+    metrics.reset()
+
+    def run(name, on):
+        metrics.enable_here(on)
+        with metrics.stage(name):
+            pass
+
+    try:
+        threads = [threading.Thread(target=run, args=("watched", True)),
+                   threading.Thread(target=run, args=("other", False))]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        with metrics.stage("main"):
+            pass
+        assert list(metrics.snapshot()["stages"]) == ["watched"] and not metrics.enabled()
+    finally:
+        metrics.reset()
+        if was_enabled:
+            metrics.enable()
@@ -0,0 +1,31 @@
+from engine import get_engine
+from parallel import ChunkSizer, score_corpus
+
+TEXTS = ["This is a great day!", "This is a terrible day.", "", "The meeting is on Tuesday."] * 15
+
+
+def test_score_corpus_ordered_matches_sequential():
+    expected = [get_engine().analyze_sentiment(t) for t in TEXTS]
+    results = list(score_corpus(iter(TEXTS), workers=2, chunk_size=7))
+    assert [index for index, _ in results] == list(range(len(TEXTS)))
+    assert [result for _, result in results] == expected
+
+
+def test_score_corpus_unordered_covers_every_text():
+    results = dict(score_corpus(TEXTS, workers=2, ordered=False, max_pending=2))
+    assert sorted(results) == list(range(len(TEXTS)))
+    assert results[1][1] == "negative"
+
+
+def test_score_corpus_single_worker_runs_inline():
+    assert [i for i, _ in score_corpus(TEXTS[:3], workers=1)] == [0, 1, 2]
+
+
+def test_chunk_sizer_targets_chunk_duration():
+    sizer = ChunkSizer(initial=16, target_seconds=0.1)
+    for _ in range(10):
+        sizer.update(sizer.size, sizer.size * 0.001)
+    assert 90 <= sizer.size <= 100
+    for _ in range(10):
+        sizer.update(sizer.size, sizer.size * 1.0)
+    assert sizer.size == 1
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+import pdf_extract
+from benchmarks.documents import make_pdf_bytes
+from cache import ByteLRU
+from pdf_extract import extract_text_from_pdf, iter_pdf_pages, parse_page_range
+
+PAGES = [f"Page {i} was a great read." for i in range(1, 11)]
+
+
+def test_extract_matches_page_by_page_join():
+    data = make_pdf_bytes(PAGES)
+    assert extract_text_from_pdf(io.BytesIO(data)) == "\n".join(PAGES)
+
+
+def test_page_ranges_and_budgets():
+    data = make_pdf_bytes(PAGES)
+    assert list(iter_pdf_pages(data, pages=parse_page_range("3-5"))) == PAGES[2:5]
+    assert list(iter_pdf_pages(data, pages=parse_page_range("9-"))) == PAGES[8:]
+    assert list(iter_pdf_pages(data, max_pages=2)) == PAGES[:2]
+    assert "".join(iter_pdf_pages(data, max_bytes=30)) == (PAGES[0] + PAGES[1])[:30]
+
+
+def test_parse_page_range():
+    assert parse_page_range("") is None
+    assert parse_page_range("7") == range(6, 7)
+    with pytest.raises(ValueError):
+        parse_page_range("5-2")
+
+
+def test_cached_pages_skip_parsing(monkeypatch):
+    data = make_pdf_bytes(PAGES)
+    cache = ByteLRU(1024 * 1024)
+    list(iter_pdf_pages(data, cache=cache))
+
+    def fail(_):
+        raise AssertionError("reparsed a cached document")
+
+    monkeypatch.setattr(pdf_extract, "_open_reader", fail)
+    assert list(iter_pdf_pages(data, pages=range(3, 6), cache=cache)) == PAGES[3:6]
+
+
+def test_parallel_extraction_keeps_page_order(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "PARALLEL_MIN_PAGES", 4)
+    data = make_pdf_bytes(PAGES)
+    pages = list(iter_pdf_pages(data, workers=2, cache=ByteLRU(1024 * 1024)))
+    assert pages == PAGES
+
+
+def test_invalid_pdf_raises_value_error():
+    with pytest.raises(ValueError):
+        extract_text_from_pdf(io.BytesIO(b"Not a PDF"))
+
+
+def test_page_extraction_errors_raise_value_error(monkeypatch):
+    from pypdf import PageObject
+
+    def broken(self, *args, **kwargs):
+        raise KeyError("/Contents")
+
+    monkeypatch.setattr(PageObject, "extract_text", broken)
+    with pytest.raises(ValueError, match="page 1"):
+        list(iter_pdf_pages(make_pdf_bytes(PAGES), cache=ByteLRU(1024 * 1024)))
@@ -0,0 +1,60 @@
+from benchmarks.corpus import make_history
+from comparison import ComparisonTable, page_slice
+from history_store import HistoryStore
+from rendering import BlockCache, comparison_item, history_item, render_block, stylesheet
+from utils import get_color_scheme, get_emotion_color
+
+
+def _table(history):
+    table = ComparisonTable()
+    for item in history:
+        table.append(item["text"], item["score"], item["category"], item["subjectivity"], item["emotions"])
+    return table
+
+
+def test_stylesheet_has_a_class_per_color():
+    css = stylesheet()
+    _, bg_color, text_color = get_color_scheme("negative")
+    assert f".item-negative {{ background-color: {bg_color}; color: {text_color}; }}" in css
+    assert f".emotion-joy {{ color: {get_emotion_color('joy')}; }}" in css
+
+
+def test_items_use_classes_and_escape_text():
+    item = {"number": 3, "text": "<b>bold</b>\n\nnext", "score": 81.5, "category": "positive",
+            "emotions": {"joy": 60.0, "surprise": 10.0}}
+    html = comparison_item(item)
+    assert 'class="history-item item-positive"' in html
+    assert "&lt;b&gt;bold&lt;/b&gt;<br><br>next" in html
+    assert '<span class="emotion-joy">Joy: 60%</span>' in html
+    assert '<span class="emotion-other">Surprise: 10%</span>' in html
+    assert "style=" not in html and "\n" not in html
+
+    entry = make_history(1)[0]
+    assert entry["timestamp"].strftime("%Y-%m-%d %H:%M:%S") in history_item(entry)
+
+
+def test_page_is_one_block():
+    table = _table(make_history(100))
+    block = render_block(table.records(page_slice(table.select(), 2)), comparison_item)
+    assert block.startswith('<div class="item-list">')
+    assert block.count('class="history-item') == 25
+    assert "<strong>Text 26:</strong>" in block
+
+
+def test_block_cache_rebuilds_only_when_the_data_changes(tmp_path):
+    table = _table(make_history(60))
+    blocks = BlockCache()
+    first = blocks.comparison_page(table, page_slice(table.select(), 1))
+    assert blocks.comparison_page(table, page_slice(table.select(), 1)) is first
+    assert (blocks.hits, blocks.misses) == (1, 1)
+    table.append("one more", 10.0, "negative", 0.5, {"joy": 0.0, "sadness": 90.0, "neutral": 10.0})
+    assert blocks.comparison_page(table, page_slice(table.select(), 1)) is not first
+
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    history = make_history(25)
+    store.extend(history)
+    last = blocks.history_page(store, 3, page_size=10)
+    assert last.count('class="history-item') == 5
+    assert history[4]["text"] in last and history[5]["text"] not in last
+    assert blocks.history_page(store, 3, page_size=10) is last
+    store.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import service as service_module
+from engine import get_engine
+from service import ScoringService
+
+
+async def _call(port, method, path, payload=None, raw_body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = raw_body if raw_body is not None else (json.dumps(payload).encode() if payload is not None else b"")
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), head.decode(), json.loads(content)
+
+
+def _with_service(scenario, **options):
+    async def main():
+        service = ScoringService(workers=2, use_processes=False, **options)
+        port = await service.start(port=0)
+        try:
+            return await scenario(service, port)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+
+def test_single_and_batch_endpoints():
+    async def scenario(service, port):
+        status, _, single = await _call(port, "POST", "/score", {"text": "This is a great day!"})
+        assert status == 200
+        score, category, _, emotions = get_engine().analyze_sentiment("This is a great day!")
+        assert single["score"] == score and single["category"] == category
+        assert single["joy"] == emotions["joy"]
+
+        status, _, batch = await _call(port, "POST", "/score/batch", {"texts": ["This is a terrible day.", ""]})
+        assert status == 200
+        assert [r["category"] for r in batch["results"]] == ["negative", None]
+
+    _with_service(scenario)
+
+
+def test_concurrent_requests_are_micro_batched():
+    async def scenario(service, port):
+        texts = [f"Review {i} was great." for i in range(40)]
+        results = await asyncio.gather(*(_call(port, "POST", "/score", {"text": t}) for t in texts))
+        assert all(status == 200 for status, _, _ in results)
+        assert service.batcher.batches < len(texts)
+
+    _with_service(scenario, max_wait=0.05)
+
+
+def test_request_limits_and_bad_input():
+    async def scenario(service, port):
+        status, _, _ = await _call(port, "POST", "/score", raw_body=b"x" * 2048)
+        assert status == 413
+        status, _, _ = await _call(port, "POST", "/score/batch", {"texts": ["a"] * 11})
+        assert status == 413
+        status, _, _ = await _call(port, "POST", "/score", {"texts": "nope"})
+        assert status == 400
+        status, _, _ = await _call(port, "GET", "/missing")
+        assert status == 404
+
+    _with_service(scenario, max_body_bytes=1024, max_batch_texts=10)
+
+
+def test_sheds_load_when_queue_is_full():
+    async def scenario(service, port):
+        status, head, body = await _call(port, "POST", "/score/batch", {"texts": ["a", "b", "c"]})
+        assert status == 503
+        assert "Retry-After: 1" in head
+        _, _, health = await _call(port, "GET", "/health")
+        assert health["shed"] == 1
+
+    _with_service(scenario, max_queue=2)
+
+
+def test_worker_failure_returns_an_error(monkeypatch):
+    def broken(texts):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(service_module, "score_texts", broken)
+
+    async def scenario(service, port):
+        status, _, body = await _call(port, "POST", "/score", {"text": "fine"})
+        assert status == 500 and body == {"error": "scoring failed"}
+        status, _, health = await _call(port, "GET", "/health")
+        assert status == 200 and health["queue_depth"] == 0
+
+    _with_service(scenario)
@@ -0,0 +1,131 @@
+import pytest
+
+import streaming
+from engine import get_engine
+from streaming import (
+    IncrementalAnalyzer, SentimentAccumulator, analyze_sentiment_stream, cached_document_stream, iter_chunks,
+    iter_sentences, raw_scores,
+)
+
+
+def test_iter_sentences_joins_sentences_across_pages():
+    pages = ["The first page ends mid", "sentence. Then a new one! Last"]
+    assert list(iter_sentences(pages)) == [
+        "The first page ends mid sentence.", "Then a new one!", "Last",
+    ]
+
+
+def test_iter_sentences_bounds_text_without_sentence_ends(monkeypatch):
+    # 1000 pages of 2 KB with no terminator used to pile up in the carry, so
+    # every split rescanned everything read so far; the timing lives in
+    # benchmarks/suite.py, here we check how much text each split sees
+    pages = [("word " * 400).strip() for _ in range(1000)]
+    scanned = []
+    real = streaming._SENTENCE_END
+
+    class Recording:
+        def split(self, text):
+            scanned.append(len(text))
+            return real.split(text)
+
+    monkeypatch.setattr(streaming, "_SENTENCE_END", Recording())
+    sentences = list(iter_sentences(pages, max_chars=500))
+    assert len(scanned) == len(pages)
+    assert max(scanned) <= 500 + 1 + len(pages[0])
+    assert all(len(sentence) <= 500 for sentence in sentences)
+    assert sum(len(sentence.split()) for sentence in sentences) == 400 * 1000
+
+
+def test_iter_chunks_respects_max_chars():
+    text = "word " * 500
+    chunks = list(iter_chunks(text, max_chars=100))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) == 500
+
+
+def test_single_chunk_matches_analyze_sentiment():
+    text = "This is a great day!"
+    assert analyze_sentiment_stream([text]).as_tuple() == get_engine().analyze_sentiment(text)
+
+
+def test_stream_is_length_weighted():
+    short, long = "This is terrible.", "This is a really great and wonderful day for everyone here!"
+    result = analyze_sentiment_stream([short, long], max_chunk_chars=len(long))
+    assert len(result.chunks) == 2
+    expected = SentimentAccumulator()
+    expected.add(raw_scores(short), len(short))
+    expected.add(raw_scores(long), len(long))
+    assert result.score == pytest.approx(expected.result()[0])
+    weighted = (result.chunks[0].score * len(short) + result.chunks[1].score * len(long)) / (len(short) + len(long))
+    assert result.score == pytest.approx(weighted)
+
+
+def test_stream_caps_curve_points():
+    pages = ("This is a great day. This is a terrible day. " for _ in range(300))
+    result = analyze_sentiment_stream(pages, max_chunk_chars=50, max_points=64)
+    assert 0 < len(result.chunks) <= 65
+    assert sum(chunk.chars for chunk in result.chunks) <= result.chars
+
+
+def test_document_stream_is_cached_by_key():
+    from benchmarks.documents import make_pdf_bytes
+    from pdf_extract import iter_pdf_pages
+
+    data = make_pdf_bytes(["A great first page.", "A terrible second page."])
+    reads = []
+
+    def pages():
+        reads.append(1)
+        return iter_pdf_pages(data)
+
+    first = cached_document_stream(("test", data), pages)
+    assert cached_document_stream(("test", data), pages) is first
+    assert len(reads) == 1
+    assert first.as_tuple() == analyze_sentiment_stream(iter_pdf_pages(data)).as_tuple()
+
+
+def test_accumulator_remove_undoes_add():
+    acc = SentimentAccumulator()
+    acc.add((0.5, 0.5, 0.4, 0.0, 0.6), 10)
+    acc.add((-0.5, 0.2, 0.0, 0.5, 0.5), 5)
+    acc.remove((-0.5, 0.2, 0.0, 0.5, 0.5), 5)
+    assert acc.result()[0] == pytest.approx(75)
+    assert SentimentAccumulator().result() == (None, None, None, None)
+
+
+def test_incremental_rescores_only_changed_sentences():
+    sentences = [f"Sentence number {i} is rather good." for i in range(200)]
+    analyzer = IncrementalAnalyzer()
+    analyzer.update(" ".join(sentences))
+    assert analyzer.scored == 200
+
+    sentences[50] = "This one was edited and is now terrible."
+    result = analyzer.update(" ".join(sentences))
+    assert analyzer.scored == 1
+    assert result == get_engine().analyze_sentiment(" ".join(sentences))
+
+
+@pytest.mark.parametrize("text", [
+    "It was bad. e.g. BUT! Fine.",
+    "The plot is not. Good enough though. I hate it.",
+    "Very. Good. Kind. Of good. Never so. Good.",
+    "GREAT start. Great middle but a bad end! Bad!! Really?? Great.",
+    "Not bad.\n\nA second paragraph, not good at all. Good.",
+    "Nice :) and then. ( ! ) sure",
+])
+def test_incremental_matches_whole_text_scoring(text):
+    analyzer = IncrementalAnalyzer(max_sentence_chars=12)
+    assert analyzer.update(text) == get_engine().analyze_sentiment(text)
+    edited = text.replace("Good", "Awful", 1)
+    assert analyzer.update(edited) == get_engine().analyze_sentiment(edited)
+
+
+def test_incremental_handles_duplicates_and_undo():
+    analyzer = IncrementalAnalyzer()
+    base = "Great work. Great work. Awful weather."
+    first = analyzer.update(base)
+    analyzer.update("Great work. Awful weather.")
+    assert analyzer.scored == 0
+    assert analyzer.update(base) == first
+    assert analyzer.scored == 0
+    assert analyzer.update("   ") == (None, None, None, None)
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pytest
+
+from trend import TrendEngine, WindowStats
+from utils import calculate_trend
+
+
+def test_window_matches_polyfit_after_many_updates():
+    rng = np.random.default_rng(3)
+    values = rng.normal(0, 30, 5000) + np.linspace(0, 200, 5000)
+    window = WindowStats(100)
+    for value in values:
+        window.push(value)
+    tail = values[-100:]
+    assert window.count == 100
+    assert window.slope() == pytest.approx(np.polyfit(np.arange(100), tail, 1)[0], abs=1e-9)
+    assert window.variance() == pytest.approx(np.var(tail, ddof=1), rel=1e-9)
+
+
+def test_short_windows():
+    window = WindowStats(5)
+    assert window.slope() == 0.0 and window.slope_confidence() is None
+    window.push(1.0)
+    window.push(3.0)
+    assert window.slope() == 2.0
+    assert window.slope_confidence() is None
+
+
+def test_direction_and_confidence():
+    engine = TrendEngine().extend([0, 10, 20, 30, 40])
+    direction, slope, confidence = engine.direction()
+    assert direction == "improving"
+    assert slope == pytest.approx(10)
+    assert confidence == 1.0
+
+    noisy = TrendEngine().extend([0, 50, -40, 60, 5])
+    assert noisy.direction()[0] == "stable"
+    assert TrendEngine().extend([40, 30, 20, 10, 0]).direction()[0] == "declining"
+    assert TrendEngine().update(5).direction() == ("neutral", 0, None)
+
+
+def test_ewma_and_summary():
+    engine = TrendEngine(alpha=0.5).extend([0, 10])
+    assert engine.ewma == 5
+    assert engine.ewm_variance == pytest.approx(25)
+    summary = engine.summary()
+    assert summary["count"] == 2
+    assert set(summary["windows"]) == {5, 20, 100}
+
+
+def test_state_round_trip(tmp_path):
+    engine = TrendEngine().extend(math.sin(i / 7) * 50 for i in range(300))
+    path = tmp_path / "trend.json"
+    engine.save(str(path))
+    restored = TrendEngine.load(str(path))
+    assert restored.summary() == engine.summary()
+    engine.update(12.5)
+    restored.update(12.5)
+    assert restored.summary() == engine.summary()
+
+
+def test_calculate_trend_inputs():
+    history = [{"score": s} for s in (-20, -5, 10, 25, 40)]
+    assert calculate_trend(history) == calculate_trend({"score": np.array([-20, -5, 10, 25, 40.0])})
+    assert calculate_trend(history)[0] == "improving"
+    assert calculate_trend(history[:1]) == ("neutral", 0)
+    engine = TrendEngine().extend(item["score"] for item in history)
+    assert calculate_trend(engine) == calculate_trend(history)
@@ -0,0 +1,95 @@
+import io
+import time
+import zipfile
+
+import uploads
+from benchmarks.documents import make_docx_bytes, make_pdf_bytes
+from engine import get_engine
+from uploads import count_uploads, iter_uploads, process_uploads
+
+PDF = make_pdf_bytes(["This is a great day!", "Everything went well."])
+DOCX = make_docx_bytes(["This is a terrible day.", "Nothing worked."])
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_iter_uploads_expands_archives_and_flags_bad_files():
+    archive = _zip({"a/good.pdf": PDF, "bad.docx": DOCX, "notes.txt": b"skip me", "__MACOSX/._x.pdf": b""})
+    items = list(iter_uploads([("one.pdf", PDF), ("docs.zip", archive), ("x.txt", b""),
+                               ("broken.zip", b"not a zip")]))
+    assert [(name, error is None) for name, _, error in items] == [
+        ("one.pdf", True), ("docs.zip/a/good.pdf", True), ("docs.zip/bad.docx", True),
+        ("x.txt", False), ("broken.zip", False),
+    ]
+    assert items[1][1] == PDF
+
+
+def test_archives_are_capped_on_total_size_and_counted_without_reading(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_ARCHIVE_BYTES", len(PDF) + len(DOCX))
+    uploaded = [("docs.zip", _zip({"a.pdf": PDF, "b.docx": DOCX, "c.pdf": PDF, "d.pdf": PDF})), ("x.txt", b"")]
+    items = list(iter_uploads(uploaded))
+    assert [error for _, _, error in items][:2] == [None, None]
+    assert items[2][2].startswith("ValueError: archive expands to more than")
+    assert len(items) == count_uploads(uploaded) == 4
+
+
+def test_process_uploads_pulls_documents_lazily():
+    pulled = []
+
+    def source():
+        for number in range(20):
+            pulled.append(number)
+            yield f"{number}.docx", DOCX, None
+
+    results = process_uploads(source(), workers=2, score=False, processes=False)
+    next(results)
+    assert len(pulled) <= 3
+    results.close()
+
+
+def test_process_uploads_scores_every_document():
+    items = list(iter_uploads([("one.pdf", PDF), ("two.docx", DOCX), ("bad.pdf", b"%PDF broken"),
+                               ("x.txt", b"")]))
+    results = {r["index"]: r for r in process_uploads(items, workers=2, processes=False)}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[0]["result"] == get_engine().analyze_sentiment("This is a great day!\nEverything went well.")
+    assert results[0]["summary"].startswith("This is a great day!")
+    assert results[1]["result"][1] == "negative" and results[1]["error"] is None
+    assert results[2]["error"] and results[2]["result"] is None
+    assert results[3]["error"].startswith("ValueError")
+
+
+def test_process_uploads_keeps_text_without_scoring():
+    items = [("two.docx", DOCX, None)]
+    [result] = process_uploads(items, workers=1, score=False, keep_text=True, processes=False)
+    assert result["text"] == "This is a terrible day.\nNothing worked." and result["result"] is None
+
+
+def test_process_uploads_times_out_slow_documents(monkeypatch):
+    real_extract = uploads.extract_upload
+
+    def extract(name, data, pages=None):
+        if name == "slow.docx":
+            time.sleep(1.0)
+        return real_extract(name, data, pages=pages)
+
+    monkeypatch.setattr(uploads, "extract_upload", extract)
+    items = [("slow.docx", DOCX, None), ("fast.pdf", PDF, None), ("also.docx", DOCX, None)]
+    start = time.monotonic()
+    results = list(process_uploads(items, workers=2, timeout=0.3, processes=False))
+    assert time.monotonic() - start < 0.9
+    # finished documents stream out before the slow one is given up on
+    assert [r["name"] for r in results] == ["fast.pdf", "also.docx", "slow.docx"]
+    assert results[-1]["error"].startswith("TimeoutError")
+
+
+def test_process_uploads_in_process_pool():
+    items = [("one.pdf", PDF, None), ("two.docx", DOCX, None)]
+    results = sorted(process_uploads(items, workers=2), key=lambda r: r["index"])
+    assert [r["result"][1] for r in results] == ["positive", "negative"]
@@ -0,0 +1,197 @@
+"""Online trend estimators for a stream of sentiment scores.
+
+Every update is O(1) amortized: windowed sums are adjusted as values enter
+and leave, and each window re-derives its sums from the values it holds
+once per ``window`` updates so rounding error never builds up. The whole
+state is plain JSON (to_dict/from_dict), so it can be stored next to the
+history and picked up again after a restart.
+"""
+import json
+import math
+import os
+from collections import deque
+
+DEFAULT_WINDOWS = (5, 20, 100)
+DEFAULT_ALPHA = 0.3
+# slope in score points per analysis that counts as a real move, same as the
+# old five point rule
+SLOPE_THRESHOLD = 1.0
+MIN_CONFIDENCE = 0.8
+
+
+class WindowStats:
+    """Least-squares slope and variance over the last ``size`` values.
+
+    x is the position inside the window (0 = oldest), so the sums stay
+    small however long the stream runs.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self._since_rebuild = 0
+        self._rebuild()
+
+    def _rebuild(self):
+        self.sy = self.syy = self.sxy = 0.0
+        for x, y in enumerate(self.values):
+            self.sy += y
+            self.syy += y * y
+            self.sxy += x * y
+        self._since_rebuild = 0
+
+    def push(self, y):
+        if len(self.values) == self.size:
+            # drop the oldest value and shift every x down by one
+            oldest = self.values[0]
+            self.sy -= oldest
+            self.syy -= oldest * oldest
+            self.sxy -= self.sy
+        self.values.append(y)
+        x = len(self.values) - 1
+        self.sy += y
+        self.syy += y * y
+        self.sxy += x * y
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.size:
+            self._rebuild()
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    def _sxx(self):
+        # centered sum of squares of x = 0..n-1
+        n = self.count
+        return n * (n * n - 1) / 12.0
+
+    def slope(self):
+        n = self.count
+        if n < 2:
+            return 0.0
+        mean_x = (n - 1) / 2.0
+        return (self.sxy - mean_x * self.sy) / self._sxx()
+
+    def variance(self):
+        n = self.count
+        if n < 2:
+            return 0.0
+        return max(self.syy - self.sy * self.sy / n, 0.0) / (n - 1)
+
+    def slope_confidence(self):
+        # two sided normal confidence that the slope is not zero, None when
+        # there are too few points to estimate the residual error
+        n = self.count
+        if n < 3:
+            return None
+        slope = self.slope()
+        syy_centered = max(self.syy - self.sy * self.sy / n, 0.0)
+        residual = max(syy_centered - slope * slope * self._sxx(), 0.0)
+        error = math.sqrt(residual / (n - 2) / self._sxx())
+        if error == 0.0:
+            return 1.0 if slope else 0.0
+        return math.erf(abs(slope / error) / math.sqrt(2))
+
+
+class TrendEngine:
+    """EWMA, windowed slopes and rolling variance updated one score at a time.
+
+    ``primary`` is the window whose slope and confidence decide the trend
+    direction; the other windows are reported alongside it.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, alpha=DEFAULT_ALPHA, primary=None,
+                 slope_threshold=SLOPE_THRESHOLD, min_confidence=MIN_CONFIDENCE):
+        self.windows = {size: WindowStats(size) for size in windows}
+        self.primary = primary or min(windows)
+        self.alpha = alpha
+        self.slope_threshold = slope_threshold
+        self.min_confidence = min_confidence
+        self.count = 0
+        self.ewma = None
+        self.ewm_variance = 0.0
+
+    def update(self, score):
+        score = float(score)
+        self.count += 1
+        if self.ewma is None:
+            self.ewma = score
+        else:
+            # exponentially weighted mean and variance (West's update)
+            diff = score - self.ewma
+            increment = self.alpha * diff
+            self.ewma += increment
+            self.ewm_variance = (1 - self.alpha) * (self.ewm_variance + diff * increment)
+        for window in self.windows.values():
+            window.push(score)
+        return self
+
+    def extend(self, scores):
+        for score in scores:
+            self.update(score)
+        return self
+
+    def direction(self):
+        """Return (direction, slope, confidence) from the primary window."""
+        window = self.windows[self.primary]
+        if window.count < 2:
+            return "neutral", 0, None
+        slope = window.slope()
+        confidence = window.slope_confidence()
+        if abs(slope) <= self.slope_threshold or (
+                confidence is not None and confidence < self.min_confidence):
+            return "stable", slope, confidence
+        return ("improving" if slope > 0 else "declining"), slope, confidence
+
+    def summary(self):
+        direction, slope, confidence = self.direction()
+        return {
+            "direction": direction,
+            "slope": slope,
+            "confidence": confidence,
+            "count": self.count,
+            "ewma": self.ewma,
+            "ewm_std": math.sqrt(self.ewm_variance),
+            "windows": {
+                size: {"count": w.count, "slope": w.slope(), "variance": w.variance(),
+                       "confidence": w.slope_confidence()}
+                for size, w in self.windows.items()
+            },
+        }
+
+    def to_dict(self):
+        return {
+            "windows": {str(size): list(w.values) for size, w in self.windows.items()},
+            "primary": self.primary,
+            "alpha": self.alpha,
+            "slope_threshold": self.slope_threshold,
+            "min_confidence": self.min_confidence,
+            "count": self.count,
+            "ewma": self.ewma,
+            "ewm_variance": self.ewm_variance,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sizes = sorted(int(size) for size in state["windows"])
+        engine = cls(windows=sizes, alpha=state["alpha"], primary=state["primary"],
+                     slope_threshold=state["slope_threshold"], min_confidence=state["min_confidence"])
+        for size, values in state["windows"].items():
+            window = engine.windows[int(size)]
+            window.values.extend(values)
+            window._rebuild()
+        engine.count = state["count"]
+        engine.ewma = state["ewma"]
+        engine.ewm_variance = state["ewm_variance"]
+        return engine
+
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,212 @@
+"""Extract and score many uploaded documents at once.
+
+Uploads can be PDF or DOCX files or ZIP archives of them. Each document is
+extracted (and optionally scored) in a worker pool; results are yielded as
+each one finishes, a document that fails or runs past its timeout becomes
+an error result instead of stopping the batch.
+"""
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+DOCUMENT_TYPES = (".pdf", ".docx")
+DEFAULT_TIMEOUT = 60.0
+# limits on what one archive may expand to: members are only decompressed
+# as the pool takes them, and the declared sizes are checked first, so a
+# zip bomb can't fill memory
+MAX_ARCHIVE_MEMBERS = 500
+MAX_MEMBER_BYTES = 200 * 1024 * 1024
+MAX_ARCHIVE_BYTES = 1024 * 1024 * 1024
+
+
+def _upload_bytes(upload):
+    # streamlit uploads, (name, bytes) pairs and paths all work
+    if isinstance(upload, tuple):
+        return upload
+    if isinstance(upload, (str, os.PathLike)):
+        with open(upload, "rb") as f:
+            return os.path.basename(upload), f.read()
+    return upload.name, upload.getvalue()
+
+
+def _plan_archive(name, archive):
+    # (member name, ZipInfo or None, error) for every entry iter_uploads
+    # yields from the archive, decided from the zip index alone
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and info.filename.lower().endswith(DOCUMENT_TYPES)
+               and not os.path.basename(info.filename).startswith(("~$", "._"))]
+    if not members:
+        yield name, None, "ValueError: archive has no PDF or DOCX files"
+    total = 0
+    for number, info in enumerate(members):
+        member = f"{name}/{info.filename}"
+        if number >= MAX_ARCHIVE_MEMBERS:
+            yield member, None, f"ValueError: archive has more than {MAX_ARCHIVE_MEMBERS} documents"
+            return
+        if info.file_size > MAX_MEMBER_BYTES:
+            yield member, None, f"ValueError: file is larger than {MAX_MEMBER_BYTES} bytes"
+            continue
+        total += info.file_size
+        if total > MAX_ARCHIVE_BYTES:
+            yield member, None, f"ValueError: archive expands to more than {MAX_ARCHIVE_BYTES} bytes"
+            return
+        yield member, info, None
+
+
+def _expand_archive(name, data):
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        yield name, None, f"BadZipFile: {e}"
+        return
+    with archive:
+        for member, info, error in _plan_archive(name, archive):
+            # read one member at a time, only when it is asked for
+            yield member, None if info is None else archive.read(info), error
+
+
+def iter_uploads(uploads):
+    """Yield ``(name, data, error)`` for every document in the uploads.
+
+    ZIP archives are expanded into their PDF and DOCX members (named
+    ``archive.zip/member.pdf``), each decompressed only when the next item
+    is asked for. Anything that can't be used gets ``data`` of None and an
+    error message, so it can be reported alongside the rest.
+    """
+    for upload in uploads:
+        name, data = _upload_bytes(upload)
+        lower = name.lower()
+        if lower.endswith(".zip"):
+            yield from _expand_archive(name, data)
+        elif lower.endswith(DOCUMENT_TYPES):
+            yield name, data, None
+        else:
+            yield name, None, "ValueError: only PDF, DOCX and ZIP files are supported"
+
+
+def count_uploads(uploads):
+    # how many items iter_uploads will yield, without decompressing anything
+    count = 0
+    for upload in uploads:
+        name, data = _upload_bytes(upload)
+        if not name.lower().endswith(".zip"):
+            count += 1
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                count += sum(1 for _ in _plan_archive(name, archive))
+        except zipfile.BadZipFile:
+            count += 1
+    return count
+
+
+def extract_upload(name, data, pages=None):
+    # text of one pdf or docx document given as bytes
+    if name.lower().endswith(".pdf"):
+        # pages are extracted in this worker, the pool already spreads the files
+        from pdf_extract import iter_pdf_pages
+        return "\n".join(iter_pdf_pages(data, pages=pages, workers=1)).strip()
+    from docx_extract import extract_docx_text
+    return extract_docx_text(io.BytesIO(data))
+
+
+def process_upload(task):
+    # runs in the worker: extract, then score unless only the text is wanted
+    name, data, pages, score, keep_text, fingerprint = task
+    start = time.perf_counter()
+    result = {"name": name, "summary": None, "chars": 0, "result": None, "error": None}
+    try:
+        text = extract_upload(name, data, pages=pages)
+        if not text:
+            raise ValueError("no readable text found")
+        result["chars"] = len(text)
+        if score:
+            from engine import get_engine
+            from utils import get_text_summary
+            result["summary"] = get_text_summary(text)
+            result["result"] = get_engine().analyze_sentiment(text)
+        if keep_text:
+            result["text"] = text
+        if fingerprint is not None:
+            # small enough to send back in place of the text, see dedup.py
+            from dedup import fingerprint as dedup_fingerprint
+            result["fingerprint"] = dedup_fingerprint(text, **fingerprint)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _failed(index, name, error, seconds=0.0):
+    return {"index": index, "name": name, "summary": None, "chars": 0, "result": None,
+            "error": error, "seconds": seconds}
+
+
+def process_uploads(items, workers=None, timeout=DEFAULT_TIMEOUT, pages=None, score=True,
+                    keep_text=False, fingerprint=None, processes=True):
+    """Extract (and score) ``(name, data, error)`` items from iter_uploads.
+
+    Yields one result dict per item, in the order they finish, with its
+    ``index`` in the input, ``name``, ``summary``, ``chars``, the
+    analyze_sentiment tuple as ``result`` (when ``score`` is set), the full
+    ``text`` (when ``keep_text`` is set), its dedup ``fingerprint`` (when
+    ``fingerprint`` holds Deduplicator options) and ``error``. Only as many
+    documents as there are workers are in flight, so each one's timeout
+    starts about when it does. A worker stuck past its timeout is given up
+    on and its slot stays taken until it finishes.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    source = iter(enumerate(items))
+    pending = {}
+    stalled = set()
+    pool = executor_class(max_workers=workers)
+    try:
+        exhausted = False
+        while True:
+            stalled = {future for future in stalled if not future.done()}
+            while not exhausted and len(pending) + len(stalled) < workers:
+                item = next(source, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, (name, data, error) = item
+                if error is not None:
+                    yield _failed(index, name, error)
+                    continue
+                future = pool.submit(process_upload, (name, data, pages, score, keep_text, fingerprint))
+                pending[future] = (index, name, time.monotonic())
+
+            if not pending:
+                if exhausted:
+                    break
+                # every slot is held by a stuck worker, wait for one to free up
+                wait(stalled, return_when=FIRST_COMPLETED)
+                continue
+
+            now = time.monotonic()
+            deadline = min(started for _, _, started in pending.values()) + timeout
+            finished, _ = wait(pending, timeout=max(deadline - now, 0), return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, name, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # e.g. a worker process that died
+                    result = _failed(index, name, f"{type(e).__name__}: {e}")
+                result["index"] = index
+                yield result
+
+            now = time.monotonic()
+            for future, (index, name, started) in list(pending.items()):
+                if now - started >= timeout:
+                    del pending[future]
+                    if not future.cancel():
+                        stalled.add(future)
+                    yield _failed(index, name, f"TimeoutError: took longer than {timeout:g}s",
+                                  seconds=now - started)
+    finally:
+        # don't wait for stuck workers, they are dropped once they finish
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,91 +1,65 @@
-from textblob import TextBlob
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import streamlit as st
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import docx
-from pypdf import PdfReader
-import io
-import pandas as pd
-from datetime import datetime
-
-# make sure required nltk data is available
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('vader_lexicon')
-
-def extract_text_from_pdf(pdf_file):
+import os
+
+import metrics
+from engine import get_engine
+from cache import cached_analyze_sentiment
+
+# plotly, pandas, streamlit and the pdf/docx parsers are imported inside the
+# functions that need them, so scoring-only callers start fast
+
+# above this many texts the comparison chart draws lines instead of bars
+COMPARISON_BAR_LIMIT = 100
+
+def _input_bytes(file):
+    # size of an upload, path or bytes object for the byte counters
+    if isinstance(file, (bytes, bytearray)):
+        return len(file)
+    if isinstance(file, str):
+        return os.path.getsize(file)
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer().nbytes
+    return getattr(file, "size", 0) or 0
+
+def extract_text_from_pdf(pdf_file, pages=None, max_pages=None, max_bytes=None):
     """Extract text from a PDF file."""
-    try:
-        pdf_reader = PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        raise ValueError(f"Error processing PDF: {str(e)}")
+    from pdf_extract import extract_text_from_pdf as extract
+    with metrics.stage("extract_pdf"):
+        text = extract(pdf_file, pages=pages, max_pages=max_pages, max_bytes=max_bytes)
+    if metrics.enabled():
+        metrics.count("pdf_bytes", _input_bytes(pdf_file))
+        metrics.count("pdf_chars", len(text))
+    return text
 
 def extract_text_from_docx(docx_file):
-    # deal with extracting text from docx files
+    # deal with extracting text from docx files, streamed straight from the zip
+    from docx_extract import extract_docx_text
     try:
-        doc = docx.Document(docx_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        with metrics.stage("extract_docx"):
+            text = extract_docx_text(docx_file)
+        if metrics.enabled():
+            metrics.count("docx_bytes", _input_bytes(docx_file))
+            metrics.count("docx_chars", len(text))
+        return text
     except Exception as e:
+        import streamlit as st
         st.error(f"Error processing DOCX: {str(e)}")
         return None
 
 def analyze_emotions(text):
-    # break down emotions using vader sentiment analysis
-    if not text.strip():
-        return None, None
-    
-    sia = SentimentIntensityAnalyzer()
-    scores = sia.polarity_scores(text)
-    
-    # adjust scores to percentages for better readability
-    emotion_scores = {
-        'joy': max(min((scores['pos'] * 100), 100), 0),
-        'sadness': max(min((scores['neg'] * 100), 100), 0),
-        'neutral': max(min((scores['neu'] * 100), 100), 0)
-    }
-    
-    # figure out which emotion dominates
-    dominant_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0]
-    
-    return emotion_scores, dominant_emotion
+    # break down emotions using the shared vader analyzer
+    return get_engine().analyze_emotions(text)
 
 def analyze_sentiment(text):
-    # analyze the text for overall sentiment and subjectivity
-    if not text.strip():
-        return None, None, None, None
-    
-    analysis = TextBlob(text)
-    # scale polarity to a range of 0-100
-    score = (analysis.sentiment.polarity + 1) * 50
-    
-    # classify sentiment into positive, negative, or neutral
-    if analysis.sentiment.polarity > 0.1:
-        category = "positive"
-    elif analysis.sentiment.polarity < -0.1:
-        category = "negative"
-    else:
-        category = "neutral"
-        
-    # calculate subjectivity percentage
-    subjectivity = analysis.sentiment.subjectivity * 100
-    
-    # include a breakdown of emotions
-    emotion_scores, dominant_emotion = analyze_emotions(text)
-    
-    return score, category, subjectivity, emotion_scores
+    # analyze the text for overall sentiment, subjectivity and emotions,
+    # reruns on unchanged text are served from the result cache
+    metrics.count("chars_analyzed", len(text))
+    with metrics.stage("analyze_sentiment"):
+        return cached_analyze_sentiment(text)
+
+def analyze_sentiment_batch(texts, as_frame=False):
+    # columnar scoring for many texts, see batch.analyze_sentiment_batch
+    from batch import analyze_sentiment_batch as analyze_batch
+    return analyze_batch(texts, as_frame=as_frame)
 
 def get_color_scheme(category):
     # set colors for sentiment categories
@@ -104,45 +78,58 @@ def get_emotion_color(emotion):
     }
     return colors.get(emotion, '#808080')
 
+def history_columns(history):
+    # charts and trends work on columns: a list of history dicts is turned
+    # into them, columns from the history store are passed through
+    if isinstance(history, dict):
+        return history
+    emotions = [item.get("emotions") or {} for item in history]
+    return {
+        "timestamp": [item.get("timestamp") for item in history],
+        "score": [item["score"] for item in history],
+        "subjectivity": [item["subjectivity"] for item in history],
+        "joy": [e.get("joy", 0) for e in emotions],
+        "sadness": [e.get("sadness", 0) for e in emotions],
+        "neutral": [e.get("neutral", 0) for e in emotions],
+    }
+
 def calculate_trend(history):
-    # find trends in sentiment over time
-    if len(history) < 2:
-        return "neutral", 0
-    
-    recent_scores = [item["score"] for item in history[-5:] if "score" in item]
-    if len(recent_scores) < 2:
-        return "neutral", 0
-        
-    slope = (recent_scores[-1] - recent_scores[0]) / len(recent_scores)
-    
-    if slope > 1:
-        trend = "improving"
-    elif slope < -1:
-        trend = "declining"
+    # find trends in sentiment over time, as a least-squares slope over the
+    # last few scores; a TrendEngine that is already being fed is used as is
+    from trend import TrendEngine
+
+    if isinstance(history, TrendEngine):
+        engine = history
     else:
-        trend = "stable"
-        
+        engine = TrendEngine(windows=(5,))
+        if isinstance(history, dict):
+            engine.extend(history["score"][-5:])
+        else:
+            engine.extend(item["score"] for item in history[-5:] if "score" in item)
+    trend, slope, _ = engine.direction()
     return trend, slope
 
-def create_sentiment_chart(history):
+@metrics.timed("chart_sentiment")
+def create_sentiment_chart(history, max_points=None):
     # build a visual chart to show sentiment history and trends
-    if not history:
+    from plotly.subplots import make_subplots
+    import numpy as np
+    from charting import POINT_BUDGET, downsample, rolling_mean, scatter_class
+
+    # works on a list of history dicts or on columns from the history store
+    columns = history_columns(history)
+    if not len(columns["score"]):
         return None
+    budget = max_points or POINT_BUDGET
     
-    # extract timestamps and sentiment scores
-    timestamps = [item["timestamp"] for item in history]
-    scores = [item["score"] for item in history]
-    subjectivity = [item["subjectivity"] for item in history]
-    
-    # grab emotion scores for each entry
-    joy_scores = [item.get("emotions", {}).get("joy", 0) for item in history]
-    sadness_scores = [item.get("emotions", {}).get("sadness", 0) for item in history]
-    neutral_scores = [item.get("emotions", {}).get("neutral", 0) for item in history]
+    # extract timestamps and sentiment scores as arrays
+    timestamps = np.asarray(columns["timestamp"])
+    scores = np.asarray(columns["score"], dtype=float)
     
     # compute moving averages for smoother trends
     window = min(3, len(scores))
     if window > 1:
-        ma_scores = pd.Series(scores).rolling(window=window).mean()
+        ma_scores = rolling_mean(scores, window)
     else:
         ma_scores = scores
     
@@ -152,44 +139,24 @@ def create_sentiment_chart(history):
         row_heights=[0.4, 0.3, 0.3]
     )
     
-    # add sentiment scores and trends to the chart
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=scores, mode='lines+markers', 
-                  line=dict(color='#2E86C1'), name='Sentiment'),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=ma_scores, mode='lines',
-                  line=dict(color='#E74C3C', dash='dash'), 
-                  name='Trend (Moving Avg)'),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=subjectivity, mode='lines+markers',
-                  line=dict(color='#28a745'), name='Subjectivity'),
-        row=2, col=1
-    )
-    
-    # include emotional breakdowns in the visualization
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=joy_scores, mode='lines+markers',
-                  line=dict(color=get_emotion_color('joy')), name='Joy'),
-        row=3, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=sadness_scores, mode='lines+markers',
-                  line=dict(color=get_emotion_color('sadness')), name='Sadness'),
-        row=3, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(x=timestamps, y=neutral_scores, mode='lines+markers',
-                  line=dict(color=get_emotion_color('neutral')), name='Neutral'),
-        row=3, col=1
-    )
+    # (values, row, name, line style) for every trace, long series are
+    # downsampled one trace at a time so each keeps its own peaks
+    traces = [
+        (scores, 1, 'Sentiment', dict(color='#2E86C1'), 'lines+markers'),
+        (ma_scores, 1, 'Trend (Moving Avg)', dict(color='#E74C3C', dash='dash'), 'lines'),
+        (columns["subjectivity"], 2, 'Subjectivity', dict(color='#28a745'), 'lines+markers'),
+        # include emotional breakdowns in the visualization
+        (columns["joy"], 3, 'Joy', dict(color=get_emotion_color('joy')), 'lines+markers'),
+        (columns["sadness"], 3, 'Sadness', dict(color=get_emotion_color('sadness')), 'lines+markers'),
+        (columns["neutral"], 3, 'Neutral', dict(color=get_emotion_color('neutral')), 'lines+markers'),
+    ]
+    for values, row, name, line, mode in traces:
+        x, y = downsample(timestamps, np.asarray(values, dtype=float), budget)
+        scatter = scatter_class(len(y))
+        if len(y) > budget // 2:
+            # markers just turn into noise on dense series
+            mode = 'lines'
+        fig.add_trace(scatter(x=x, y=y, mode=mode, line=line, name=name), row=row, col=1)
     
     fig.update_layout(
         height=800,
@@ -205,9 +172,17 @@ def create_sentiment_chart(history):
     
     return fig
 
-def create_comparison_chart(texts_data):
+@metrics.timed("chart_comparison")
+def create_comparison_chart(texts_data, max_points=None):
     # set up a chart to compare multiple texts
-    if not texts_data:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    import numpy as np
+    from charting import POINT_BUDGET, downsample, scatter_class
+
+    columns = history_columns(texts_data)
+    count = len(columns["score"])
+    if not count:
         return None
     
     fig = make_subplots(rows=2, cols=1, 
@@ -215,39 +190,32 @@ def create_comparison_chart(texts_data):
                                      'Emotion Analysis Comparison'),
                        row_heights=[0.5, 0.5])
     
-    # grab data for sentiment and subjectivity comparison
-    labels = [f"Text {i+1}" for i in range(len(texts_data))]
-    sentiment_scores = [data["score"] for data in texts_data]
-    subjectivity_scores = [data["subjectivity"] for data in texts_data]
-    
-    # plot sentiment scores
-    fig.add_trace(
-        go.Bar(name='Sentiment Score', x=labels, y=sentiment_scores,
-               marker_color='#2E86C1'),
-        row=1, col=1
-    )
-    
-    # plot subjectivity scores
-    fig.add_trace(
-        go.Bar(name='Subjectivity', x=labels, y=subjectivity_scores,
-               marker_color='#28a745'),
-        row=1, col=1
-    )
-    
-    # prepare data for emotion breakdown
-    emotions_data = {
-        'joy': [data["emotions"]["joy"] for data in texts_data],
-        'sadness': [data["emotions"]["sadness"] for data in texts_data],
-        'neutral': [data["emotions"]["neutral"] for data in texts_data]
-    }
-    
-    # add emotion data to the chart
-    for emotion, scores in emotions_data.items():
-        fig.add_trace(
-            go.Bar(name=emotion.title(), x=labels, y=scores,
-                  marker_color=get_emotion_color(emotion)),
-            row=2, col=1
-        )
+    # (values, row, name, color) for sentiment, subjectivity and the emotions
+    series = [
+        (columns["score"], 1, 'Sentiment Score', '#2E86C1'),
+        (columns["subjectivity"], 1, 'Subjectivity', '#28a745'),
+    ] + [(columns[emotion], 2, emotion.title(), get_emotion_color(emotion))
+         for emotion in ('joy', 'sadness', 'neutral')]
+
+    if count <= COMPARISON_BAR_LIMIT:
+        # grouped bars, one group per text
+        labels = [f"Text {i+1}" for i in range(count)]
+        for values, row, name, color in series:
+            fig.add_trace(
+                go.Bar(name=name, x=labels, y=list(values), marker_color=color),
+                row=row, col=1
+            )
+    else:
+        # too many texts for bars: one line per series over the text number,
+        # downsampled so the figure stays small
+        positions = np.arange(1, count + 1)
+        for values, row, name, color in series:
+            x, y = downsample(positions, np.asarray(values, dtype=float), max_points or POINT_BUDGET)
+            fig.add_trace(
+                scatter_class(len(y))(x=x, y=y, mode='lines', name=name, line=dict(color=color)),
+                row=row, col=1
+            )
+        fig.update_xaxes(title_text="Text number")
     
     # set up the chart layout
     fig.update_layout(
@@ -264,6 +232,86 @@ def create_comparison_chart(texts_data):
     
     return fig
 
+@metrics.timed("chart_distribution")
+def create_distribution_chart(texts_data, bins=20):
+    # histograms and box plots of the compared texts, both are computed here
+    # so the figure carries a few summary numbers instead of every value
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    import numpy as np
+    from comparison import box_stats
+
+    columns = history_columns(texts_data)
+    if not len(columns["score"]):
+        return None
+
+    fig = make_subplots(rows=1, cols=2,
+                        subplot_titles=('Score Distribution', 'Spread by Measure'),
+                        column_widths=[0.5, 0.5])
+
+    edges = np.linspace(0, 100, bins + 1)
+    for name, color in (('score', '#2E86C1'), ('subjectivity', '#28a745')):
+        counts, _ = np.histogram(np.clip(np.asarray(columns[name], dtype=float), 0, 100), edges)
+        fig.add_trace(
+            go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=edges[1] - edges[0],
+                   name=f"{name.title()} histogram", marker_color=color, opacity=0.6),
+            row=1, col=1
+        )
+
+    for name, color in (('score', '#2E86C1'), ('subjectivity', '#28a745'),
+                        ('joy', get_emotion_color('joy')), ('sadness', get_emotion_color('sadness')),
+                        ('neutral', get_emotion_color('neutral'))):
+        stats = box_stats(columns[name])
+        fig.add_trace(
+            go.Box(name=name.title(), q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                   mean=[stats["mean"]], lowerfence=[stats["lowerfence"]],
+                   upperfence=[stats["upperfence"]], marker_color=color, showlegend=False),
+            row=1, col=2
+        )
+
+    fig.update_layout(
+        height=400,
+        barmode='overlay',
+        margin=dict(l=20, r=20, t=60, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    fig.update_xaxes(title_text="Value", range=[0, 100], row=1, col=1)
+    fig.update_yaxes(title_text="Texts", row=1, col=1)
+    fig.update_yaxes(range=[0, 100], row=1, col=2)
+
+    return fig
+
+@metrics.timed("chart_document_curve")
+def create_document_curve_chart(stream_result):
+    # plot sentiment across a long document from its per-chunk results
+    import plotly.graph_objects as go
+
+    chunks = stream_result.chunks
+    if len(chunks) < 2:
+        return None
+
+    total = max(stream_result.chars, 1)
+    positions = [(c.start + c.chars / 2) / total * 100 for c in chunks]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=positions, y=[c.score for c in chunks], mode='lines',
+                             line=dict(color='#2E86C1'), name='Sentiment'))
+    fig.add_trace(go.Scatter(x=positions, y=[c.subjectivity for c in chunks], mode='lines',
+                             line=dict(color='#28a745', dash='dot'), name='Subjectivity'))
+
+    fig.update_layout(
+        height=350,
+        showlegend=True,
+        margin=dict(l=20, r=20, t=40, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    fig.update_yaxes(range=[0, 100])
+    fig.update_xaxes(title_text="Position in document (%)")
+
+    return fig
+
 def get_text_summary(text):
     # return a short version of the text
     return text[:50] + "..." if len(text) > 50 else text
\ No newline at end of file